@@ -0,0 +1,62 @@
+"""
+    Copyright 2021 Walter Pachlinger (walter.pachlinger@gmail.com)
+
+    Licensed under the EUPL, Version 1.2 or - as soon they will be approved by the European
+    Commission - subsequent versions of the EUPL (the LICENSE). You may not use this work except
+    in compliance with the LICENSE. You may obtain a copy of the LICENSE at:
+
+        https://joinup.ec.europa.eu/software/page/eupl
+
+    Unless required by applicable law or agreed to in writing, software distributed under the
+    LICENSE is distributed on an "AS IS" basis, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+    either express or implied. See the LICENSE for the specific language governing permissions
+    and limitations under the LICENSE.
+
+    Memory benchmark comparing regular and "slotted" RepositoryElement instances loaded from a
+    SQLite database. Usage: python benchmark_slotted.py [number_of_rows]
+"""
+import sys
+import sqlite3
+import tracemalloc
+import wp_repository_elem as rep_elem
+import wp_repository_sl3 as repo3
+
+MAPPINGS = [rep_elem.AttributeMapping(0, 'row_id', 'row_id', int, 1)] + \
+           [rep_elem.AttributeMapping(col + 1, 'col_{}'.format(col), 'col_{}'.format(col), int) for col in range(8)]
+
+class WideElement(rep_elem.RepositoryElement):
+    _attribute_map = rep_elem.AttributeMap('bench_table', list(MAPPINGS))
+    _load_without_init = True
+
+@rep_elem.slotted
+class SlottedWideElement(rep_elem.RepositoryElement):
+    _attribute_map = rep_elem.AttributeMap('bench_table', list(MAPPINGS))
+    _load_without_init = True
+
+def measure(sql_connection: sqlite3.Connection, element_class: type) -> int:
+    """ Loads all rows of the benchmark table and returns the memory allocated for the elements. """
+    repo = repo3.SQLiteRepository(element_class, sql_connection=sql_connection)
+    tracemalloc.start()
+    elements = repo.select_all()
+    mem_size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del elements
+    return mem_size
+
+def main(num_rows: int) -> None:
+    sql_connection = sqlite3.connect(':memory:')
+    sql_connection.execute('CREATE TABLE bench_table ( row_id INTEGER PRIMARY KEY, {} )'.format(
+        ', '.join(['col_{} INTEGER'.format(col) for col in range(8)])))
+    sql_connection.executemany('INSERT INTO bench_table VALUES ( {} )'.format(','.join(['?'] * 9)),
+                               [[row] + [row * col for col in range(8)] for row in range(num_rows)])
+    sql_connection.commit()
+    plain_size = measure(sql_connection, WideElement)
+    slotted_size = measure(sql_connection, SlottedWideElement)
+    print('{} rows, 9 attributes'.format(num_rows))
+    print('regular elements : {:10.1f} bytes per element'.format(plain_size / num_rows))
+    print('slotted elements : {:10.1f} bytes per element'.format(slotted_size / num_rows))
+    print('ratio            : {:10.2f}'.format(slotted_size / plain_size))
+    sql_connection.close()
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
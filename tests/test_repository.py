@@ -13,13 +13,21 @@
     and limitations under the LICENSE.
 """
 import unittest
+import asyncio
 import sqlite3
 import json
 from datetime import datetime, timedelta
 from decimal import Decimal
 import random
+import threading
+from array import array
 import wp_repository_elem as rep_elem
 import wp_repository_sl3 as repo3
+import wp_repository_async as repo_async
+import wp_repository_pool as repo_pool
+from wp_repository_snapshot import SQLiteSnapshot
+from wp_repository_monitor import StatementMonitor, OTHER_STATEMENTS
+from wp_sql_statement import SQLStatement
 
 
 class TestPerson(rep_elem.RepositoryElement):
@@ -124,6 +132,61 @@ class Test1RepositoryObject(unittest.TestCase):
         self.assertEqual(ref_stmt.lower().strip().replace(' ',''), sel_stmt.stmt_text.lower().strip().replace(' ',''))
         self.assertEqual(ref_stmt_params, sel_stmt.stmt_params)
 
+    def test_04_compiled_map(self):
+        """ Test the per-class cache of compiled SQL statements. """
+        telem = TestPerson()
+        compiled = TestPerson._compiled_map()
+        self.assertIs(compiled, TestPerson._compiled_map())
+        self.assertIsNot(compiled, TestProduct._compiled_map())
+        self.assertEqual(compiled.insert_attrs, ['name', 'age', 'weight', 'eye_color'])
+        self.assertEqual(compiled.update_attrs, ['age', 'weight', 'eye_color', 'name'])
+        self.assertEqual(telem.insert_statement().stmt_text, compiled.insert_text)
+        telem.age = 40
+        self.assertEqual(telem.update_statement().stmt_params, [40, telem.weight, telem.eye_color, telem.name])
+        self.assertEqual(TestPerson._attribute_map['weight'].db_attr_name, 'test_wght')
+        self.assertIsNone(TestPerson._attribute_map['unknown'])
+
+    def test_05_row_loader(self):
+        """ Test the row loader generated from the Attribute Map. """
+        row = ('Jane', '41', 61.5, None)
+        telem = TestPerson()
+        self.assertIs(telem.load_row(row), telem)
+        self.assertEqual(telem.name, 'Jane')
+        self.assertEqual(telem.age, 41)
+        self.assertEqual(telem.weight, Decimal(61.5))
+        self.assertIsNone(telem.eye_color)
+
+        class LazyPerson(TestPerson):
+            _load_without_init = True
+
+            def __init__(self):
+                raise AssertionError('constructor called')
+
+            @property
+            def age(self):
+                return self._age
+
+            @age.setter
+            def age(self, value):
+                self._age = value
+
+        telem = LazyPerson.from_row(row)
+        self.assertIsInstance(telem, LazyPerson)
+        self.assertEqual(telem.age, 41)
+        self.assertEqual(telem._age, 41)
+
+        class LoggedPerson(TestPerson):
+            def __setattr__(self, name, value):
+                assigned.append(name)
+                super().__setattr__(name, value)
+
+        assigned = []
+        telem = LoggedPerson()
+        del assigned[:]
+        telem.load_row(row)
+        self.assertEqual(assigned, ['name', 'age', 'weight', 'eye_color'])
+        self.assertEqual(telem.age, 41)
+
 def create_test_db(db_path: str):
     db_conn = sqlite3.connect(db_path)
     db_curs = db_conn.cursor()
@@ -146,6 +209,13 @@ def create_test_db(db_path: str):
             test_elem_dec DECIMAL )
     """
     db_curs.execute(table_def)
+    table_def = """
+        CREATE TABLE test_table_3(
+            event_id INTEGER NOT NULL PRIMARY KEY,
+            event_dtm DATETIME,
+            event_us INTEGER )
+    """
+    db_curs.execute(table_def)
     db_curs.close()
     db_conn.commit()
     db_conn.close()
@@ -208,8 +278,50 @@ class TestTable1(rep_elem.RepositoryElement):
         }
         return json.dumps(res)
 
+class TestTable2(rep_elem.RepositoryElement):
+    _attribute_map = rep_elem.AttributeMap(
+        "test_table_2",
+        [rep_elem.AttributeMapping(0, 'auto_id', 'auto_elem_1', int, 2),
+         rep_elem.AttributeMapping(1, 'cls_elem_txt', 'test_elem_txt', str),
+         rep_elem.AttributeMapping(2, 'cls_elem_int', 'test_elem_int', int),
+         rep_elem.AttributeMapping(3, 'cls_elem_dec', 'test_elem_dec', float)])
+
+    def __init__(self, cls_elem_int: int = 0):
+        super().__init__()
+        self.auto_id = None
+        self.cls_elem_txt = 'row {}'.format(cls_elem_int)
+        self.cls_elem_int = cls_elem_int
+        self.cls_elem_dec = cls_elem_int / 4
+
+class TestEvent(rep_elem.RepositoryElement):
+    _attribute_map = rep_elem.AttributeMap(
+        "test_table_3",
+        [rep_elem.AttributeMapping(0, 'event_id', 'event_id', int, 1),
+         rep_elem.AttributeMapping(1, 'event_dtm', 'event_dtm', datetime),
+         rep_elem.AttributeMapping(2, 'event_us', 'event_us', datetime,
+                                   db_storage = rep_elem.AttributeMapping.DB_STORAGE_EPOCH_US)])
+
+    def __init__(self, event_id: int = 0, event_dtm: datetime = None):
+        super().__init__()
+        self.event_id = event_id
+        self.event_dtm = event_dtm
+        self.event_us = event_dtm
+
 import os
 
+def sum_cls_elem_int(elements) -> tuple:
+    """ Map function of the parallel scan test (module level, so that it can be pickled). """
+    num_elem = 0
+    sum_int = 0
+    for element in elements:
+        num_elem += 1
+        sum_int += element.cls_elem_int
+    return num_elem, sum_int
+
+def add_pairs(acc: tuple, part: tuple) -> tuple:
+    """ Reduce function of the parallel scan test. """
+    return acc[0] + part[0], acc[1] + part[1]
+
 class Test2Repository(unittest.TestCase):
     def setUp(self):
         super().setUp()
@@ -350,6 +462,749 @@ class Test2Repository(unittest.TestCase):
             self.assertIsNotNone(rec_list1)
             self.assertEqual(len(rec_list1), num_per_val[1] + num_per_val[2] + num_per_val[3])
 
+    def test_05_bulk(self):
+        with repo3.SQLiteRepository(TestTable1, self._db_path) as repo:
+            elements = {}
+            while len(elements) < 250:
+                t0 = TestTable1()
+                t0.random()
+                elements[(t0.cls_elem_1, t0.cls_elem_2)] = t0
+            num_rec = repo.insert_many(elements.values(), chunk_size = 100)
+            self.assertEqual(num_rec, 250)
+            self.assertEqual(len(repo.select_all()), 250)
+            for t0 in elements.values():
+                t0.cls_elem_int = -1
+            num_rec = repo.update_many(elements.values(), chunk_size = 30)
+            self.assertEqual(num_rec, 250)
+            self.assertEqual(len(repo.select_where([('cls_elem_int', '=', -1)])), 250)
+            num_rec = repo.delete_many(list(elements.values())[:200])
+            self.assertEqual(num_rec, 200)
+            self.assertEqual(len(repo.select_all()), 50)
+
+    def test_06_bulk_autoincrement(self):
+        with repo3.SQLiteRepository(TestTable2, self._db_path) as repo:
+            elements = [TestTable2(cnt) for cnt in range(120)]
+            num_rec = repo.insert_many(elements, chunk_size = 50)
+            self.assertEqual(num_rec, 120)
+            self.assertEqual(len(set([t0.auto_id for t0 in elements])), 120)
+            for t0 in elements:
+                t1 = repo.select_by_key(t0)
+                self.assertEqual(t1.cls_elem_int, t0.cls_elem_int)
+            t_null = TestTable2(1)
+            t_null.cls_elem_int = None
+            t_first = TestTable2(1)
+            with self.assertRaises(sqlite3.IntegrityError):
+                repo.insert_many([t_first, t_null])
+            self.assertEqual(len(repo.select_all()), 120)
+            self.assertIsNone(t_first.auto_id)
+            # elements inserted within a rolled back transaction scope lose their keys
+            t_scoped = [TestTable2(cnt) for cnt in range(3)]
+            with self.assertRaises(RuntimeError):
+                with repo.transaction():
+                    repo.insert_many(t_scoped, chunk_size = 2)
+                    self.assertIsNotNone(t_scoped[2].auto_id)
+                    raise RuntimeError('rollback')
+            self.assertEqual([t0.auto_id for t0 in t_scoped], [None, None, None])
+            self.assertEqual(len(repo.select_all()), 120)
+
+    def test_07_iterators(self):
+        with repo3.SQLiteRepository(TestTable2, self._db_path) as repo:
+            repo.insert_many([TestTable2(cnt) for cnt in range(100)])
+            rec_list = list(repo.iter_all(fetch_size = 7))
+            self.assertEqual([t0.cls_elem_int for t0 in rec_list], list(range(100)))
+            rec_list = list(repo.iter_where([('cls_elem_int', '>', 89)], fetch_size = 3))
+            self.assertEqual(len(rec_list), 10)
+            self.assertIsInstance(rec_list[0], TestTable2)
+            rec_iter = repo.iter_query(TestTable2().select_all_statement(), fetch_size = 10)
+            self.assertEqual(next(rec_iter).cls_elem_int, 0)
+            rec_iter.close()
+            self.assertEqual(len(list(rec_iter)), 0)
+            with self.assertRaises(ValueError):
+                repo.iter_all(0)
+            with self.assertRaises(ValueError):
+                repo.iter_where([('cls_elem_int', '>', 0)], fetch_size = -1)
+
+    def test_08_datetime(self):
+        base_dtm = datetime(2021, 6, 1, 12, 30, 15, 250)
+        for native in [False, True]:
+            with repo3.SQLiteRepository(TestEvent, self._db_path, native_datetime = native) as repo:
+                repo.insert_many([TestEvent(cnt, base_dtm + timedelta(seconds = cnt)) for cnt in range(10)])
+                rec_list = repo.select_where([('event_us', '>', base_dtm + timedelta(seconds = 4))])
+                self.assertEqual([t0.event_id for t0 in rec_list], [5, 6, 7, 8, 9])
+                for t0 in rec_list:
+                    self.assertEqual(t0.event_dtm, base_dtm + timedelta(seconds = t0.event_id))
+                    self.assertEqual(t0.event_us, t0.event_dtm)
+                db_conn = sqlite3.connect(self._db_path)
+                raw = db_conn.execute('SELECT event_us FROM test_table_3 WHERE event_id = 0').fetchone()
+                db_conn.close()
+                self.assertEqual(raw[0], rep_elem.datetime_to_epoch_us(base_dtm))
+                repo.delete_many(repo.select_all())
+        self.assertEqual(rep_elem.epoch_us_to_datetime(rep_elem.datetime_to_epoch_us(base_dtm)), base_dtm)
+        self.assertEqual(repo_pool._convert_datetime(b'-1000000'), datetime(1969, 12, 31, 23, 59, 59))
+        self.assertEqual(repo_pool._convert_datetime(b'1969-12-31 23:59:59'), datetime(1969, 12, 31, 23, 59, 59))
+
+    def test_09_key_cache(self):
+        with repo3.SQLiteRepository(TestTable2, self._db_path) as repo:
+            cache = repo.enable_key_cache(max_size = 2)
+            elements = [TestTable2(cnt) for cnt in range(3)]
+            repo.insert_many(elements)
+            t1 = repo.select_by_key(elements[0])
+            self.assertIs(repo.select_by_key(elements[0]), t1)
+            self.assertEqual((cache.hits, cache.misses), (1, 1))
+            repo.select_by_key(elements[1])
+            repo.select_by_key(elements[2])
+            self.assertEqual(len(cache), 2)
+            self.assertIsNot(repo.select_by_key(elements[0]), t1)
+            t1 = repo.select_by_key(elements[0])
+            t1.cls_elem_int = 100
+            repo.update(t1)
+            self.assertIsNone(cache.get(repo._element_key(t1)))
+            self.assertEqual(repo.select_by_key(elements[0]).cls_elem_int, 100)
+            repo.delete(t1)
+            self.assertIsNone(repo.select_by_key(elements[0]))
+            self.assertEqual(cache.statistics['evictions'], 2)
+
+    def test_10_lru_cache(self):
+        now = [0.0]
+        cache = repo3.LRUCache(max_size = 10, ttl = 5, clock = lambda: now[0])
+        cache.put('a', 1)
+        self.assertEqual(cache.get('a'), 1)
+        now[0] = 6.0
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.statistics['hit_ratio'], 0.5)
+
+    def test_11_connection_pool(self):
+        with repo3.SQLiteConnectionPool(self._db_path) as pool:
+            repo = repo3.SQLiteRepository(TestTable2, connection_pool = pool)
+            errors = []
+
+            def worker(offset: int):
+                try:
+                    for cnt in range(offset, offset + 25):
+                        repo.insert(TestTable2(cnt))
+                    self.assertGreaterEqual(len(repo.select_all()), 25)
+                except Exception as exc:
+                    errors.append(exc)
+                finally:
+                    pool.release()
+
+            threads = [threading.Thread(target = worker, args = (offset * 100,)) for offset in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            self.assertEqual(errors, [])
+            self.assertEqual(len(repo.select_all()), 100)
+            self.assertEqual(pool.num_connections, 1)
+            mode = pool.connection().execute('PRAGMA journal_mode').fetchone()[0]
+            self.assertEqual(mode.lower(), 'wal')
+            foreign_keys = pool.connection().execute('PRAGMA foreign_keys').fetchone()[0]
+            self.assertEqual(foreign_keys, 1)
+
+    def test_12_pragma_profiles(self):
+        with repo3.SQLiteRepository(TestTable2, self._db_path, pragmas = 'read-mostly') as repo:
+            settings = repo.pragma_settings
+            self.assertEqual(settings['journal_mode'].lower(), 'wal')
+            self.assertEqual(settings['synchronous'], 1)
+            self.assertEqual(settings['cache_size'], -32768)
+            self.assertEqual(settings['temp_store'], 2)
+        with repo3.SQLiteRepository(TestTable2, self._db_path, pragmas = {'cache_size': -1000}) as repo:
+            self.assertEqual(repo.pragma_settings, {'cache_size': -1000})
+        with self.assertRaises(ValueError):
+            repo3.SQLiteRepository(TestTable2, self._db_path, pragmas = 'unknown')
+        with self.assertRaises(ValueError):
+            repo3.SQLiteRepository(TestTable2, self._db_path, pragmas = {'cache_size': '1; DROP TABLE x'})
+        db_conn = sqlite3.connect(self._db_path)
+        repo = repo3.SQLiteRepository(TestTable2, sql_connection = db_conn, pragmas = 'fast-ingest')
+        self.assertEqual(repo.pragma_settings['cache_size'], -65536)
+        self.assertEqual(db_conn.execute('PRAGMA cache_size').fetchone()[0], -65536)
+        db_conn.close()
+        with repo_pool.SQLiteConnectionPool(self._db_path) as pool:
+            with self.assertRaises(ValueError):
+                repo3.SQLiteRepository(TestTable2, connection_pool = pool, pragmas = 'fast-ingest')
+
+    def test_13_transaction(self):
+        with repo3.SQLiteRepository(TestTable2, self._db_path) as repo:
+            with repo.transaction():
+                repo.insert(TestTable2(1))
+                repo.insert_many([TestTable2(2), TestTable2(3)])
+                with self.assertRaises(ValueError):
+                    with repo.transaction():
+                        repo.insert(TestTable2(4))
+                        raise ValueError('inner rollback')
+                self.assertTrue(repo._connection().in_transaction)
+            self.assertFalse(repo._connection().in_transaction)
+            self.assertEqual([t0.cls_elem_int for t0 in repo.select_all()], [1, 2, 3])
+            with self.assertRaises(RuntimeError):
+                with repo.transaction(immediate = True):
+                    repo.delete_many(repo.select_all())
+                    raise RuntimeError('outer rollback')
+            self.assertEqual(len(repo.select_all()), 3)
+            repo2 = repo3.SQLiteRepository(TestTable2, sql_connection = repo._connection())
+            with repo.transaction():
+                repo2.insert(TestTable2(5))
+                self.assertTrue(repo2._connection().in_transaction)
+            self.assertEqual(len(repo.select_all()), 4)
+            # a failed commit rolls the transaction back
+            sql_connection = repo._connection()
+            sql_connection.execute('PRAGMA foreign_keys = ON')
+            sql_connection.execute('CREATE TABLE fk_parent ( parent_id INTEGER PRIMARY KEY )')
+            sql_connection.execute('CREATE TABLE fk_child ( parent_id INTEGER REFERENCES fk_parent ( parent_id ) '
+                                   'DEFERRABLE INITIALLY DEFERRED )')
+            sql_connection.commit()
+            t6 = TestTable2(6)
+            with self.assertRaises(sqlite3.IntegrityError):
+                with repo.transaction():
+                    repo.insert(t6)
+                    sql_connection.execute('INSERT INTO fk_child VALUES ( 42 )')
+            self.assertFalse(sql_connection.in_transaction)
+            self.assertFalse(repo3.SQLiteRepository._in_transaction(sql_connection))
+            self.assertIsNone(t6.auto_id)
+            self.assertEqual(len(repo.select_all()), 4)
+
+    def test_14_select_page(self):
+        with repo3.SQLiteRepository(TestTable1, self._db_path) as repo:
+            elements = {}
+            while len(elements) < 95:
+                t0 = TestTable1()
+                t0.random()
+                elements[(str(t0.cls_elem_1), t0.cls_elem_2)] = t0
+            repo.insert_many(elements.values())
+            keys = []
+            page, token = repo.select_page(limit = 10)
+            while True:
+                keys.extend([(str(t0.cls_elem_1), t0.cls_elem_2) for t0 in page])
+                if token is None:
+                    break
+                page, token = repo.select_page(after_key = token, limit = 10)
+            self.assertEqual(keys, sorted(elements.keys()))
+            page, token = repo.select_page([('cls_elem_int', '<', 5000)], limit = 1000)
+            self.assertIsNone(token)
+            self.assertEqual(len(page), len([t0 for t0 in elements.values() if t0.cls_elem_int < 5000]))
+
+    def test_15_upsert(self):
+        with repo3.SQLiteRepository(TestTable1, self._db_path) as repo:
+            elements = []
+            for cnt in range(20):
+                t0 = TestTable1()
+                t0.random()
+                t0.cls_elem_1 = cnt
+                elements.append(t0)
+            repo.insert_many(elements[:10])
+            for t0 in elements:
+                t0.cls_elem_int = -1
+            self.assertEqual(repo.upsert_many(elements), 20)
+            self.assertEqual(len(repo.select_where([('cls_elem_int', '=', -1)])), 20)
+            elements[0].cls_elem_txt = 'upserted'
+            self.assertEqual(repo.upsert(elements[0]), 1)
+            self.assertEqual(repo.select_by_key(elements[0]).cls_elem_txt, 'upserted')
+        with repo3.SQLiteRepository(TestTable2, self._db_path) as repo:
+            t0 = TestTable2(1)
+            key = repo.upsert(t0)
+            self.assertEqual(t0.auto_id, key)
+            t0.cls_elem_int = 2
+            self.assertEqual(repo.upsert(t0), key)
+            elements = [t0, TestTable2(3)]
+            self.assertEqual(repo.upsert_many(elements), 2)
+            self.assertEqual([t1.cls_elem_int for t1 in repo.select_all()], [2, 3])
+
+    def test_16_indexes(self):
+        class IndexedTable2(TestTable2):
+            _attribute_map = rep_elem.AttributeMap(
+                "test_table_2", TestTable2._attribute_map.mappings,
+                indexes=[rep_elem.IndexDefinition('ix_test_table_2_int', ['cls_elem_int'], covering=['cls_elem_txt'])])
+
+        with self.assertRaises(ValueError):
+            rep_elem.AttributeMap("test_table_2", TestTable2._attribute_map.mappings,
+                                  indexes=[rep_elem.IndexDefinition('ix_bad', ['unknown'])])
+        with repo3.SQLiteRepository(IndexedTable2, self._db_path) as repo:
+            repo.insert_many([IndexedTable2(cnt) for cnt in range(100)])
+            self.assertEqual(repo.verify_indexes(), ['ix_test_table_2_int'])
+            repo.enable_plan_check('raise')
+            with self.assertRaises(repo3.QueryPlanError):
+                repo.select_where([('cls_elem_int', '=', 5)])
+            repo.enable_plan_check('warn')
+            with self.assertWarns(repo3.QueryPlanWarning):
+                repo.select_where([('cls_elem_txt', '=', 'x')])
+            self.assertEqual(repo.create_indexes(), 1)
+            self.assertEqual(repo.verify_indexes(), [])
+            repo.enable_plan_check('raise')
+            self.assertEqual(len(repo.select_where([('cls_elem_int', '=', 5)])), 1)
+            self.assertTrue(any(['ix_test_table_2_int' in step for step in
+                                 repo.explain(IndexedTable2().select_where_statement([('cls_elem_int', '=', 5)]))]))
+            # scans of a covering index are not reported
+            covering_stmt = SQLStatement('SELECT test_elem_int, test_elem_txt FROM test_table_2 WHERE test_elem_txt = ?', ['x'])
+            self.assertTrue(any(['COVERING INDEX' in step for step in repo.explain(covering_stmt)]))
+            repo._check_plan(covering_stmt)
+            # the checked statement texts are bounded
+            repo.enable_plan_check('raise', max_statements=2)
+            for cnt in range(5):
+                repo.select_where([('cls_elem_int', 'IN', list(range(cnt + 1)))])
+            self.assertEqual(len(repo._checked_plans), 2)
+
+    def test_17_where_expressions(self):
+        with repo3.SQLiteRepository(TestTable2, self._db_path) as repo:
+            elements = [TestTable2(cnt % 10) for cnt in range(30)]
+            for t0 in elements[:5]:
+                t0.cls_elem_txt = None
+            repo.insert_many(elements)
+            self.assertEqual(len(repo.select_where([('cls_elem_int', '>=', 8)])), 6)
+            self.assertEqual(len(repo.select_where([('cls_elem_txt', 'IS NULL')])), 5)
+            self.assertEqual(len(repo.select_where([('cls_elem_txt', 'is not null', None)])), 25)
+            expr = rep_elem.WhereOr(('cls_elem_int', '=', 1),
+                                    rep_elem.WhereAnd(('cls_elem_int', '>', 7), rep_elem.WhereNot(('cls_elem_int', '=', 9))))
+            sel_stmt = TestTable2().select_where_statement(expr)
+            self.assertEqual(sel_stmt.stmt_params, [1, 7, 9])
+            self.assertEqual(len(repo.select_where(expr)), 6)
+            self.assertEqual(len(repo.select_where([('cls_elem_txt', 'IS NOT NULL'), expr])), 5)
+            res = repo.select_where(expr, order_by=['-cls_elem_int', 'auto_id'], limit=4, offset=1)
+            self.assertEqual([t0.cls_elem_int for t0 in res], [8, 8, 1, 1])
+            self.assertEqual([t0.auto_id for t0 in res[2:]], [2, 12])
+            res = repo.select_where([], order_by=['auto_id'], offset=28)
+            self.assertEqual([t0.auto_id for t0 in res], [29, 30])
+            self.assertEqual(len(list(repo.iter_where(expr, limit=2))), 2)
+            with self.assertRaises(ValueError):
+                repo.select_where([], order_by=['unknown'])
+            sel_stmt = TestTable2().select_where_statement([], distinct=True)
+            self.assertTrue(sel_stmt.stmt_text.startswith('SELECT DISTINCT '))
+
+    def test_18_select_columns(self):
+        with repo3.SQLiteRepository(TestTable1, self._db_path) as repo:
+            elements = []
+            for cnt in range(20):
+                t0 = TestTable1()
+                t0.random()
+                t0.cls_elem_1 = cnt
+                t0.cls_elem_int = cnt % 4
+                elements.append(t0)
+            repo.insert_many(elements)
+            rows = repo.select_columns(['cls_elem_1', 'cls_elem_dtm'], [('cls_elem_int', '=', 1)])
+            self.assertEqual(len(rows), 5)
+            self.assertEqual(rows[0]._fields, ('cls_elem_1', 'cls_elem_dtm'))
+            self.assertEqual(rows[0].cls_elem_1, 1)
+            self.assertEqual(rows[0].cls_elem_dtm, elements[1].cls_elem_dtm)
+            rows = repo.select_columns(['cls_elem_int'], named=False, distinct=True, order_by=['-cls_elem_int'])
+            self.assertEqual(rows, [(3,), (2,), (1,), (0,)])
+            self.assertEqual(len(list(repo.iter_columns(['cls_elem_txt'], fetch_size=3))), 20)
+            with self.assertRaises(ValueError):
+                repo.select_columns(['unknown'])
+
+    def test_19_aggregates(self):
+        with repo3.SQLiteRepository(TestEvent, self._db_path) as repo:
+            self.assertEqual(repo.count(), 0)
+            self.assertIsNone(repo.max('event_us'))
+            base = datetime(2021, 5, 1, 12, 0, 0)
+            repo.insert_many([TestEvent(cnt, base + timedelta(hours=cnt))
+                              for cnt in range(1, 11)])
+            self.assertEqual(repo.count(), 10)
+            self.assertEqual(repo.count([('event_id', '>', 7)]), 3)
+            self.assertEqual(repo.sum('event_id'), 55)
+            self.assertEqual(repo.avg('event_id', [('event_id', '<=', 4)]), 2.5)
+            self.assertEqual(repo.min('event_us'), base + timedelta(hours=1))
+            self.assertEqual(repo.max('event_dtm', [('event_us', '<', base + timedelta(hours=5))]),
+                             base + timedelta(hours=4))
+            with self.assertRaises(ValueError):
+                repo.aggregate('MEDIAN', 'event_id')
+        with repo3.SQLiteRepository(TestTable2, self._db_path) as repo:
+            repo.insert_many([TestTable2(cnt % 3) for cnt in range(10)])
+            self.assertEqual(repo.count(group_by=['cls_elem_int']), [(0, 4), (1, 3), (2, 3)])
+            self.assertEqual(repo.max('auto_id', group_by=['cls_elem_int']), [(0, 10), (1, 8), (2, 9)])
+        with repo3.SQLiteRepository(TestTable1, self._db_path) as repo:
+            elements = [TestTable1() for cnt in range(4)]
+            for cnt, t0 in enumerate(elements):
+                t0.random()
+                t0.cls_elem_1 = cnt
+                t0.cls_elem_dec = 1.5 * cnt
+            repo.insert_many(elements)
+            self.assertEqual(repo.sum('cls_elem_dec'), Decimal('9'))
+            self.assertIsInstance(repo.sum('cls_elem_dec'), Decimal)
+            self.assertEqual(repo.avg('cls_elem_dec', group_by=['cls_elem_1'])[1], (1, Decimal('1.5')))
+            self.assertIsInstance(repo.avg('cls_elem_int'), float)
+
+    def test_20_large_in_lists(self):
+        with repo3.SQLiteRepository(TestTable1, self._db_path) as repo:
+            elements = []
+            for cnt in range(1000):
+                t0 = TestTable1()
+                t0.random()
+                t0.cls_elem_1 = cnt
+                elements.append(t0)
+            repo.insert_many(elements)
+            stmt_3 = TestTable1().select_where_statement([('cls_elem_1', 'IN', [1, 2, 3])])
+            stmt_4 = TestTable1().select_where_statement([('cls_elem_1', 'IN', [4, 5, 6, 7])])
+            self.assertEqual(stmt_3.stmt_text, stmt_4.stmt_text)
+            self.assertEqual(stmt_3.stmt_params, [1, 2, 3, 3])
+            self.assertEqual(len(repo.select_where([('cls_elem_1', 'IN', [1, 2, 3])])), 3)
+            key_list = list(range(0, 2000, 3))
+            self.assertIn('json_each', TestTable1().select_where_statement([('cls_elem_1', 'IN', key_list)]).stmt_text)
+            self.assertEqual(len(repo.select_where([('cls_elem_1', 'IN', key_list)])), 334)
+            self.assertEqual(len(repo.select_where([('cls_elem_1', 'NOT IN', key_list)])), 666)
+            self.assertEqual(len(repo.select_where([('cls_elem_1', 'IN', [])])), 0)
+            self.assertEqual(len(repo.select_where([('cls_elem_1', 'NOT IN', [])])), 1000)
+        with repo3.SQLiteRepository(TestTable2, self._db_path) as repo:
+            repo.insert_many([TestTable2(cnt) for cnt in range(50000)])
+            self.assertEqual(repo.count([('auto_id', 'IN', list(range(1, 100001, 2)))]), 25000)
+
+    def test_21_slotted(self):
+        @rep_elem.slotted(extra_slots=('_rnd',))
+        class SlottedTable1(rep_elem.RepositoryElement):
+            _attribute_map = TestTable1._attribute_map
+            random = TestTable1.random
+            _randtxt = TestTable1._randtxt
+
+            def __init__(self):
+                super().__init__()
+                self._rnd = random.Random()
+                self.cls_elem_int = -1
+
+        with self.assertRaises(ValueError):
+            rep_elem.slotted(type('SubTable1', (TestTable1,), {}))
+        t0 = SlottedTable1()
+        self.assertFalse(hasattr(t0, '__dict__'))
+        self.assertEqual(t0.cls_elem_int, -1)
+        t0.random()
+        with repo3.SQLiteRepository(SlottedTable1, self._db_path) as repo:
+            self.assertEqual(repo.insert(t0), 1)
+            t1 = repo.select_by_key(t0)
+            self.assertIsInstance(t1, SlottedTable1)
+            self.assertFalse(hasattr(t1, '__dict__'))
+            self.assertEqual((t1.cls_elem_2, t1.cls_elem_dtm), (t0.cls_elem_2, t0.cls_elem_dtm))
+            t0.cls_elem_txt = 'slotted'
+            self.assertEqual(repo.update(t0), 1)
+            self.assertEqual(repo.select_columns(['cls_elem_txt'], named=False), [('slotted',)])
+    def test_22_select_columnar(self):
+        with repo3.SQLiteRepository(TestTable2, self._db_path) as repo:
+            elements = [TestTable2(cnt) for cnt in range(25)]
+            for t0 in elements:
+                t0.cls_elem_dec = t0.cls_elem_int / 2
+            elements[12].cls_elem_dec = None
+            repo.insert_many(elements)
+            cols = repo.select_columnar(['auto_id', 'cls_elem_dec', 'cls_elem_txt'], [('auto_id', '<=', 20)],
+                                        fetch_size=7, use_numpy=False)
+            self.assertEqual(list(cols.keys()), ['auto_id', 'cls_elem_dec', 'cls_elem_txt'])
+            self.assertIsInstance(cols['auto_id'], array)
+            self.assertEqual(cols['auto_id'].typecode, 'q')
+            self.assertEqual(list(cols['auto_id']), list(range(1, 21)))
+            self.assertEqual(cols['cls_elem_dec'][9], 4.5)
+            self.assertIsInstance(cols['cls_elem_txt'], list)
+            cols = repo.select_columnar(['cls_elem_dec'], fetch_size=2, use_numpy=False)
+            self.assertIsInstance(cols['cls_elem_dec'], list)
+            self.assertEqual(cols['cls_elem_dec'][10:14], [5.0, 5.5, None, 6.5])
+            self.assertEqual(len(cols['cls_elem_dec']), 25)
+            if repo3.numpy is None:
+                with self.assertRaises(ValueError):
+                    repo.select_columnar(['auto_id'], use_numpy=True)
+            else:
+                self.assertEqual(repo.select_columnar(['auto_id'])['auto_id'].sum(), 325)
+
+    def test_23_change_tracking(self):
+        class TrackedTable2(TestTable2):
+            _track_changes = True
+
+        with repo3.SQLiteRepository(TrackedTable2, self._db_path) as repo:
+            repo.insert_many([TrackedTable2(cnt) for cnt in range(10)])
+            t0 = TrackedTable2(100)
+            repo.insert(t0)
+            self.assertEqual(t0.changed_attributes(), [])
+            self.assertEqual(repo.update(t0), 0)
+            elements = repo.select_all()
+            self.assertEqual(elements[0].changed_attributes(), [])
+            self.assertFalse(elements[0].has_changes())
+            self.assertEqual(elements[0].update_statement().stmt_text, TrackedTable2._compiled_map().update_text)
+            elements[0].cls_elem_int = 42
+            self.assertEqual(elements[0].changed_attributes(), ['cls_elem_int'])
+            upd_stmt = elements[0].update_statement()
+            self.assertEqual(upd_stmt.stmt_text.replace(' ', ''), 'UPDATEtest_table_2SETtest_elem_int=?WHEREauto_elem_1=?')
+            self.assertEqual(upd_stmt.stmt_params, [42, 1])
+            self.assertTrue(elements[0].has_changes())
+            self.assertEqual(repo.update(elements[0]), 1)
+            self.assertFalse(elements[0].has_changes())
+            for t1 in elements[1:6]:
+                t1.cls_elem_txt = 'changed'
+            elements[2].cls_elem_dec = -1.0
+            self.assertEqual(repo.update_many(elements), 5)
+            self.assertEqual(repo.update_many(elements), 0)
+            twice = TrackedTable2(7)
+            twice.auto_id = elements[7].auto_id
+            elements[7].cls_elem_txt = 'first'
+            twice.cls_elem_txt = 'second'
+            elements[8].cls_elem_txt = 'other'
+            self.assertEqual(repo.update_many([elements[7], elements[8], twice]), 3)
+            self.assertEqual(repo.select_by_key(twice).cls_elem_txt, 'second')
+            self.assertEqual(repo.count([('cls_elem_txt', '=', 'changed')]), 5)
+            self.assertEqual(repo.select_by_key(elements[2]).cls_elem_dec, -1.0)
+            # elements of a rolled back batch are dirty again
+            elements[3].cls_elem_txt = 'rolled back'
+            elements[4].cls_elem_int = None
+            with self.assertRaises(sqlite3.IntegrityError):
+                repo.update_many([elements[3], elements[4]], chunk_size = 1)
+            self.assertEqual(elements[3].changed_attributes(), ['cls_elem_txt'])
+            self.assertEqual(repo.select_by_key(elements[3]).cls_elem_txt, 'changed')
+            # elements updated within a rolled back transaction scope are dirty again
+            with self.assertRaises(RuntimeError):
+                with repo.transaction():
+                    self.assertEqual(repo.update(elements[3]), 1)
+                    self.assertEqual(elements[3].changed_attributes(), [])
+                    raise RuntimeError('rollback')
+            self.assertEqual(elements[3].changed_attributes(), ['cls_elem_txt'])
+            with self.assertRaises(RuntimeError):
+                with repo.transaction():
+                    self.assertEqual(repo.update_many([elements[3]]), 1)
+                    raise RuntimeError('rollback')
+            self.assertEqual(elements[3].changed_attributes(), ['cls_elem_txt'])
+            self.assertEqual(repo.update(elements[3]), 1)
+            self.assertEqual(repo.select_by_key(elements[3]).cls_elem_txt, 'rolled back')
+            with repo.transaction():
+                elements[5].cls_elem_txt = 'outer'
+                repo.update(elements[5])
+                with self.assertRaises(RuntimeError):
+                    with repo.transaction():
+                        elements[5].cls_elem_txt = 'inner'
+                        repo.update(elements[5])
+                        raise RuntimeError('rollback')
+                self.assertEqual(elements[5].changed_attributes(), ['cls_elem_txt'])
+            self.assertEqual(repo.select_by_key(elements[5]).cls_elem_txt, 'outer')
+            t1 = TrackedTable2(200)
+            with self.assertRaises(RuntimeError):
+                with repo.transaction():
+                    repo.insert(t1)
+                    raise RuntimeError('rollback')
+            self.assertIsNone(t1.auto_id)
+            self.assertEqual(len(t1.changed_attributes()), 3)
+            elements[6].cls_elem_txt = 'dirty'
+            elements[6].mark_dirty()
+            self.assertEqual(len(elements[6].changed_attributes()), 3)
+
+    def test_24_update_delete_where(self):
+        with repo3.SQLiteRepository(TestTable2, self._db_path) as repo:
+            repo.insert_many([TestTable2(cnt % 5) for cnt in range(50)])
+            repo.enable_key_cache()
+            t0 = repo.select_by_key(repo.select_all()[0])
+            self.assertEqual(repo.update_where([('cls_elem_int', '=', 0)], {'cls_elem_txt': 'zero', 'cls_elem_dec': None}), 10)
+            self.assertEqual(len(repo.key_cache), 0)
+            self.assertEqual(repo.select_by_key(t0).cls_elem_txt, 'zero')
+            self.assertEqual(repo.count([('cls_elem_dec', 'IS NULL')]), 10)
+            with self.assertRaises(ValueError):
+                repo.update_where([], {'unknown': 1})
+            with self.assertRaises(ValueError):
+                repo.update_where([], {'auto_id': 1})
+            upd_stmt = TestTable2().update_where_statement([('cls_elem_int', '=', 0)], {'cls_elem_txt': ['a', 'b']})
+            self.assertEqual(upd_stmt.stmt_params, [['a', 'b'], 0])
+            self.assertEqual(repo.delete_where(rep_elem.WhereOr(('cls_elem_int', '=', 1), ('cls_elem_txt', '=', 'zero'))), 20)
+            self.assertEqual(repo.count(), 30)
+            with self.assertRaises(RuntimeError):
+                with repo.transaction():
+                    repo.delete_where([])
+                    self.assertEqual(repo.count(), 0)
+                    raise RuntimeError('rollback')
+            self.assertEqual(repo.count(), 30)
+            self.assertEqual(repo.delete_where([('cls_elem_int', 'IN', [2, 3])]), 20)
+            self.assertEqual(repo.count(), 10)
+
+    def test_25_parallel_scan(self):
+        with repo3.SQLiteRepository(TestTable2, self._db_path) as repo:
+            self.assertEqual(repo.parallel_scan(sum_cls_elem_int), [])
+            repo.insert_many([TestTable2(cnt) for cnt in range(1000)])
+            repo.delete_where([('cls_elem_int', 'BETWEEN', [100, 199])])
+            self.assertEqual(repo.parallel_scan(sum_cls_elem_int, add_pairs, num_partitions=4),
+                             (900, sum(range(1000)) - sum(range(100, 200))))
+            parts = repo.parallel_scan(sum_cls_elem_int, where_criteria=[('cls_elem_int', '<', 500)], num_partitions=3)
+            self.assertEqual(len(parts), 3)
+            self.assertEqual(add_pairs(*parts[:2]), (400, sum(range(100)) + sum(range(200, 500))))
+            self.assertEqual(parts[2], (0, 0))
+            self.assertEqual(repo.parallel_scan(sum_cls_elem_int, add_pairs, num_partitions=2, initial=(1, 1)),
+                             (901, sum(range(1000)) - sum(range(100, 200)) + 1))
+            self.assertEqual(repo.parallel_scan(sum_cls_elem_int, lambda acc, part: [part] if acc is None else acc + [part],
+                                                where_criteria=[('cls_elem_int', '<', 500)], num_partitions=3,
+                                                initial=None), parts)
+
+    def test_26_snapshot(self):
+        with repo3.SQLiteRepository(TestTable2, self._db_path) as repo:
+            repo.insert_many([TestTable2(cnt) for cnt in range(10)])
+            snapshot = repo.enable_snapshot()
+            self.assertEqual(repo.count(), 10)
+            self.assertEqual(snapshot.refresh_count, 1)
+            elements = repo.select_where([('cls_elem_int', '<', 5)])
+            self.assertEqual(len(elements), 5)
+            self.assertEqual(repo.select_by_key(elements[3]).cls_elem_int, 3)
+            self.assertEqual(snapshot.refresh_count, 1)
+            # writes go to the database file and mark the snapshot as stale
+            repo.delete_where([('cls_elem_int', '>=', 5)])
+            self.assertEqual(repo.count(), 5)
+            self.assertEqual(snapshot.refresh_count, 2)
+            # reads within a transaction see the uncommitted changes
+            with repo.transaction():
+                repo.insert(TestTable2(100))
+                self.assertEqual(repo.count(), 6)
+                self.assertEqual(snapshot.refresh_count, 2)
+            self.assertEqual(repo.count(), 6)
+            self.assertEqual(snapshot.refresh_count, 3)
+            # commits of other connections are detected by the data version
+            with repo3.SQLiteRepository(TestTable2, self._db_path) as other_repo:
+                other_repo.delete_where([('cls_elem_int', '=', 100)])
+            self.assertEqual(repo.count(), 5)
+            self.assertEqual(snapshot.refresh_count, 4)
+            # writes of other repositories sharing the connection are detected by the data version
+            with repo3.SQLiteRepository(TestTable2, sql_connection=repo._connection()) as same_conn_repo:
+                same_conn_repo.insert(TestTable2(101))
+            self.assertEqual(repo.count(), 6)
+            self.assertEqual(snapshot.refresh_count, 5)
+            # only the table of the repository is copied, including its indexes
+            mem_connection = snapshot.connection(repo._connection())
+            self.assertEqual(snapshot.refresh_count, 5)
+            self.assertEqual([row[0] for row in mem_connection.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite%'")], ['test_table_2'])
+            # the version is kept for the database file, so that other connections share the copy
+            with repo3.SQLiteRepository(TestTable2, self._db_path) as other_repo:
+                self.assertIs(snapshot.connection(other_repo._connection()), mem_connection)
+                self.assertEqual(snapshot.refresh_count, 5)
+                other_repo.insert(TestTable2(102))
+            self.assertEqual(repo.count(), 7)
+            self.assertEqual(snapshot.refresh_count, 6)
+            repo.disable_snapshot()
+            self.assertEqual(repo.count(), 7)
+            snapshot.close()
+        clock_value = [0.0]
+        snapshot = SQLiteSnapshot(refresh_interval=10, check_data_version=False, clock=lambda: clock_value[0])
+        with repo3.SQLiteRepository(TestTable2, self._db_path) as repo:
+            repo.enable_snapshot(snapshot=snapshot)
+            self.assertEqual(len(repo.select_all()), 7)
+            with repo3.SQLiteRepository(TestTable2, self._db_path) as other_repo:
+                other_repo.delete_where([('cls_elem_int', '>=', 0)])
+            self.assertEqual(len(repo.select_all()), 7)
+            clock_value[0] = 10.0
+            self.assertEqual(len(repo.select_all()), 0)
+            self.assertEqual(snapshot.refresh_count, 2)
+        # a failed refresh leaves the previous copy stale
+        snapshot = SQLiteSnapshot(tables=['test_table_2'])
+        sql_connection = sqlite3.connect(self._db_path)
+        self.assertIsNotNone(snapshot.connection(sql_connection))
+        sql_connection.execute('ALTER TABLE test_table_2 RENAME TO test_table_2_old')
+        sql_connection.commit()
+        snapshot.invalidate()
+        for _ in range(2):
+            with self.assertRaises(ValueError):
+                snapshot.connection(sql_connection)
+        self.assertEqual(snapshot.refresh_count, 1)
+        sql_connection.execute('ALTER TABLE test_table_2_old RENAME TO test_table_2')
+        sql_connection.commit()
+        snapshot.connection(sql_connection)
+        self.assertEqual(snapshot.refresh_count, 2)
+        snapshot.close()
+        sql_connection.close()
+
+    def test_27_result_cache(self):
+        with repo3.SQLiteRepository(TestTable2, self._db_path) as repo:
+            repo.insert_many([TestTable2(cnt) for cnt in range(10)])
+            cache = repo.enable_result_cache(max_size=10)
+            self.assertEqual(len(repo.select_where([('cls_elem_int', '<', 5)])), 5)
+            self.assertEqual(repo.count(), 10)
+            elements = repo.select_where([('cls_elem_int', '<', 5)])
+            self.assertEqual(repo.count(), 10)
+            self.assertEqual(cache.hits, 2)
+            # every hit creates new elements
+            elements[0].cls_elem_int = -1
+            self.assertEqual(repo.select_where([('cls_elem_int', '<', 5)])[0].cls_elem_int, 0)
+            # writes through the repository clear the cache
+            repo.delete(elements[1])
+            self.assertEqual(len(cache), 0)
+            self.assertEqual(repo.count(), 9)
+            # writes through other repositories and connections are detected
+            with repo3.SQLiteRepository(TestTable2, sql_connection=repo._connection()) as same_conn_repo:
+                same_conn_repo.delete_where([('cls_elem_int', '=', 2)])
+            self.assertEqual(repo.count(), 8)
+            with repo3.SQLiteRepository(TestTable2, self._db_path) as other_repo:
+                other_repo.delete_where([('cls_elem_int', '=', 3)])
+            self.assertEqual(repo.count(), 7)
+            # results are neither cached nor taken from the cache within a transaction
+            with repo.transaction():
+                repo.insert(TestTable2(100))
+                self.assertEqual(repo.count(), 8)
+                self.assertEqual(len(cache), 0)
+            self.assertEqual(repo.count(), 8)
+            self.assertEqual(cache.hits, 3)
+            repo.disable_result_cache()
+            self.assertEqual(repo.count(), 8)
+
+    def test_28_monitor(self):
+        with repo3.SQLiteRepository(TestTable2, self._db_path) as repo:
+            monitor = repo.enable_monitor()
+            events = []
+            monitor.add_hook(events.append)
+            t0 = TestTable2(1)
+            repo.insert(t0)
+            self.assertEqual(len(events), 1)
+            self.assertTrue(events[0].stmt_text.startswith('INSERT'))
+            self.assertEqual((events[0].param_count, events[0].row_count), (3, 1))
+            self.assertGreater(events[0].commit_time, 0.0)
+            repo.insert_many([TestTable2(cnt) for cnt in range(2, 10)])
+            self.assertEqual(len(repo.select_where([('cls_elem_int', 'IN', [1, 2, 3])])), 3)
+            self.assertEqual(len(repo.select_where([('cls_elem_int', 'IN', [1, 2, 3, 4, 5])])), 5)
+            self.assertEqual(events[-1].row_count, 5)
+            self.assertGreater(events[-1].fetch_time, 0.0)
+            self.assertGreater(events[-1].load_time, 0.0)
+            self.assertEqual(len([t0 for t0 in repo.iter_all(fetch_size=3)]), 9)
+            self.assertEqual((events[-1].row_count, events[-1].commit_time), (9, 0.0))
+            self.assertEqual(repo.count(), 9)
+            stats = monitor.statistics()
+            in_list_stats = [value for shape, value in stats.items() if ' IN ( ?, ... )' in shape]
+            self.assertEqual(len(in_list_stats), 1)
+            self.assertEqual((in_list_stats[0]['count'], in_list_stats[0]['row_count']), (2, 8))
+            self.assertEqual(sum([value['count'] for value in stats.values()]), len(events))
+            # slow statements are logged
+            monitor.slow_threshold = 0.0
+            with self.assertLogs('wp_repository', level='WARNING') as log_ctx:
+                repo.select_by_key(t0)
+            self.assertEqual(len(log_ctx.output), 1)
+            self.assertIn('Slow statement', log_ctx.output[0])
+            # statements differing only in literals share a shape; the number of shapes is bounded
+            monitor = StatementMonitor(max_shapes=2)
+            repo.enable_monitor(monitor=monitor)
+            for cnt in range(5):
+                repo.query(SQLStatement('SELECT * FROM test_table_2 WHERE test_elem_int = {}'.format(cnt)))
+                repo.query(SQLStatement("SELECT * FROM test_table_2 WHERE test_elem_txt = 'a''{}'".format(cnt)))
+                repo.query(SQLStatement('SELECT * FROM test_table_2 WHERE auto_elem_1 = {}'.format(cnt)))
+            stats = monitor.statistics()
+            self.assertEqual(len(stats), 3)
+            self.assertEqual(stats['SELECT * FROM test_table_2 WHERE test_elem_int = ?']['count'], 5)
+            self.assertEqual(stats['SELECT * FROM test_table_2 WHERE test_elem_txt = ?']['count'], 5)
+            self.assertEqual(stats[OTHER_STATEMENTS]['count'], 5)
+            repo.disable_monitor()
+            num_events = len(events)
+            repo.select_all()
+            self.assertEqual(len(events), num_events)
+
+
+class Test3AsyncRepository(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        super().setUp()
+        self._db_path = 'test_db_{}.sl3'.format(datetime.now().strftime("%Y%m%d%H%M%S.%f"))
+        create_test_db(self._db_path)
+
+    def tearDown(self):
+        super().tearDown()
+        os.remove(self._db_path)
+
+    async def test_01_async(self):
+        async with repo_async.AsyncSQLiteRepository(TestTable2, self._db_path) as repo:
+            elements = [TestTable2(cnt) for cnt in range(50)]
+            num_rec = sum(await asyncio.gather(*[repo.insert(t0) for t0 in elements[:10]]))
+            num_rec += await repo.insert_many(elements[10:])
+            self.assertEqual(num_rec, sum([t0.auto_id for t0 in elements[:10]]) + 40)
+            t1 = await repo.select_by_key(elements[20])
+            self.assertEqual(t1.cls_elem_int, 20)
+            t1.cls_elem_int = -20
+            self.assertEqual(await repo.update(t1), 1)
+            self.assertEqual(len(await repo.select_where([('cls_elem_int', '<', 0)])), 1)
+            rec_list = [t0 async for t0 in repo.iter_all(fetch_size = 7)]
+            self.assertEqual(len(rec_list), 50)
+            rec_iter = repo.iter_where([('cls_elem_int', '>', 10)], fetch_size = 5)
+            async for t0 in rec_iter:
+                break
+            await rec_iter.aclose()
+            self.assertEqual(await repo.delete_many(rec_list), 50)
+            self.assertEqual(len(await repo.select_all()), 0)
+
 
 if __name__ == '__main__':
     unittest.main(verbosity=5)
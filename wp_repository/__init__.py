@@ -24,7 +24,22 @@ if current_path not in sys.path:
     sys.path.append(current_path)
 
 from wp_repository_sl3 import SQLiteRepository
+from wp_repository_sl3 import QueryPlanWarning
+from wp_repository_sl3 import QueryPlanError
+from wp_repository_async import AsyncSQLiteRepository
+from wp_repository_pool import SQLiteConnectionPool
+from wp_repository_pool import register_datetime_types
+from wp_repository_pool import PRAGMA_PROFILES
 from wp_sql_statement import SQLStatement
+from wp_repository_cache import LRUCache
+from wp_repository_snapshot import SQLiteSnapshot
+from wp_repository_monitor import StatementMonitor
+from wp_repository_monitor import StatementEvent
 from wp_repository_elem import AttributeMapping
 from wp_repository_elem import AttributeMap
+from wp_repository_elem import IndexDefinition
+from wp_repository_elem import WhereAnd
+from wp_repository_elem import WhereOr
+from wp_repository_elem import WhereNot
 from wp_repository_elem import RepositoryElement
+from wp_repository_elem import slotted
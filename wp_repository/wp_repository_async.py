@@ -0,0 +1,293 @@
+"""
+    Copyright 2021 Walter Pachlinger (walter.pachlinger@gmail.com)
+
+    Licensed under the EUPL, Version 1.2 or - as soon they will be approved by the European
+    Commission - subsequent versions of the EUPL (the LICENSE). You may not use this work except
+    in compliance with the LICENSE. You may obtain a copy of the LICENSE at:
+
+        https://joinup.ec.europa.eu/software/page/eupl
+
+    Unless required by applicable law or agreed to in writing, software distributed under the
+    LICENSE is distributed on an "AS IS" basis, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+    either express or implied. See the LICENSE for the specific language governing permissions
+    and limitations under the LICENSE.
+"""
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from wp_repository_elem import RepositoryElement
+from wp_repository_sl3 import SQLiteRepository
+from wp_sql_statement import SQLStatement
+
+class AsyncSQLiteRepository:
+    """ asyncio counterpart of SQLiteRepository. All database operations run on a dedicated worker thread
+        owning the SQLite connection, so that the event loop is never blocked. Requests issued concurrently
+        are queued for the worker thread (pipelining); the number of pending requests is bounded.
+
+    Attributes:
+        _sql_file_path : str
+            Full path name of the SQLite database file to open.
+        _repository : SQLiteRepository
+            Synchronous repository used by the worker thread.
+        _executor : ThreadPoolExecutor
+            Single worker thread executing the database operations.
+        _max_pending : int
+            Maximum number of requests waiting for the worker thread.
+        _pending : asyncio.Semaphore
+            Semaphore limiting the number of pending requests (created by "open").
+
+    Methods:
+        AsyncSQLiteRepository()
+            Constructor.
+        __aenter__ : AsyncSQLiteRepository
+            Opens the repository in "async with" statements.
+        __aexit__ : None
+            Closes the repository in "async with" statements.
+        open : None
+            Opens the session to the SQLite database on the worker thread.
+        close : None
+            Closes the session to the SQLite database and stops the worker thread.
+        insert, update, delete, upsert : int
+            See SQLiteRepository.
+        insert_many, update_many, delete_many, upsert_many : int
+            See SQLiteRepository.
+        update_where, delete_where : int
+            See SQLiteRepository.
+        select_by_key : RepositoryElement
+            See SQLiteRepository.
+        select_all, select_where, select_columns, query : list
+            See SQLiteRepository.
+        select_columnar : dict
+            See SQLiteRepository.
+        aggregate : Any
+            See SQLiteRepository.
+        iter_all, iter_where, iter_query : async generator
+            Asynchronous generators yielding the selected elements batch by batch.
+        _run : Any
+            Executes a function on the worker thread and waits for its result.
+        _iter_batches : async generator
+            Pulls batches of elements from a generator of the synchronous repository, prefetching the
+            next batch while the current one is consumed.
+    """
+    def __init__(self, contents_type: type, sqlite_file_path: str, native_datetime: bool = False,
+                 pragmas = None, max_pending: int = 100):
+        """ Constructor.
+
+        Parameters:
+            contents_type : type
+                Class name of the contents type (sub-class of RepositoryElement).
+            sqlite_file_path : str
+                Full path name of the SQLite database file to open.
+            native_datetime : bool, optional
+                See SQLiteRepository. Default value is "False".
+            pragmas : str or dict, optional
+                PRAGMA profile name or dictionary of PRAGMA settings (see SQLiteRepository).
+            max_pending : int, optional
+                Maximum number of requests waiting for the worker thread; further requests wait on the
+                event loop. Default value is 100.
+        """
+        self._sql_file_path = sqlite_file_path
+        self._repository = SQLiteRepository(contents_type, sqlite_file_path, native_datetime=native_datetime,
+                                            pragmas=pragmas)
+        self._executor = None
+        self._max_pending = max_pending
+        self._pending = None
+
+    async def __aenter__(self):
+        """ Opens the repository in "async with" statements.
+
+        Returns:
+            AsyncSQLiteRepository : reference to the opened repository.
+        """
+        await self.open()
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, exc_traceback) -> None:
+        """ Closes the repository in "async with" statements. """
+        await self.close()
+
+    @property
+    def repository(self) -> SQLiteRepository:
+        """ Getter for the synchronous repository. Must only be used by functions executed on the worker
+            thread.
+
+        Returns:
+            SQLiteRepository : repository used by the worker thread.
+        """
+        return self._repository
+
+    async def open(self) -> None:
+        """ Opens the session to the SQLite database on the worker thread. """
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='AsyncSQLiteRepository')
+            self._pending = asyncio.Semaphore(self._max_pending)
+        await self._run(self._repository.open, self._sql_file_path)
+
+    async def close(self) -> None:
+        """ Closes the session to the SQLite database and stops the worker thread. """
+        if self._executor is not None:
+            await self._run(self._repository.close)
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    async def insert(self, element: RepositoryElement, do_commit: bool = True) -> int:
+        """ See SQLiteRepository.insert. """
+        return await self._run(self._repository.insert, element, do_commit)
+
+    async def update(self, element: RepositoryElement, do_commit: bool = True) -> int:
+        """ See SQLiteRepository.update. """
+        return await self._run(self._repository.update, element, do_commit)
+
+    async def delete(self, element: RepositoryElement, do_commit: bool = True) -> int:
+        """ See SQLiteRepository.delete. """
+        return await self._run(self._repository.delete, element, do_commit)
+
+    async def upsert(self, element: RepositoryElement, do_commit: bool = True) -> int:
+        """ See SQLiteRepository.upsert. """
+        return await self._run(self._repository.upsert, element, do_commit)
+
+    async def upsert_many(self, elements, chunk_size: int = 1000, do_commit: bool = True) -> int:
+        """ See SQLiteRepository.upsert_many. """
+        return await self._run(self._repository.upsert_many, list(elements), chunk_size, do_commit)
+
+    async def update_where(self, where_criteria: list, values: dict, do_commit: bool = True) -> int:
+        """ See SQLiteRepository.update_where. """
+        return await self._run(self._repository.update_where, where_criteria, values, do_commit)
+
+    async def delete_where(self, where_criteria: list, do_commit: bool = True) -> int:
+        """ See SQLiteRepository.delete_where. """
+        return await self._run(self._repository.delete_where, where_criteria, do_commit)
+
+    async def insert_many(self, elements, chunk_size: int = 1000, do_commit: bool = True) -> int:
+        """ See SQLiteRepository.insert_many. """
+        return await self._run(self._repository.insert_many, list(elements), chunk_size, do_commit)
+
+    async def update_many(self, elements, chunk_size: int = 1000, do_commit: bool = True) -> int:
+        """ See SQLiteRepository.update_many. """
+        return await self._run(self._repository.update_many, list(elements), chunk_size, do_commit)
+
+    async def delete_many(self, elements, chunk_size: int = 1000, do_commit: bool = True) -> int:
+        """ See SQLiteRepository.delete_many. """
+        return await self._run(self._repository.delete_many, list(elements), chunk_size, do_commit)
+
+    async def select_by_key(self, source_element: RepositoryElement) -> RepositoryElement:
+        """ See SQLiteRepository.select_by_key. """
+        return await self._run(self._repository.select_by_key, source_element)
+
+    async def select_all(self) -> list:
+        """ See SQLiteRepository.select_all. """
+        return await self._run(self._repository.select_all)
+
+    async def select_where(self, where_criteria: list, **kwargs) -> list:
+        """ See SQLiteRepository.select_where. """
+        return await self._run(functools.partial(self._repository.select_where, where_criteria, **kwargs))
+
+    async def select_columns(self, cls_attr_names: list, where_criteria: list = None, **kwargs) -> list:
+        """ See SQLiteRepository.select_columns. """
+        return await self._run(
+            functools.partial(self._repository.select_columns, cls_attr_names, where_criteria, **kwargs))
+
+    async def select_columnar(self, cls_attr_names: list, where_criteria: list = None, **kwargs) -> dict:
+        """ See SQLiteRepository.select_columnar. """
+        return await self._run(
+            functools.partial(self._repository.select_columnar, cls_attr_names, where_criteria, **kwargs))
+
+    async def aggregate(self, function: str, cls_attr_name: str = None, where_criteria: list = None,
+                        group_by: list = None):
+        """ See SQLiteRepository.aggregate. """
+        return await self._run(self._repository.aggregate, function, cls_attr_name, where_criteria, group_by)
+
+    async def query(self, query: SQLStatement) -> list:
+        """ See SQLiteRepository.query. """
+        return await self._run(self._repository.query, query)
+
+    def iter_all(self, fetch_size: int = 500):
+        """ Asynchronous generator yielding all entries of the repository, sorted by their key attributes.
+
+        Parameters:
+            fetch_size : int, optional
+                Number of elements transferred from the worker thread at once. Default value is 500.
+        """
+        return self._iter_batches(self._repository.iter_all, fetch_size)
+
+    def iter_where(self, where_criteria: list, fetch_size: int = 500, **kwargs):
+        """ Asynchronous generator yielding all entries of the repository matching the given criteria.
+
+        Parameters:
+            where_criteria : list
+                List containing the criteria for selecting repository elements (see SQLiteRepository).
+            fetch_size : int, optional
+                Number of elements transferred from the worker thread at once. Default value is 500.
+            kwargs : dict
+                "order_by", "limit", "offset" and "distinct" (see SQLiteRepository.select_where).
+        """
+        return self._iter_batches(
+            functools.partial(self._repository.iter_where, where_criteria, **kwargs), fetch_size)
+
+    def iter_query(self, query: SQLStatement, fetch_size: int = 500):
+        """ Asynchronous generator yielding the records selected by any SQL SELECT statement.
+
+        Parameters:
+            query : SQLStatement
+                SQL SELECT statement to be executed.
+            fetch_size : int, optional
+                Number of elements transferred from the worker thread at once. Default value is 500.
+        """
+        return self._iter_batches(functools.partial(self._repository.iter_query, query), fetch_size)
+
+    async def _run(self, func, *args):
+        """ Executes a function on the worker thread and waits for its result.
+
+        Parameters:
+            func : function
+                Function to be executed.
+            args : list
+                Positional arguments of the function.
+
+        Returns:
+            Any : result of the function.
+        """
+        if self._executor is None:
+            raise RuntimeError('AsyncSQLiteRepository is not open')
+        async with self._pending:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, functools.partial(func, *args))
+
+    async def _iter_batches(self, iter_factory, fetch_size: int):
+        """ Pulls batches of elements from a generator of the synchronous repository, prefetching the next
+            batch while the current one is consumed. The generator (and its cursor) is closed on the worker
+            thread when the asynchronous generator finishes or is closed.
+
+        Parameters:
+            iter_factory : function
+                Function creating the generator of the synchronous repository; called with "fetch_size".
+            fetch_size : int
+                Number of elements per batch.
+
+        Yields:
+            RepositoryElement : next selected element.
+        """
+        elem_iter = await self._run(iter_factory, fetch_size)
+        next_batch = None
+        try:
+            next_batch = asyncio.ensure_future(self._run(_take, elem_iter, fetch_size))
+            while True:
+                batch = await next_batch
+                if len(batch) == 0:
+                    next_batch = None
+                    break
+                next_batch = asyncio.ensure_future(self._run(_take, elem_iter, fetch_size))
+                for element in batch:
+                    yield element
+        finally:
+            if next_batch is not None:
+                try:
+                    await next_batch
+                except Exception:  # pylint: disable=broad-except
+                    pass
+            await self._run(elem_iter.close)
+
+
+def _take(elem_iter, count: int) -> list:
+    """ Returns the next "count" elements of an iterator as a list (empty list if it is exhausted). """
+    return list(islice(elem_iter, count))
@@ -0,0 +1,184 @@
+"""
+    Copyright 2021 Walter Pachlinger (walter.pachlinger@gmail.com)
+
+    Licensed under the EUPL, Version 1.2 or - as soon they will be approved by the European
+    Commission - subsequent versions of the EUPL (the LICENSE). You may not use this work except
+    in compliance with the LICENSE. You may obtain a copy of the LICENSE at:
+
+        https://joinup.ec.europa.eu/software/page/eupl
+
+    Unless required by applicable law or agreed to in writing, software distributed under the
+    LICENSE is distributed on an "AS IS" basis, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+    either express or implied. See the LICENSE for the specific language governing permissions
+    and limitations under the LICENSE.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any
+
+class LRUCache:
+    """ Bounded, thread-safe cache evicting the least recently used entry when it is full. Entries
+        optionally expire after a fixed time to live.
+
+    Attributes:
+        _max_size : int
+            Maximum number of entries held in the cache.
+        _ttl : float
+            Time to live of an entry in seconds, or None if entries do not expire.
+        _clock : function
+            Function returning the current time in seconds (default: time.monotonic).
+        _entries : OrderedDict
+            Cached entries (key -> (expiry time, value)), least recently used first.
+        _lock : threading.Lock
+            Lock serializing the access to the entries.
+        _hits : int
+            Number of successful lookups.
+        _misses : int
+            Number of failed lookups (including expired entries).
+        _evictions : int
+            Number of entries removed because the cache was full.
+
+    Properties:
+        hits : int
+            Getter for the "_hits" instance attribute.
+        misses : int
+            Getter for the "_misses" instance attribute.
+        statistics : dict
+            Returns the hit/miss statistics of the cache.
+
+    Methods:
+        LRUCache()
+            Constructor.
+        __len__ : int
+            Returns the number of entries currently held in the cache.
+        get : Any
+            Returns the value cached for a key.
+        put : None
+            Adds or replaces the value cached for a key.
+        invalidate : None
+            Removes the entry for a key from the cache.
+        clear : None
+            Removes all entries from the cache.
+    """
+    _NOT_FOUND = object()
+
+    def __init__(self, max_size: int = 1000, ttl: float = None, clock = time.monotonic):
+        """ Constructor.
+
+        Parameters:
+            max_size : int, optional
+                Maximum number of entries held in the cache. Default value is 1000.
+            ttl : float, optional
+                Time to live of an entry in seconds. Default value is None (entries do not expire).
+            clock : function, optional
+                Function returning the current time in seconds. Default is "time.monotonic".
+        """
+        if max_size < 1:
+            raise ValueError('Invalid cache size: {}'.format(max_size))
+        self._max_size = max_size
+        self._ttl = ttl
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def __len__(self) -> int:
+        """ Returns the number of entries currently held in the cache. """
+        return len(self._entries)
+
+    @property
+    def hits(self) -> int:
+        """ Getter for the "_hits" instance attribute.
+
+        Returns:
+            int : number of successful lookups.
+        """
+        return self._hits
+
+    @property
+    def misses(self) -> int:
+        """ Getter for the "_misses" instance attribute.
+
+        Returns:
+            int : number of failed lookups.
+        """
+        return self._misses
+
+    @property
+    def statistics(self) -> dict:
+        """ Returns the hit/miss statistics of the cache.
+
+        Returns:
+            dict : number of hits, misses and evictions, the current size and the hit ratio.
+        """
+        lookups = self._hits + self._misses
+        return {
+            'hits': self._hits,
+            'misses': self._misses,
+            'evictions': self._evictions,
+            'size': len(self._entries),
+            'max_size': self._max_size,
+            'hit_ratio': self._hits / lookups if lookups > 0 else 0.0
+        }
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        """ Returns the value cached for a key and marks the entry as most recently used.
+
+        Parameters:
+            key : Any
+                Key of the entry (must be hashable).
+            default : Any, optional
+                Value to be returned if the key is not cached or the entry has expired.
+
+        Returns:
+            Any : cached value, or the default value.
+        """
+        with self._lock:
+            entry = self._entries.get(key, LRUCache._NOT_FOUND)
+            if entry is LRUCache._NOT_FOUND:
+                self._misses += 1
+                return default
+            expires, value = entry
+            if expires is not None and expires <= self._clock():
+                del self._entries[key]
+                self._misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return value
+
+    def put(self, key: Any, value: Any) -> None:
+        """ Adds or replaces the value cached for a key. Evicts the least recently used entry if the
+            cache is full.
+
+        Parameters:
+            key : Any
+                Key of the entry (must be hashable).
+            value : Any
+                Value to be cached.
+        """
+        expires = None if self._ttl is None else self._clock() + self._ttl
+        with self._lock:
+            self._entries[key] = (expires, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_size:
+                self._entries.popitem(last = False)
+                self._evictions += 1
+
+    def invalidate(self, key: Any) -> None:
+        """ Removes the entry for a key from the cache.
+
+        Parameters:
+            key : Any
+                Key of the entry.
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        """ Removes all entries from the cache. """
+        with self._lock:
+            self._entries.clear()
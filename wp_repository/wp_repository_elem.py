@@ -12,11 +12,62 @@
     either express or implied. See the LICENSE for the specific language governing permissions
     and limitations under the LICENSE.
 """
+import inspect
+import json
 import sqlite3
-from datetime import datetime
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone
+from operator import attrgetter
 from typing import Any
 from wp_sql_statement import SQLStatement
 
+EPOCH = datetime(1970, 1, 1)
+
+def parse_datetime(db_attr_value: str) -> datetime:
+    """ Converts a timestamp stored as text ("YYYY-MM-DD HH:MM:SS[.ffffff]") into a datetime object.
+        Uses "datetime.fromisoformat" and falls back to "datetime.strptime" for texts it does not accept.
+
+    Parameters:
+        db_attr_value : str
+            Timestamp text read from the database.
+
+    Returns:
+        datetime : the converted timestamp.
+    """
+    try:
+        return datetime.fromisoformat(db_attr_value)
+    except ValueError:
+        if db_attr_value.find(".") >= 0:
+            return datetime.strptime(db_attr_value, "%Y-%m-%d %H:%M:%S.%f")
+        return datetime.strptime(db_attr_value, "%Y-%m-%d %H:%M:%S")
+
+def datetime_to_epoch_us(cls_attr_value: datetime) -> int:
+    """ Converts a datetime object into the number of microseconds since 1970-01-01 00:00:00. Timezone
+        aware values are converted to UTC first.
+
+    Parameters:
+        cls_attr_value : datetime
+            Timestamp to be converted.
+
+    Returns:
+        int : microseconds since the epoch.
+    """
+    if cls_attr_value.tzinfo is not None:
+        cls_attr_value = cls_attr_value.astimezone(timezone.utc).replace(tzinfo=None)
+    return (cls_attr_value - EPOCH) // timedelta(microseconds=1)
+
+def epoch_us_to_datetime(db_attr_value: int) -> datetime:
+    """ Converts a number of microseconds since 1970-01-01 00:00:00 into a (naive) datetime object.
+
+    Parameters:
+        db_attr_value : int
+            Microseconds since the epoch.
+
+    Returns:
+        datetime : the converted timestamp.
+    """
+    return EPOCH + timedelta(microseconds=db_attr_value)
+
 class AttributeMapping:
     """ Definition of the mapping between a column in a database table and an attribute of
         a python class (sub-class of RepositoryElement).
@@ -39,6 +90,8 @@ class AttributeMapping:
             Specifies whether or not the database attribute shall be included in INSERT statements.
         _inc_update : bool
             Specifies whether or not the database attribute shall be included in UPDATE statements.
+        _db_storage : str
+            Storage format of the database attribute, if it differs from the default (see "DB_STORAGE_...").
 
     Properties:
         select_rank : int
@@ -59,16 +112,23 @@ class AttributeMapping:
         include_in_select : bool
             Indicates whether or not the database attribute shall appear on the select list of a
             SELECT statement.
+        db_storage : str
+            Getter for the "_db_storage" instance attribute.
 
     Methods:
         AttributeMapping():
             Constructor.
+        db_value : Any
+            Converts the value of the class attribute into the value to be stored in the database.
         by_rank : int, static
             Returns the "select_rank" attribute of an "AttributeMapping" instance. Needed for sorting
             a list of "AttributeMapping" objects for correctly composing a SELECT statement.
     """
+    DB_STORAGE_EPOCH_US = 'epoch_us'
+
     def __init__(self, select_rank: int, cls_attr_name: str, db_attr_name: str, cls_attr_type: type = str,
-                 db_key: int = 0, include_in_insert: bool = True, include_in_update: bool = True):
+                 db_key: int = 0, include_in_insert: bool = True, include_in_update: bool = True,
+                 db_storage: str = None):
         """ Constructor.
 
         Parameters:
@@ -91,8 +151,16 @@ class AttributeMapping:
                 Specifies whether or not the database attribute shall be included in INSERT statements.
             include_in_update : bool, optional
                 Specifies whether or not the database attribute shall be included in UPDATE statements.
+            db_storage : str, optional
+                Storage format of the database attribute. Legal values are:
+                    None ....... the value is stored as is (datetime values as text);
+                    "epoch_us" . datetime value stored as integer microseconds since 1970-01-01 00:00:00.
         """
         # pylint: disable=too-many-arguments
+        if db_storage not in [None, AttributeMapping.DB_STORAGE_EPOCH_US]:
+            raise ValueError('Invalid storage format: "{}"'.format(db_storage))
+        if db_storage is not None and cls_attr_type is not datetime:
+            raise ValueError('Storage format "{}" requires a datetime attribute'.format(db_storage))
         self._select_rank = select_rank
         self._cl_attr_name = cls_attr_name
         self._cl_attr_type = cls_attr_type
@@ -100,6 +168,7 @@ class AttributeMapping:
         self._db_key = db_key
         self._inc_insert = include_in_insert
         self._inc_update = include_in_update
+        self._db_storage = db_storage
 
     @property
     def select_rank(self) -> int:
@@ -184,6 +253,29 @@ class AttributeMapping:
         """
         return self._select_rank >= 0
 
+    @property
+    def db_storage(self) -> str:
+        """ Getter for the "_db_storage" instance attribute.
+
+        Returns:
+            str : storage format of the database attribute, None for the default format.
+        """
+        return self._db_storage
+
+    def db_value(self, cls_attr_value: Any) -> Any:
+        """ Converts the value of the class attribute into the value to be stored in the database.
+
+        Parameters:
+            cls_attr_value : Any
+                Value of the class attribute.
+
+        Returns:
+            Any : value to be passed as statement parameter.
+        """
+        if self._db_storage is None or cls_attr_value is None:
+            return cls_attr_value
+        return datetime_to_epoch_us(cls_attr_value)
+
     @staticmethod
     def by_rank(mapping: object) -> int:
         """ Returns the "select_rank" attribute of an "AttributeMapping" instance. Needed for sorting
@@ -199,6 +291,124 @@ class AttributeMapping:
         return mapping.select_rank
 
 
+class IndexDefinition:
+    """ Declaration of a secondary index on the table underlying an "AttributeMap".
+
+    Attributes:
+        _index_name : str
+            Name of the index in the database.
+        _cls_attr_names : list
+            Names of the class attributes forming the search key of the index, in index order.
+        _unique : bool
+            Indicates whether or not the index is a UNIQUE index.
+        _covering : list
+            Names of further class attributes appended to the index columns, so that queries reading only
+            indexed attributes do not need to access the table (covering index).
+
+    Properties:
+        index_name : str
+            Getter for the "_index_name" instance attribute.
+        class_attr_names : list
+            Getter for the "_cls_attr_names" instance attribute.
+        is_unique : bool
+            Getter for the "_unique" instance attribute.
+        covering_attr_names : list
+            Getter for the "_covering" instance attribute.
+
+    Methods:
+        IndexDefinition()
+            Constructor.
+        db_columns : list
+            Returns the names of the table columns of the index, in index order.
+        create_statement : SQLStatement
+            Creates the SQL statement creating the index if it does not exist.
+    """
+    def __init__(self, index_name: str, cls_attr_names: list, unique: bool = False, covering: list = None):
+        """ Constructor.
+
+        Parameters:
+            index_name : str
+                Name of the index in the database.
+            cls_attr_names : list
+                Names of the class attributes forming the search key of the index, in index order.
+            unique : bool, optional
+                If True, a UNIQUE index is created. Default value is "False".
+            covering : list, optional
+                Names of further class attributes appended to the index columns (covering index).
+        """
+        if not index_name.isidentifier():
+            raise ValueError('Invalid index name: "{}"'.format(index_name))
+        if len(cls_attr_names) == 0:
+            raise ValueError('Index "{}" has no attributes'.format(index_name))
+        self._index_name = index_name
+        self._cls_attr_names = list(cls_attr_names)
+        self._unique = unique
+        self._covering = [] if covering is None else list(covering)
+
+    @property
+    def index_name(self) -> str:
+        """ Getter for the "_index_name" instance attribute.
+
+        Returns:
+            str : name of the index in the database.
+        """
+        return self._index_name
+
+    @property
+    def class_attr_names(self) -> list:
+        """ Getter for the "_cls_attr_names" instance attribute.
+
+        Returns:
+            list : names of the class attributes forming the search key of the index.
+        """
+        return self._cls_attr_names
+
+    @property
+    def is_unique(self) -> bool:
+        """ Getter for the "_unique" instance attribute.
+
+        Returns:
+            bool : True for a UNIQUE index; False otherwise.
+        """
+        return self._unique
+
+    @property
+    def covering_attr_names(self) -> list:
+        """ Getter for the "_covering" instance attribute.
+
+        Returns:
+            list : names of the class attributes appended to the index columns.
+        """
+        return self._covering
+
+    def db_columns(self, attribute_map) -> list:
+        """ Returns the names of the table columns of the index, in index order.
+
+        Parameters:
+            attribute_map : AttributeMap
+                Attribute Map the index is declared in.
+
+        Returns:
+            list : names of the table columns (search key followed by the covering columns).
+        """
+        return [attribute_map[cls_attr_name].db_attr_name
+                for cls_attr_name in self._cls_attr_names + self._covering]
+
+    def create_statement(self, attribute_map) -> SQLStatement:
+        """ Creates the SQL statement creating the index if it does not exist.
+
+        Parameters:
+            attribute_map : AttributeMap
+                Attribute Map the index is declared in.
+
+        Returns:
+            SQLStatement : CREATE [UNIQUE] INDEX IF NOT EXISTS statement.
+        """
+        return SQLStatement('CREATE {}INDEX IF NOT EXISTS {} ON {} ( {} )'.format(
+            'UNIQUE ' if self._unique else '', self._index_name, attribute_map.table_name,
+            ', '.join(self.db_columns(attribute_map))))
+
+
 class AttributeMap:
     """ Defines properties to easily access the elements of a list of "AttributeMapping" entries.
 
@@ -209,6 +419,12 @@ class AttributeMap:
             List of "AttributeMapping" entries.
         _auto_increment_attr : AttributeMapping
             Element of the "_mappings" list that defines an auto-increment key for the underlying table.
+        _by_name : dict
+            Index of the "_mappings" list by class attribute name.
+        _for_select, _for_insert, _for_update, _db_keys : list
+            Filtered "_mappings" lists, computed once when the map is created.
+        _indexes : list
+            "IndexDefinition" entries declaring the secondary indexes of the underlying table.
 
     Properties:
         table_name : str
@@ -228,6 +444,8 @@ class AttributeMap:
             Getter for the list of attributes that are relevant for a SQL UPDATE statement.
         db_key_attributes : list
             Getter for the list of attributes that are part of the primary key of the underlying table.
+        indexes : list
+            Getter for the list of secondary index declarations.
 
     Methods:
         __getitem__ : AttributeMapping
@@ -235,7 +453,7 @@ class AttributeMap:
         _select_mappings : list
             Retrieves all attributes for which a specified bool property returns True.
     """
-    def __init__(self, table_name: str, attribute_mappings: list):
+    def __init__(self, table_name: str, attribute_mappings: list, indexes: list = None):
         self._table_name = table_name
         self._mappings = attribute_mappings
         self._mappings.sort(key = AttributeMapping.by_rank)
@@ -243,6 +461,17 @@ class AttributeMap:
         for mapping in self._mappings:
             if mapping.is_autoincrement_key:
                 self._auto_increment_attr = mapping
+        self._by_name = {mapping.class_attr_name: mapping for mapping in self._mappings}
+        self._for_select = self._select_mappings('include_in_select')
+        self._for_insert = self._select_mappings('include_in_insert')
+        self._for_update = self._select_mappings('include_in_update')
+        self._db_keys = self._select_mappings('is_db_key')
+        self._indexes = [] if indexes is None else list(indexes)
+        for index in self._indexes:
+            for cls_attr_name in index.class_attr_names + index.covering_attr_names:
+                if cls_attr_name not in self._by_name:
+                    raise ValueError('Invalid class attribute name in index "{}": "{}"'.format(
+                        index.index_name, cls_attr_name))
 
     @property
     def table_name(self) -> str:
@@ -289,7 +518,7 @@ class AttributeMap:
         Returns : list
             List of attributes that shall be included in the SELECT clause of an SQL SELECT statement.
         """
-        return self._select_mappings('include_in_select')
+        return self._for_select
 
     @property
     def attributes_for_insert(self) -> list:
@@ -298,7 +527,7 @@ class AttributeMap:
         Returns : list
             List of attributes that shall be included in the SQL INSERT statement.
         """
-        return self._select_mappings('include_in_insert')
+        return self._for_insert
 
     @property
     def attributes_for_update(self) -> list:
@@ -307,7 +536,7 @@ class AttributeMap:
         Returns : list
             List of attributes that shall be included in the SQL UPDATE statement.
         """
-        return self._select_mappings('include_in_update')
+        return self._for_update
 
     @property
     def db_key_attributes(self) -> list:
@@ -316,7 +545,16 @@ class AttributeMap:
         Returns : list
             List of attributes that are part of the table's primary key.
         """
-        return self._select_mappings('is_db_key')
+        return self._db_keys
+
+    @property
+    def indexes(self) -> list:
+        """ Getter for the list of secondary index declarations.
+
+        Returns : list
+            List of "IndexDefinition" entries.
+        """
+        return self._indexes
 
     def __getitem__(self, key_value) -> AttributeMapping:
         """ Accessor for the Attribute Mappings by class attribute name.
@@ -329,10 +567,7 @@ class AttributeMap:
             AttributeMapping
                 Attribute Mapping element with the matching class attribute name. None if not found.
         """
-        for mapping in self._mappings:
-            if mapping.class_attr_name == key_value:
-                return mapping
-        return None
+        return self._by_name.get(key_value)
 
     def _select_mappings(self, bool_attr_name: str) -> list:
         """ Retrieves all attributes for which a specified bool property returns True.
@@ -350,6 +585,430 @@ class AttributeMap:
                 mappings.append(mapping)
         return mappings
 
+class WhereExpression:
+    """ Node of a composite selection criterion, compiled into a parameterized WHERE clause by
+        "RepositoryElement.select_where_statement". The operands are criteria tuples
+        (class_attribute_name, operator, value) or nested expressions.
+
+    Attributes:
+        operator : str
+            Logical operator joining the operands ("AND", "OR", "NOT").
+        terms : list
+            Operands of the expression.
+
+    Methods:
+        WhereExpression()
+            Constructor.
+        __len__ : int
+            Returns the number of operands.
+    """
+    operator = ''
+
+    def __init__(self, *terms):
+        """ Constructor.
+
+        Parameters:
+            terms : list
+                Operands of the expression (criteria tuples or nested expressions).
+        """
+        if len(terms) == 0:
+            raise ValueError('{} expression without operands'.format(self.operator))
+        self.terms = list(terms)
+
+    def __len__(self) -> int:
+        """ Returns the number of operands. """
+        return len(self.terms)
+
+
+class WhereAnd(WhereExpression):
+    """ Criterion matching if all operands match. """
+    operator = 'AND'
+
+
+class WhereOr(WhereExpression):
+    """ Criterion matching if at least one operand matches. """
+    operator = 'OR'
+
+
+class WhereNot(WhereExpression):
+    """ Criterion matching if its single operand does not match. """
+    operator = 'NOT'
+
+    def __init__(self, term):
+        """ Constructor.
+
+        Parameters:
+            term : tuple or WhereExpression
+                The negated criterion.
+        """
+        super().__init__(term)
+
+
+def _json_value(db_value: Any) -> Any:
+    """ Converts a statement parameter that is not supported by the JSON encoder, in the same way as the
+        sqlite3 module stores it (datetime values as ISO 8601 text).
+
+    Parameters:
+        db_value : Any
+            Statement parameter.
+
+    Returns:
+        Any : JSON serializable value.
+    """
+    if isinstance(db_value, datetime):
+        return db_value.isoformat(' ')
+    return str(db_value)
+
+
+def _parameter_getter(mappings: list):
+    """ Creates a function that collects the values of the attributes of an object given by a list of
+        attribute mappings into a list of statement parameters.
+
+    Parameters:
+        mappings : list
+            "AttributeMapping" entries of the attributes to collect.
+
+    Returns:
+        function : callable returning the list of parameter values for a given object.
+    """
+    attr_names = [mapping.class_attr_name for mapping in mappings]
+    if any([mapping.db_storage is not None for mapping in mappings]):
+        getters = [(attrgetter(mapping.class_attr_name), mapping.db_value) for mapping in mappings]
+        return lambda obj: [db_value(getter(obj)) for getter, db_value in getters]
+    if len(attr_names) == 0:
+        return lambda obj: []
+    if len(attr_names) == 1:
+        single_getter = attrgetter(attr_names[0])
+        return lambda obj: [single_getter(obj)]
+    multi_getter = attrgetter(*attr_names)
+    return lambda obj: list(multi_getter(obj))
+
+
+def _value_converter(mapping: AttributeMapping):
+    """ Chooses the function converting a value read from the database to the type of a class attribute.
+        The returned function has the same semantics as "RepositoryElement._type_conversion".
+
+    Parameters:
+        mapping : AttributeMapping
+            Mapping of the class attribute.
+
+    Returns:
+        function : callable converting a single database value.
+    """
+    cls_attr_type = mapping.class_attr_type
+    if cls_attr_type is datetime:
+        def convert_datetime(db_attr_value):
+            if db_attr_value is None or isinstance(db_attr_value, datetime):
+                return db_attr_value
+            if isinstance(db_attr_value, str):
+                return parse_datetime(db_attr_value)
+            if isinstance(db_attr_value, int):
+                return epoch_us_to_datetime(db_attr_value)
+            return datetime(db_attr_value)
+        return convert_datetime
+
+    def convert(db_attr_value):
+        if db_attr_value is None or isinstance(db_attr_value, cls_attr_type):
+            return db_attr_value
+        return cls_attr_type(db_attr_value)
+    return convert
+
+
+def _assigns_via_dict(element_class: type, attr_names: list) -> bool:
+    """ Checks whether or not the attributes of instances of a class can be assigned by writing directly to
+        the instance "__dict__" (i.e. the instances have a "__dict__", the class does not override
+        "__setattr__" and none of the attributes is a data descriptor like a property or a slot).
+
+    Parameters:
+        element_class : type
+            Sub-class of RepositoryElement.
+        attr_names : list
+            Names of the class attributes to be assigned.
+
+    Returns:
+        bool : True if the instance "__dict__" can be used; False otherwise.
+    """
+    if element_class.__dictoffset__ == 0 or element_class.__setattr__ is not object.__setattr__:
+        return False
+    for attr_name in attr_names:
+        if hasattr(type(inspect.getattr_static(element_class, attr_name, None)), '__set__'):
+            return False
+    return True
+
+
+def _make_row_loader(element_class: type, mappings: list):
+    """ Generates the source code of a function assigning the columns of a cursor row to the attributes
+        of a RepositoryElement and compiles it. Column indices, converters and target attributes are
+        resolved when the function is generated, so that loading a row is a straight sequence of
+        assignments.
+
+    Parameters:
+        element_class : type
+            Sub-class of RepositoryElement the function is generated for.
+        mappings : list
+            "AttributeMapping" entries of the columns contained in the cursor row.
+
+    Returns:
+        function : callable(element, cursor_row) loading the row into the element.
+    """
+    use_dict = _assigns_via_dict(element_class, [mapping.class_attr_name for mapping in mappings])
+    namespace = {'setattr': setattr}
+    lines = ['def load_row(element, cursor_row):']
+    if use_dict:
+        lines.append('    attrs = element.__dict__')
+    for pos, mapping in enumerate(mappings):
+        namespace['type_{}'.format(pos)] = mapping.class_attr_type
+        namespace['conv_{}'.format(pos)] = _value_converter(mapping)
+        lines.append('    value = cursor_row[{}]'.format(mapping.select_rank))
+        value_expr = 'value if value.__class__ is type_{0} else conv_{0}(value)'.format(pos)
+        if use_dict:
+            lines.append('    attrs[{!r}] = {}'.format(mapping.class_attr_name, value_expr))
+        elif mapping.class_attr_name.isidentifier():
+            lines.append('    element.{} = {}'.format(mapping.class_attr_name, value_expr))
+        else:
+            lines.append('    setattr(element, {!r}, {})'.format(mapping.class_attr_name, value_expr))
+    lines.append('    return element')
+    exec('\n'.join(lines), namespace)  # pylint: disable=exec-used
+    return namespace['load_row']
+
+
+def _make_row_converter(mappings: list, tuple_type: type = None):
+    """ Generates the source code of a function converting the columns of a cursor row to the types of
+        the given class attributes and compiles it.
+
+    Parameters:
+        mappings : list
+            "AttributeMapping" entries of the columns contained in the cursor row, in column order.
+        tuple_type : type, optional
+            Named tuple class to be returned. Default is None (plain tuple).
+
+    Returns:
+        function : callable(cursor_row) returning the converted values as tuple.
+    """
+    namespace = {'tuple_type': tuple_type}
+    lines = ['def convert_row(cursor_row):']
+    value_exprs = []
+    for pos, mapping in enumerate(mappings):
+        namespace['type_{}'.format(pos)] = mapping.class_attr_type
+        namespace['conv_{}'.format(pos)] = _value_converter(mapping)
+        lines.append('    value_{0} = cursor_row[{0}]'.format(pos))
+        value_exprs.append('value_{0} if value_{0}.__class__ is type_{0} else conv_{0}(value_{0})'.format(pos))
+    if tuple_type is None:
+        lines.append('    return ({},)'.format(', '.join(value_exprs)))
+    else:
+        lines.append('    return tuple_type({})'.format(', '.join(value_exprs)))
+    exec('\n'.join(lines), namespace)  # pylint: disable=exec-used
+    return namespace['convert_row']
+
+
+def _overrides_load_row(element_class: type) -> bool:
+    """ Checks whether or not a sub-class of RepositoryElement overloads the "load_row" method.
+
+    Parameters:
+        element_class : type
+            Sub-class of RepositoryElement.
+
+    Returns:
+        bool : True if "load_row" is overloaded; False otherwise.
+    """
+    return element_class.load_row is not RepositoryElement.load_row
+
+
+class CompiledAttributeMap:
+    """ SQL statement texts, parameter attribute lists and the row loader derived once from an
+        "AttributeMap". Every sub-class of RepositoryElement owns one instance, created when the class is
+        used for the first time (see "RepositoryElement._compiled_map").
+
+    Attributes:
+        attribute_map : AttributeMap
+            The Attribute Map the statements have been compiled from.
+        element_class : type
+            The sub-class of RepositoryElement the map has been compiled for.
+        select_clause : str
+            SELECT clause (including the FROM clause) listing all attributes for select.
+        key_where_clause : str
+            WHERE clause comparing all primary key attributes to parameters.
+        key_order_clause : str
+            ORDER BY clause listing all primary key attributes.
+        insert_text, update_text, upsert_text, delete_text, select_by_key_text, select_all_text : str
+            Complete texts of the default SQL statements.
+        insert_attrs, update_attrs, key_attrs : list
+            Names of the class attributes providing the statement parameters, in placeholder order.
+        insert_params, update_params, upsert_params, key_params : function
+            Callables returning the list of parameter values for a given element.
+        update_mappings : list
+            "AttributeMapping" entries of the attributes set by UPDATE statements.
+        snapshot_params : function
+            Callable returning the values of the attributes set by UPDATE statements (change tracking).
+        row_loader : function
+            Generated callable(element, cursor_row) assigning the converted column values of a cursor row
+            to the attributes of an element.
+        element_factory : function
+            Callable(cursor_row) creating a new element from a cursor row.
+        _projections : dict
+            Projections created by "projection", by tuple of class attribute names.
+        _partial_updates : dict
+            UPDATE statement texts created by "partial_update_text", by tuple of changed positions.
+    """
+    def __init__(self, attribute_map: AttributeMap, element_class: type):
+        """ Constructor.
+
+        Parameters:
+            attribute_map : AttributeMap
+                Attribute Map of a sub-class of RepositoryElement.
+            element_class : type
+                The sub-class of RepositoryElement.
+        """
+        self.attribute_map = attribute_map
+        self.element_class = element_class
+        table_name = attribute_map.table_name
+        select_cols = ', '.join([mapping.db_attr_name for mapping in attribute_map.attributes_for_select])
+        self.select_clause = 'SELECT {} FROM {}'.format(select_cols, table_name)
+        key_terms = ['{} = ?'.format(mapping.db_attr_name) for mapping in attribute_map.db_key_attributes]
+        self.key_where_clause = ' WHERE ' + ' AND '.join(key_terms)
+        key_cols = [mapping.db_attr_name for mapping in attribute_map.db_key_attributes]
+        self.key_order_clause = ' ORDER BY ' + ', '.join(key_cols)
+        self.key_attrs = [mapping.class_attr_name for mapping in attribute_map.db_key_attributes]
+
+        insert_mappings = attribute_map.attributes_for_insert
+        self.insert_text = 'INSERT INTO {} ( {} ) VALUES ( {} )'.format(
+            table_name,
+            ', '.join([mapping.db_attr_name for mapping in insert_mappings]),
+            ', '.join(['?'] * len(insert_mappings)))
+        self.insert_attrs = [mapping.class_attr_name for mapping in insert_mappings]
+
+        update_mappings = attribute_map.attributes_for_update
+        self.update_text = 'UPDATE {} SET {}{}'.format(
+            table_name,
+            ', '.join(['{} = ?'.format(mapping.db_attr_name) for mapping in update_mappings]),
+            self.key_where_clause)
+        self.update_attrs = [mapping.class_attr_name for mapping in update_mappings] + self.key_attrs
+
+        upsert_mappings = [mapping for mapping in attribute_map.mappings
+                           if mapping.include_in_insert or mapping.is_db_key]
+        if len(update_mappings) > 0:
+            upsert_action = 'UPDATE SET ' + ', '.join(
+                ['{0} = excluded.{0}'.format(mapping.db_attr_name) for mapping in update_mappings])
+        else:
+            upsert_action = 'NOTHING'
+        self.upsert_text = 'INSERT INTO {} ( {} ) VALUES ( {} ) ON CONFLICT ( {} ) DO {}'.format(
+            table_name,
+            ', '.join([mapping.db_attr_name for mapping in upsert_mappings]),
+            ', '.join(['?'] * len(upsert_mappings)),
+            ', '.join(key_cols),
+            upsert_action)
+
+        self.delete_text = 'DELETE FROM {}{}'.format(table_name, self.key_where_clause)
+        self.select_by_key_text = self.select_clause + self.key_where_clause
+        self.select_all_text = self.select_clause + self.key_order_clause
+
+        self.insert_params = _parameter_getter(insert_mappings)
+        self.update_params = _parameter_getter(update_mappings + attribute_map.db_key_attributes)
+        self.key_params = _parameter_getter(attribute_map.db_key_attributes)
+        self.upsert_params = _parameter_getter(upsert_mappings)
+        self.update_mappings = update_mappings
+        self.snapshot_params = _parameter_getter(update_mappings)
+        self._partial_updates = {}
+
+        self.row_loader = _make_row_loader(element_class, attribute_map.attributes_for_select)
+        self.element_factory = self._make_element_factory()
+        self._projections = {}
+
+    def partial_update_text(self, positions: tuple) -> str:
+        """ Returns the text of the UPDATE statement setting only a subset of the attributes set by the
+            default UPDATE statement. The texts are created when a subset is requested for the first time.
+
+        Parameters:
+            positions : tuple
+                Positions of the attributes to be set in "update_mappings".
+
+        Returns:
+            str : text of the UPDATE statement; the placeholders of the attributes are followed by the
+                  placeholders of the key attributes.
+        """
+        res = self._partial_updates.get(positions)
+        if res is None:
+            res = 'UPDATE {} SET {}{}'.format(
+                self.attribute_map.table_name,
+                ', '.join(['{} = ?'.format(self.update_mappings[pos].db_attr_name) for pos in positions]),
+                self.key_where_clause)
+            self._partial_updates[positions] = res
+        return res
+
+    def projection(self, cls_attr_names: list) -> tuple:
+        """ Returns the SELECT clause and the row converters for a subset of the class attributes. They are
+            created when a subset is requested for the first time.
+
+        Parameters:
+            cls_attr_names : list
+                Names of the class attributes to be selected, in column order.
+
+        Returns:
+            tuple : (SELECT clause, converter returning named tuples, converter returning plain tuples).
+        """
+        proj_key = tuple(cls_attr_names)
+        res = self._projections.get(proj_key)
+        if res is None:
+            if len(proj_key) == 0:
+                raise ValueError('No class attributes to select')
+            mappings = []
+            for cls_attr_name in proj_key:
+                mapping = self.attribute_map[cls_attr_name]
+                if mapping is None:
+                    raise ValueError('Invalid class attribute name: "{}"'.format(cls_attr_name))
+                mappings.append(mapping)
+            select_clause = 'SELECT {} FROM {}'.format(', '.join([mapping.db_attr_name for mapping in mappings]),
+                                                       self.attribute_map.table_name)
+            tuple_type = namedtuple(self.element_class.__name__ + 'Row', proj_key, rename=True)
+            res = (select_clause, _make_row_converter(mappings, tuple_type), _make_row_converter(mappings))
+            self._projections[proj_key] = res
+        return res
+
+    def _make_element_factory(self):
+        """ Creates the function converting a cursor row into a new element. The element is created without
+            calling its constructor if the class sets "_load_without_init"; a "load_row" method overloaded
+            by the class is respected. If the class sets "_track_changes", the values of the attributes set by
+            UPDATE statements are recorded in the new element.
+
+        Returns:
+            function : callable(cursor_row) returning a new element.
+        """
+        element_factory = self._make_loading_factory()
+        if not self.element_class._track_changes:
+            return element_factory
+        snapshot_params = self.snapshot_params
+
+        def create_tracked_element(cursor_row):
+            element = element_factory(cursor_row)
+            element._db_snapshot = snapshot_params(element)
+            return element
+        return create_tracked_element
+
+    def _make_loading_factory(self):
+        """ Creates the function creating a new element and loading a cursor row into it (see
+            "_make_element_factory").
+
+        Returns:
+            function : callable(cursor_row) returning a new element.
+        """
+        element_class = self.element_class
+        if not _overrides_load_row(element_class):
+            row_loader = self.row_loader
+            if element_class._load_without_init:
+                new_element = element_class.__new__
+                return lambda cursor_row: row_loader(new_element(element_class), cursor_row)
+            return lambda cursor_row: row_loader(element_class(), cursor_row)
+
+        def create_element(cursor_row):
+            if element_class._load_without_init:
+                element = element_class.__new__(element_class)
+            else:
+                element = element_class()
+            element.load_row(cursor_row)
+            return element
+        return create_element
+
+
 class RepositoryElement:
     """ Blueprint for items to be stored in a SQLite Repository. Following the "Repository" design
         pattern, a "Repository" is a collection of items of the same type. In this implementation,
@@ -360,18 +1019,48 @@ class RepositoryElement:
         cases the methods to create the SQL statements ("insert_statement", "update_statement", ...)
         must be overloaded.
 
+    Attributes:
+        _attribute_map : AttributeMap, class attribute
+            Mapping between the class attributes and the columns of the underlying table.
+        _load_without_init : bool, class attribute
+            If True, the repository creates instances loaded from the database without calling the
+            constructor of the class. Default is False.
+        _in_list_json_threshold : int, class attribute
+            Maximum number of values of an "IN" criterion passed as individual parameters. Larger value lists
+            are passed as a single JSON array parameter (see "_where_clause_term"). Default is 256.
+        _track_changes : bool, class attribute
+            If True, elements record the values of their updatable attributes when they are loaded, inserted
+            or updated, so that UPDATE statements set only the changed attributes and SQLiteRepository skips
+            unchanged elements. In-place modifications of mutable attribute values are not detected.
+            Default is False.
+        _db_snapshot : list
+            Values of the updatable attributes as stored in the database (only if "_track_changes" is set).
+
     Methods:
         SQLiteRepositoryElement()
             Constructor
         load_row : RepositoryElement
             Converts an array of column values read from a SQLite cursor into a RepositoryElement
             instance.
+        from_row : RepositoryElement, class method
+            Creates a new instance of the class from an array of column values read from a SQLite cursor.
+        mark_clean : None
+            Records the current values of the updatable attributes as stored in the database.
+        mark_dirty : None
+            Discards the recorded values of the updatable attributes.
+        has_changes : bool
+            Checks whether or not the element has to be written by an update.
+        changed_attributes : list
+            Returns the names of the updatable attributes changed since the element was loaded or stored.
         insert_statement : SQLStatement
             Creates the SQL DML statement to insert a RepositoryElement into the SQLite table,
             mapping its attributes to table columns.
         update_statement : SQLStatement
             Creates the SQL DML statement to update a row in the SQLite table with data from the
             RepositoryElement.
+        upsert_statement : SQLStatement
+            Creates the SQL DML statement inserting the RepositoryElement or updating the existing row with
+            the same primary key.
         delete_statement : SQLStatement
             Creates the SQL DML statement to delete the row corresponding to the RepositoryElement
             from the SQLite table.
@@ -382,11 +1071,31 @@ class RepositoryElement:
             Creates the SQL SELECT statement to retrieve all entries from the repository, sorted by
             their key attributes.
         select_where_statement : SQLStatement
-            Creates the SQL SELECT statement to retrieve all entries from the repository that match the given
-            criteria, sorted by their key attributes.
+            Creates the SQL SELECT statement to retrieve the entries from the repository that match the given
+            criteria, optionally ordered, limited and distinct.
+        select_columns_statement : SQLStatement
+            Creates the SQL SELECT statement retrieving a subset of the attributes of the entries matching the
+            given criteria.
+        update_where_statement : SQLStatement
+            Creates the SQL UPDATE statement setting attributes of all entries matching the given criteria.
+        delete_where_statement : SQLStatement
+            Creates the SQL DELETE statement removing all entries matching the given criteria.
+        aggregate_statement : SQLStatement
+            Creates the SQL SELECT statement computing an aggregate function over the entries matching the
+            given criteria, optionally grouped by class attributes.
+        select_rowid_range_statement : SQLStatement
+            Creates the SQL SELECT statement retrieving the entries matching the given criteria within a
+            range of rowids.
+        select_page_statement : SQLStatement
+            Creates the SQL SELECT statement to retrieve one page of the entries matching the given criteria,
+            using keyset pagination.
+        _compiled_map : CompiledAttributeMap, class method
+            Returns the statement texts and parameter lists compiled from the Attribute Map of the class.
         insert : int
             Inserts a RepositoryElement into the SQLite table by executing its SQL INSERT
             statement.
+        upsert : int
+            Inserts or updates a RepositoryElement by executing its SQL upsert statement.
         update : int
             Updates a RepositoryElement in the SQLite table by executing its SQL UPDATE
             statement.
@@ -398,24 +1107,36 @@ class RepositoryElement:
         _key_where_clause: SQLStatement
             Creates the WHERE clause for the table attributes marked as part of the primary key
             in the Attribute Map.
+        _where_clause : SQLStatement
+            Creates a WHERE clause joining the given criteria with AND and appends it to the given statement.
+        _where_item : SQLStatement
+            Appends a single criterion (tuple or nested expression) to the given statement.
         _where_clause_term : SQLStatement
             Creates part of a where clause and its parameters from the tuple containing the comparison criterion
             and appends it to the given SQL SELECT statement.
         _key_order_clause: SQLStatement
             Creates an ORDER BY clause for the table attributes marked as part of the primary key
             in the Attribute Map.
+        _order_clause : SQLStatement
+            Creates an ORDER BY clause for the given class attributes.
+        _limit_clause : SQLStatement
+            Creates the LIMIT and OFFSET clauses.
         _type_conversion : Any, static
             Converts the type of the element read from the database to the target type of the corresponding
             class attribute.
     """
+    __slots__ = ('_db_snapshot',)
     _attribute_map = AttributeMap("", [])
+    _load_without_init = False
+    _in_list_json_threshold = 256
+    _track_changes = False
 
     def __init__(self):
         """ Constructor. """
 
     def load_row(self, cursor_row) -> object:
         """ Converts an array of column values read from a SQLite cursor into a RepositoryElement
-            instance.
+            instance, using the row loader generated from the Attribute Map of the class.
 
         Parameters:
             cursorRow : list
@@ -424,9 +1145,74 @@ class RepositoryElement:
         Returns : RepositoryElement
             The result of mapping the list of values into a RepositoryElement
         """
-        for mapping in self._attribute_map.mappings:
-            class_attr_val = self._type_conversion(mapping.class_attr_type, cursor_row[mapping.select_rank])
-            setattr(self, mapping.class_attr_name, class_attr_val)
+        return self._compiled_map().row_loader(self, cursor_row)
+
+    @classmethod
+    def from_row(cls, cursor_row) -> object:
+        """ Creates a new instance of the class from an array of column values read from a SQLite cursor.
+            If the class attribute "_load_without_init" is True, the instance is created without calling
+            the constructor of the class.
+
+        Parameters:
+            cursor_row : list
+                array of column values read from a SQLite cursor.
+
+        Returns : RepositoryElement
+            New instance of the class holding the values of the cursor row.
+        """
+        return cls._compiled_map().element_factory(cursor_row)
+
+    def mark_clean(self) -> None:
+        """ Records the current values of the updatable attributes as stored in the database. Called by
+            "insert", "update" and "upsert" if the class sets "_track_changes". If the changes are rolled back
+            by a "transaction" scope of SQLiteRepository, the previously recorded values are restored; after
+            rolling back a transaction by other means, "mark_dirty" must be called.
+        """
+        self._db_snapshot = self._compiled_map().snapshot_params(self)
+
+    def mark_dirty(self) -> None:
+        """ Discards the recorded values of the updatable attributes, so that the next update sets all of them. """
+        self._db_snapshot = None
+
+    def has_changes(self) -> bool:
+        """ Checks whether or not the element has to be written by an update. Changes are detected by
+            comparing the attribute values with the recorded ones, so in-place modifications of mutable
+            attribute values (e.g. appending to a list) are not detected.
+
+        Returns:
+            bool : False if the class sets "_track_changes" and no updatable attribute has changed since the
+                   element was loaded or stored; True otherwise.
+        """
+        if not self._track_changes:
+            return True
+        return len(self._changed_positions(self._compiled_map())[0]) > 0
+
+    def changed_attributes(self) -> list:
+        """ Returns the names of the updatable attributes changed since the element was loaded or stored.
+
+        Returns:
+            list : names of the changed class attributes; all updatable attributes if the element has no
+                   recorded values.
+        """
+        compiled = self._compiled_map()
+        return [compiled.update_mappings[pos].class_attr_name for pos in self._changed_positions(compiled)[0]]
+
+    def _changed_positions(self, compiled: CompiledAttributeMap) -> tuple:
+        """ Compares the updatable attributes with the recorded values.
+
+        Parameters:
+            compiled : CompiledAttributeMap
+                Compiled Attribute Map of the class.
+
+        Returns:
+            tuple : (positions of the changed attributes in "update_mappings", current values of all
+                    updatable attributes).
+        """
+        current = compiled.snapshot_params(self)
+        snapshot = getattr(self, '_db_snapshot', None)
+        if snapshot is None:
+            return tuple(range(len(current))), current
+        return tuple([pos for pos, value in enumerate(current) if value != snapshot[pos]]), current
 
     @staticmethod
     def _type_conversion(cls_attr_type: type, db_attr_value: Any) -> Any:
@@ -442,20 +1228,34 @@ class RepositoryElement:
         Returns:
             Any : correctly converted value.
         """
-        if isinstance(db_attr_value, cls_attr_type):
+        if db_attr_value is None or isinstance(db_attr_value, cls_attr_type):
             res = db_attr_value
         elif isinstance(db_attr_value, str):
             if cls_attr_type is datetime:
-                if db_attr_value.find(".") >= 0:
-                    res = datetime.strptime(db_attr_value, "%Y-%m-%d %H:%M:%S.%f")
-                else:
-                    res = datetime.strptime(db_attr_value, "%Y-%m-%d %H:%M:%S")
+                res = parse_datetime(db_attr_value)
             else:
                 res = cls_attr_type(db_attr_value)
+        elif isinstance(db_attr_value, int) and cls_attr_type is datetime:
+            res = epoch_us_to_datetime(db_attr_value)
         else:
             res = cls_attr_type(db_attr_value)
         return res
 
+    @classmethod
+    def _compiled_map(cls) -> CompiledAttributeMap:
+        """ Returns the statement texts and parameter lists compiled from the Attribute Map of the class.
+            They are compiled when the class is used for the first time and re-compiled only if the
+            "_attribute_map" of the class is replaced.
+
+        Returns:
+            CompiledAttributeMap : compiled statements of the class.
+        """
+        compiled = cls.__dict__.get('_compiled')
+        if compiled is None or compiled.attribute_map is not cls._attribute_map:
+            compiled = CompiledAttributeMap(cls._attribute_map, cls)
+            cls._compiled = compiled
+        return compiled
+
     def insert_statement(self) -> SQLStatement:
         """ Creates the SQL DML statement to insert a RepositoryElement into the SQLite table,
             mapping its attributes to table columns.
@@ -463,40 +1263,37 @@ class RepositoryElement:
         Returns:
             SQLStatement: SQL INSERT statement created from the Attribute Map of the class.
         """
-        ins_stmt = SQLStatement()
-        ins_stmt.stmt_text = 'INSERT INTO {} ('.format(self._attribute_map.table_name)
-        value_list = ' VALUES( '
-        att_no = 0
-        for mapping in self._attribute_map.attributes_for_insert:
-            if att_no == 0:
-                ins_stmt.append_text(mapping.db_attr_name)
-                value_list = value_list + '?'
-            else:
-                ins_stmt.append_text(', ' + mapping.db_attr_name)
-                value_list = value_list + ', ?'
-            ins_stmt.append_param(getattr(self, mapping.class_attr_name))
-            att_no += 1
-        ins_stmt.append_text(' ) ' + value_list + ' )')
-        return ins_stmt
+        compiled = self._compiled_map()
+        return SQLStatement(compiled.insert_text, compiled.insert_params(self))
 
     def update_statement(self) -> SQLStatement:
         """ Creates the SQL DML statement to update a row in the SQLite table with data from the
-            RepositoryElement.
+            RepositoryElement. If the class sets "_track_changes" and the element has recorded values, only
+            the changed attributes are set; if no attribute has changed, all updatable attributes are set
+            (see "has_changes").
 
         Returns:
             SQLStatement: SQL UPDATE statement created from the Attribute Map of the class.
         """
-        upd_stmt = SQLStatement()
-        upd_stmt.stmt_text = 'UPDATE {} SET '.format(self._attribute_map.table_name)
-        att_no = 0
-        for mapping in self._attribute_map.attributes_for_update:
-            if att_no == 0:
-                upd_stmt.append_text(' {} = ?'.format(mapping.db_attr_name))
-            else:
-                upd_stmt.append_text(', {} = ?'.format(mapping.db_attr_name))
-            upd_stmt.append_param(getattr(self, mapping.class_attr_name))
-            att_no += 1
-        return self._key_where_clause(upd_stmt)
+        compiled = self._compiled_map()
+        if not self._track_changes or getattr(self, '_db_snapshot', None) is None:
+            return SQLStatement(compiled.update_text, compiled.update_params(self))
+        positions, current = self._changed_positions(compiled)
+        if len(positions) == 0 or len(positions) == len(current):
+            return SQLStatement(compiled.update_text, current + compiled.key_params(self))
+        return SQLStatement(compiled.partial_update_text(positions),
+                            [current[pos] for pos in positions] + compiled.key_params(self))
+
+    def upsert_statement(self) -> SQLStatement:
+        """ Creates the SQL DML statement inserting the RepositoryElement into the SQLite table or, if a row
+            with the same primary key exists, updating the attributes marked "include_in_update" in that row
+            (INSERT ... ON CONFLICT ( <key columns> ) DO UPDATE SET ...).
+
+        Returns:
+            SQLStatement: SQL INSERT statement with upsert clause created from the Attribute Map of the class.
+        """
+        compiled = self._compiled_map()
+        return SQLStatement(compiled.upsert_text, compiled.upsert_params(self))
 
     def delete_statement(self) -> SQLStatement:
         """ Creates the SQL DML statement to delete the row corresponding to the RepositoryElement
@@ -505,9 +1302,8 @@ class RepositoryElement:
         Returns:
             SQLStatement: SQL DELETE statement created from the Attribute Map of the class.
         """
-        del_stmt = SQLStatement()
-        del_stmt.stmt_text = 'DELETE FROM {} '.format(self._attribute_map.table_name)
-        return self._key_where_clause(del_stmt)
+        compiled = self._compiled_map()
+        return SQLStatement(compiled.delete_text, compiled.key_params(self))
 
     def select_by_key_statement(self) -> SQLStatement:
         """ Creates the SQL DML statement to select the row corresponding to the RepositoryElement
@@ -517,9 +1313,8 @@ class RepositoryElement:
             SQLStatement: SQL SELECT statement for selecting the single entry identfied by the given
                           primary key values.
         """
-        sel_stmt = SQLStatement()
-        self._select_clause(sel_stmt)
-        return self._key_where_clause(sel_stmt)
+        compiled = self._compiled_map()
+        return SQLStatement(compiled.select_by_key_text, compiled.key_params(self))
 
     def select_all_statement(self) -> SQLStatement:
         """ Creates the SQL SELECT statement to retrieve all entries from the repository, sorted by
@@ -529,35 +1324,271 @@ class RepositoryElement:
             SQLStatement:
                 SQL SELECT statement to retrieve all entries sorted by their key attributes.
         """
+        return SQLStatement(self._compiled_map().select_all_text)
+
+    def select_where_statement(self, where_criteria: list, order_by: list = None, limit: int = None,
+                               offset: int = None, distinct: bool = False) -> SQLStatement:
+        """ Creates the SQL SELECT statement to retrieve the entries from the repository that match the given
+            criteria, sorted by their key attributes unless another order is requested.
+
+        Parameters:
+            where_criteria : list or WhereExpression
+                List containing the criteria for selecting the repository entries, joined with AND. Every
+                criterion is a tuple ('attribute_name', 'operator', 'value') or a WhereAnd, WhereOr or WhereNot
+                expression combining criteria. A single expression may be passed instead of the list.
+            order_by : list, optional
+                Names of the class attributes to sort by; a leading "-" sorts in descending order.
+                Default is the order of the key attributes.
+            limit : int, optional
+                Maximum number of entries to retrieve.
+            offset : int, optional
+                Number of matching entries to skip.
+            distinct : bool, optional
+                If True, duplicate rows are removed (SELECT DISTINCT). Default value is "False".
+
+        Returns:
+            SQLStatement:
+                SQL SELECT statement to retrieve all matching repository elements.
+        """
+        # pylint: disable=too-many-arguments
         sel_stmt = SQLStatement()
         self._select_clause(sel_stmt)
-        return self._key_order_clause(sel_stmt)
+        if distinct:
+            sel_stmt.stmt_text = 'SELECT DISTINCT' + sel_stmt.stmt_text[len('SELECT'):]
+        self._where_clause(sel_stmt, where_criteria)
+        if order_by is None:
+            self._key_order_clause(sel_stmt)
+        else:
+            self._order_clause(sel_stmt, order_by)
+        return self._limit_clause(sel_stmt, limit, offset)
+
+    def select_columns_statement(self, cls_attr_names: list, where_criteria: list, order_by: list = None,
+                                 limit: int = None, offset: int = None, distinct: bool = False) -> SQLStatement:
+        """ Creates the SQL SELECT statement retrieving a subset of the attributes of the entries matching the
+            given criteria (projection), sorted by their key attributes unless another order is requested.
+
+        Parameters:
+            cls_attr_names : list
+                Names of the class attributes to be selected, in column order.
+            where_criteria : list or WhereExpression
+                Criteria for selecting the repository entries (see "select_where_statement").
+            order_by, limit, offset, distinct : optional
+                See "select_where_statement".
+
+        Returns:
+            SQLStatement:
+                SQL SELECT statement retrieving the requested columns.
+        """
+        # pylint: disable=too-many-arguments
+        sel_stmt = SQLStatement(self._compiled_map().projection(cls_attr_names)[0])
+        if distinct:
+            sel_stmt.stmt_text = 'SELECT DISTINCT' + sel_stmt.stmt_text[len('SELECT'):]
+        self._where_clause(sel_stmt, where_criteria)
+        if order_by is None:
+            self._key_order_clause(sel_stmt)
+        else:
+            self._order_clause(sel_stmt, order_by)
+        return self._limit_clause(sel_stmt, limit, offset)
+
+    def update_where_statement(self, where_criteria: list, values: dict) -> SQLStatement:
+        """ Creates the SQL UPDATE statement setting attributes of all entries matching the given criteria.
+
+        Parameters:
+            where_criteria : list or WhereExpression
+                Criteria for selecting the repository entries (see "select_where_statement").
+            values : dict
+                {class_attribute_name: new value} of the attributes to be set; only attributes included in
+                UPDATE statements (see "AttributeMapping.include_in_update") are allowed.
+
+        Returns:
+            SQLStatement:
+                SQL UPDATE statement.
+        """
+        if len(values) == 0:
+            raise ValueError('No attributes to update')
+        upd_stmt = SQLStatement('UPDATE {} SET '.format(self._attribute_map.table_name))
+        set_terms = []
+        for cls_attr_name, cls_attr_value in values.items():
+            mapping = self._attribute_map[cls_attr_name]
+            if mapping is None:
+                raise ValueError('Invalid class attribute name: "{}"'.format(cls_attr_name))
+            if not mapping.include_in_update:
+                raise ValueError('Class attribute not included in updates: "{}"'.format(cls_attr_name))
+            set_terms.append('{} = ?'.format(mapping.db_attr_name))
+            upd_stmt.stmt_params.append(mapping.db_value(cls_attr_value))
+        upd_stmt.append_text(', '.join(set_terms))
+        return self._where_clause(upd_stmt, where_criteria)
+
+    def delete_where_statement(self, where_criteria: list) -> SQLStatement:
+        """ Creates the SQL DELETE statement removing all entries matching the given criteria.
+
+        Parameters:
+            where_criteria : list or WhereExpression
+                Criteria for selecting the repository entries (see "select_where_statement"). An empty list
+                selects all entries.
+
+        Returns:
+            SQLStatement:
+                SQL DELETE statement.
+        """
+        return self._where_clause(SQLStatement('DELETE FROM {}'.format(self._attribute_map.table_name)),
+                                  where_criteria)
 
-    def select_where_statement(self, where_criteria: list) -> SQLStatement:
-        """ Creates the SQL SELECT statement to retrieve all entries from the repository that match the given
-            criteria, sorted by their key attributes.
+    def aggregate_statement(self, function: str, cls_attr_name: str, where_criteria: list,
+                            group_by: list = None) -> SQLStatement:
+        """ Creates the SQL SELECT statement computing an aggregate function over the entries matching the
+            given criteria. If "group_by" is specified, the statement selects the grouping columns followed by
+            the aggregate value, one row per group, sorted by the grouping columns.
+
+        Parameters:
+            function : str
+                Aggregate function. Legal values are: "COUNT", "SUM", "TOTAL", "MIN", "MAX", "AVG".
+            cls_attr_name : str
+                Name of the class attribute to aggregate; None for "COUNT(*)".
+            where_criteria : list or WhereExpression
+                Criteria for selecting the repository entries (see "select_where_statement").
+            group_by : list, optional
+                Names of the class attributes to group by.
+
+        Returns:
+            SQLStatement:
+                SQL SELECT statement computing the aggregate.
+        """
+        if function.upper() not in ['COUNT', 'SUM', 'TOTAL', 'MIN', 'MAX', 'AVG']:
+            raise ValueError('Invalid aggregate function: "{}"'.format(function))
+        if cls_attr_name is None:
+            if function.upper() != 'COUNT':
+                raise ValueError('Aggregate function "{}" requires a class attribute'.format(function))
+            agg_expr = 'COUNT(*)'
+        else:
+            mapping = self._attribute_map[cls_attr_name]
+            if mapping is None:
+                raise ValueError('Invalid class attribute name: "{}"'.format(cls_attr_name))
+            agg_expr = '{}({})'.format(function.upper(), mapping.db_attr_name)
+        group_cols = []
+        for group_attr_name in group_by or []:
+            mapping = self._attribute_map[group_attr_name]
+            if mapping is None:
+                raise ValueError('Invalid class attribute name: "{}"'.format(group_attr_name))
+            group_cols.append(mapping.db_attr_name)
+        sel_stmt = SQLStatement('SELECT {} FROM {}'.format(', '.join(group_cols + [agg_expr]),
+                                                           self._attribute_map.table_name))
+        self._where_clause(sel_stmt, where_criteria)
+        if len(group_cols) > 0:
+            sel_stmt.append_text(' GROUP BY {0} ORDER BY {0}'.format(', '.join(group_cols)))
+        return sel_stmt
+
+    def select_rowid_range_statement(self, where_criteria: list, first_rowid: int, last_rowid: int) -> SQLStatement:
+        """ Creates the SQL SELECT statement retrieving the entries matching the given criteria whose rowid
+            lies within the given range, in rowid order (used for partitioned scans).
+
+        Parameters:
+            where_criteria : list or WhereExpression
+                Criteria for selecting the repository entries (see "select_where_statement").
+            first_rowid : int
+                Lowest rowid of the range.
+            last_rowid : int
+                Highest rowid of the range.
+
+        Returns:
+            SQLStatement:
+                SQL SELECT statement retrieving the entries of the range.
+        """
+        sel_stmt = SQLStatement()
+        self._select_clause(sel_stmt)
+        self._where_clause(sel_stmt, where_criteria)
+        sel_stmt.append_text(' AND ' if len(where_criteria) > 0 else ' WHERE ')
+        sel_stmt.append_text('rowid BETWEEN ? AND ? ORDER BY rowid')
+        sel_stmt.append_param([first_rowid, last_rowid])
+        return sel_stmt
+
+    def select_page_statement(self, where_criteria: list, after_key: tuple, limit: int) -> SQLStatement:
+        """ Creates the SQL SELECT statement to retrieve one page of the entries matching the given criteria,
+            sorted by their key attributes, using keyset pagination: the page starts after the entry with
+            the given primary key values.
 
         Parameters:
             where_criteria : list
-                List containing the criteria for selecting the repository entries. Every criterion is a tuple
-                ('attribute_name', 'operator', 'value').
+                List containing the criteria for selecting the repository entries (see "select_where_statement").
+            after_key : tuple
+                Primary key values (in the order of the key attributes of the Attribute Map) of the last entry
+                of the previous page, or None for the first page.
+            limit : int
+                Maximum number of entries of the page.
 
         Returns:
             SQLStatement:
-                SQL SELECT statement to retrieve all matching repository elements.
+                SQL SELECT statement to retrieve the page.
         """
+        compiled = self._compiled_map()
         sel_stmt = SQLStatement()
-        sel_stmt.stmt_params = []
         self._select_clause(sel_stmt)
+        self._where_clause(sel_stmt, where_criteria)
+        if after_key is not None:
+            after_key = list(after_key)
+            if len(after_key) != len(compiled.key_attrs):
+                raise ValueError('Invalid number of key values: {}'.format(len(after_key)))
+            key_cols = [mapping.db_attr_name for mapping in self._attribute_map.db_key_attributes]
+            sel_stmt.append_text(' AND ' if len(where_criteria) > 0 else ' WHERE ')
+            if len(key_cols) == 1:
+                sel_stmt.append_text('{} > ?'.format(key_cols[0]))
+            else:
+                sel_stmt.append_text('( {} ) > ( {} )'.format(', '.join(key_cols), ', '.join(['?'] * len(key_cols))))
+            sel_stmt.append_param(after_key)
+        self._key_order_clause(sel_stmt)
+        sel_stmt.append_text(' LIMIT ?')
+        sel_stmt.append_param(limit)
+        return sel_stmt
+
+    def _where_clause(self, sql_stmt: SQLStatement, where_criteria: list) -> SQLStatement:
+        """ Creates a WHERE clause joining the given criteria with AND and appends it to the given statement.
+
+        Parameters:
+            sql_stmt : SQLStatement
+                SQL statement to append the WHERE clause to.
+            where_criteria : list or WhereExpression
+                List of criteria tuples (class_attribute_name, operator, value) or expressions, or a single
+                expression. No WHERE clause is created for an empty list.
+
+        Returns:
+            SQLStatement : Given SQL statement with WHERE clause.
+        """
+        if isinstance(where_criteria, WhereExpression):
+            where_criteria = [where_criteria]
         att_no = 0
         for where_term in where_criteria:
             if att_no == 0:
-                sel_stmt.append_text(' WHERE ')
+                sql_stmt.append_text(' WHERE ')
             else:
-                sel_stmt.append_text( ' AND ')
+                sql_stmt.append_text( ' AND ')
             att_no += 1
-            self._where_clause_term(sel_stmt, where_term)
-        return self._key_order_clause(sel_stmt)
+            self._where_item(sql_stmt, where_term)
+        return sql_stmt
+
+    def _where_item(self, sql_stmt: SQLStatement, where_item) -> SQLStatement:
+        """ Appends a single criterion to the given statement. Expressions are enclosed in parentheses and
+            their operands are appended recursively.
+
+        Parameters:
+            sql_stmt : SQLStatement
+                SQL statement to append the criterion to.
+            where_item : tuple or WhereExpression
+                Criteria tuple or expression.
+
+        Returns:
+            SQLStatement : Given SQL statement with the criterion appended.
+        """
+        if not isinstance(where_item, WhereExpression):
+            return self._where_clause_term(sql_stmt, where_item)
+        if isinstance(where_item, WhereNot):
+            sql_stmt.append_text(' NOT ')
+        sql_stmt.append_text('(')
+        for term_no, where_term in enumerate(where_item.terms):
+            if term_no > 0:
+                sql_stmt.append_text(' {} '.format(where_item.operator))
+            self._where_item(sql_stmt, where_term)
+        sql_stmt.append_text(')')
+        return sql_stmt
 
     def _select_clause(self, sql_stmt: SQLStatement) -> SQLStatement:
         """ Creates the SELECT clause of the SQL SELECT statements from the Attribute Map.
@@ -570,15 +1601,7 @@ class RepositoryElement:
             SQLStatement
                 Statement containing the SELECT clause.
         """
-        sql_stmt.stmt_text = 'SELECT '
-        att_no = 0
-        for mapping in self._attribute_map.attributes_for_select:
-            if att_no == 0:
-                sql_stmt.append_text(' {}'.format(mapping.db_attr_name))
-            else:
-                sql_stmt.append_text(', {}'.format(mapping.db_attr_name))
-            att_no += 1
-        sql_stmt.append_text(' FROM {} '.format(self._attribute_map.table_name))
+        sql_stmt.stmt_text = self._compiled_map().select_clause
         return sql_stmt
 
     def _where_clause_term(self, sql_stmt: SQLStatement, where_term: tuple) -> SQLStatement:
@@ -596,28 +1619,50 @@ class RepositoryElement:
                         the contents class.
                     operator : str
                         Comparison operator to be applied to the class attribute. Legal values are:
-                            "=", "!=", ">", "<", ">=", "<=", "LIKE", "BETWEEN".
+                            "=", "!=", ">", "<", ">=", "<=", "LIKE", "BETWEEN", "IN", "NOT IN", "IS NULL",
+                            "IS NOT NULL".
                     value : str
                         Value to compare the class attribute to. In case of operator is "BETWEEN", value must
-                        be a list containing exactly 2 elements.
+                        be a list containing exactly 2 elements. The value may be omitted for "IS NULL" and
+                        "IS NOT NULL".
+                For "IN" and "NOT IN", the number of placeholders is rounded up to the next power of 2 (the
+                last value is repeated), so that value lists of similar length share the statement text.
+                Value lists longer than "_in_list_json_threshold" (and empty lists) are passed as a single
+                JSON array parameter: "IN ( SELECT +value FROM json_each(?) )"; the unary "+"
+                removes the affinity of the JSON values, so that the affinity of the column is applied.
         Returns:
             SQLStatement
                 Statement containing the created WHERE clause part.
         """
-        cond_att, cond_op, cond_val = where_term
+        cond_att, cond_op = where_term[0], where_term[1]
         mapping = self._attribute_map[cond_att]
         if mapping is None:
             raise ValueError('Invalid class attribute name: "{}"'.format(cond_att))
-        if cond_op.upper() not in ["=", "!=", ">", "<", "=>", "<=", "LIKE", "BETWEEN", "IN"]:
+        if cond_op.upper() in ["IS NULL", "IS NOT NULL"]:
+            sql_stmt.append_text(' {} {} '.format(mapping.db_attr_name, cond_op.upper()))
+            return sql_stmt
+        _, _, cond_val = where_term
+        if cond_op.upper() not in ["=", "!=", ">", "<", ">=", "<=", "LIKE", "BETWEEN", "IN", "NOT IN"]:
             raise ValueError('Invalid where clause operator: "{}"'.format(cond_op))
         sql_stmt.append_text(' {} {} '.format(mapping.db_attr_name, cond_op))
         if cond_op.upper() == "BETWEEN":
             sql_stmt.append_text('? AND ? ')
-        elif cond_op.upper() == "IN":
-            sql_stmt.append_text(f"( {','.join(['?']*len(cond_val))} )")
+        elif cond_op.upper() in ["IN", "NOT IN"]:
+            cond_val = [mapping.db_value(value) for value in cond_val]
+            if len(cond_val) == 0 or len(cond_val) > self._in_list_json_threshold:
+                sql_stmt.append_text('( SELECT +value FROM json_each(?) )')
+                sql_stmt.append_param(json.dumps(cond_val, default=_json_value))
+                return sql_stmt
+            bucket_size = 1 << (len(cond_val) - 1).bit_length()
+            sql_stmt.append_text('( {} )'.format(','.join(['?'] * bucket_size)))
+            sql_stmt.append_param(cond_val + [cond_val[-1]] * (bucket_size - len(cond_val)))
+            return sql_stmt
         else:
             sql_stmt.append_text(' ? ')
-        sql_stmt.append_param(cond_val)
+        if isinstance(cond_val, (list, tuple)):
+            sql_stmt.append_param([mapping.db_value(value) for value in cond_val])
+        else:
+            sql_stmt.append_param(mapping.db_value(cond_val))
         return sql_stmt
 
     def _key_where_clause(self, sql_stmt: SQLStatement) -> SQLStatement:
@@ -631,15 +1676,9 @@ class RepositoryElement:
         Returns:
             SQLStatement : Given SQL statement with WHERE clause.
         """
-        sql_stmt.append_text(' WHERE ')
-        att_no = 0
-        for mapping in self._attribute_map.db_key_attributes:
-            if att_no == 0:
-                sql_stmt.append_text(' {} = ? '.format(mapping.db_attr_name))
-            else:
-                sql_stmt.append_text(' AND {} = ? '.format(mapping.db_attr_name))
-            sql_stmt.append_param(getattr(self, mapping.class_attr_name))
-            att_no += 1
+        compiled = self._compiled_map()
+        sql_stmt.append_text(compiled.key_where_clause)
+        sql_stmt.append_param(compiled.key_params(self))
         return sql_stmt
 
     def _key_order_clause(self, sql_stmt: SQLStatement) -> SQLStatement:
@@ -653,14 +1692,54 @@ class RepositoryElement:
         Returns:
             SQLStatement : Given SQL statement with ORDER BY clause.
         """
-        sql_stmt.append_text(' ORDER BY ')
-        att_no = 0
-        for mapping in self._attribute_map.db_key_attributes:
-            if att_no == 0:
-                sql_stmt.append_text(mapping.db_attr_name)
-            else:
-                sql_stmt.append_text(', {}'.format(mapping.db_attr_name))
-            att_no += 1
+        sql_stmt.append_text(self._compiled_map().key_order_clause)
+        return sql_stmt
+
+    def _order_clause(self, sql_stmt: SQLStatement, order_by: list) -> SQLStatement:
+        """ Creates an ORDER BY clause for the given class attributes.
+
+        Parameters:
+            sql_stmt : SQLStatement
+                SQL statement to append the ORDER BY clause to.
+            order_by : list
+                Names of the class attributes to sort by; a leading "-" sorts in descending order.
+
+        Returns:
+            SQLStatement : Given SQL statement with ORDER BY clause (unchanged for an empty list).
+        """
+        order_terms = []
+        for cls_attr_name in order_by:
+            descending = cls_attr_name.startswith('-')
+            mapping = self._attribute_map[cls_attr_name[1:] if descending else cls_attr_name]
+            if mapping is None:
+                raise ValueError('Invalid class attribute name: "{}"'.format(cls_attr_name))
+            order_terms.append(mapping.db_attr_name + (' DESC' if descending else ''))
+        if len(order_terms) > 0:
+            sql_stmt.append_text(' ORDER BY ' + ', '.join(order_terms))
+        return sql_stmt
+
+    @staticmethod
+    def _limit_clause(sql_stmt: SQLStatement, limit: int, offset: int) -> SQLStatement:
+        """ Creates the LIMIT and OFFSET clauses.
+
+        Parameters:
+            sql_stmt : SQLStatement
+                SQL statement to append the clauses to.
+            limit : int
+                Maximum number of rows, or None.
+            offset : int
+                Number of rows to skip, or None.
+
+        Returns:
+            SQLStatement : Given SQL statement with LIMIT and OFFSET clauses.
+        """
+        if limit is None and offset is None:
+            return sql_stmt
+        sql_stmt.append_text(' LIMIT ?')
+        sql_stmt.append_param(-1 if limit is None else limit)
+        if offset is not None:
+            sql_stmt.append_text(' OFFSET ?')
+            sql_stmt.append_param(offset)
         return sql_stmt
 
     def insert(self, cursor: sqlite3.Cursor) -> int:
@@ -678,12 +1757,37 @@ class RepositoryElement:
         sql_insert_stmt = self.insert_statement()
         cursor.execute(sql_insert_stmt.stmt_text, sql_insert_stmt.stmt_params)
         num_rows = cursor.rowcount
+        if self._track_changes:
+            self.mark_clean()
         if self._attribute_map.has_auto_increment_key:
             auto_key = cursor.lastrowid
             setattr(self, self._attribute_map.autoincrement_attribute.class_attr_name, auto_key)
             return auto_key
         return num_rows
 
+    def upsert(self, cursor: sqlite3.Cursor) -> int:
+        """ Inserts the RepositoryElement into the SQLite table or updates the existing row with the same
+            primary key by executing its SQL upsert statement.
+
+        Parameters:
+            cursor : sqlite3.Cursor
+                An open cursor within an active SQLite database connection.
+
+        Returns:
+            int : If the underlying table has an auto-increment key: key value of the row;
+                  Otherwise: number of inserted or updated rows.
+        """
+        sql_upsert_stmt = self.upsert_statement()
+        cursor.execute(sql_upsert_stmt.stmt_text, sql_upsert_stmt.stmt_params)
+        if self._track_changes:
+            self.mark_clean()
+        if self._attribute_map.has_auto_increment_key:
+            key_attr_name = self._attribute_map.autoincrement_attribute.class_attr_name
+            if getattr(self, key_attr_name) is None:
+                setattr(self, key_attr_name, cursor.lastrowid)
+            return getattr(self, key_attr_name)
+        return cursor.rowcount
+
     def update(self, cursor: sqlite3.Cursor) -> int:
         """ Updates a RepositoryElement in the SQLite table by executing its SQL UPDATE statement.
 
@@ -695,6 +1799,8 @@ class RepositoryElement:
         """
         sql_update_stmt = self.update_statement()
         cursor.execute(sql_update_stmt.stmt_text, sql_update_stmt.stmt_params)
+        if self._track_changes:
+            self.mark_clean()
         return cursor.rowcount
 
     def delete(self, cursor: sqlite3.Cursor) -> int:
@@ -710,3 +1816,71 @@ class RepositoryElement:
         sql_delete_stmt = self.delete_statement()
         cursor.execute(sql_delete_stmt.stmt_text, sql_delete_stmt.stmt_params)
         return cursor.rowcount
+
+
+def _replace_class_cells(namespace: dict, old_class: type, new_class: type) -> None:
+    """ Re-binds the "__class__" cells of the functions defined in a class body (used by zero-argument
+        "super()") from a class to its re-created copy.
+
+    Parameters:
+        namespace : dict
+            Namespace of the re-created class.
+        old_class : type
+            The original class.
+        new_class : type
+            The re-created class.
+    """
+    for value in namespace.values():
+        if isinstance(value, (classmethod, staticmethod)):
+            functions = [value.__func__]
+        elif isinstance(value, property):
+            functions = [value.fget, value.fset, value.fdel]
+        else:
+            functions = [value]
+        for function in functions:
+            for cell in getattr(function, '__closure__', None) or []:
+                try:
+                    if cell.cell_contents is old_class:
+                        cell.cell_contents = new_class
+                except ValueError:
+                    pass
+
+
+def slotted(element_class: type = None, extra_slots: tuple = ()):
+    """ Class decorator re-creating a sub-class of RepositoryElement with "__slots__" derived from the class
+        attribute names of its Attribute Map, so that its instances have no "__dict__". Statements, row
+        loading and the repository operations are not affected. All base classes must define "__slots__"
+        (RepositoryElement does), and the class body must not define class attributes with the names of
+        mapped attributes.
+
+    Parameters:
+        element_class : type
+            Sub-class of RepositoryElement to be converted.
+        extra_slots : tuple, optional
+            Names of further instance attributes that are not mapped to table columns.
+
+    Returns:
+        type : the re-created class (or a decorator if "element_class" is omitted, e.g. to pass
+               "extra_slots").
+    """
+    if element_class is None:
+        return lambda cls: slotted(cls, extra_slots)
+    if not issubclass(element_class, RepositoryElement):
+        raise ValueError('Class "{}" is not a sub-class of RepositoryElement'.format(element_class.__name__))
+    inherited = set()
+    for base_class in element_class.__mro__[1:]:
+        if '__slots__' not in base_class.__dict__ and base_class is not object:
+            raise ValueError('Base class "{}" does not define __slots__'.format(base_class.__name__))
+        slots = base_class.__dict__.get('__slots__', ())
+        inherited.update([slots] if isinstance(slots, str) else slots)
+    slot_names = []
+    for slot_name in [mapping.class_attr_name for mapping in element_class._attribute_map.mappings] + list(extra_slots):
+        if slot_name not in inherited and slot_name not in slot_names:
+            slot_names.append(slot_name)
+    namespace = {name: value for name, value in element_class.__dict__.items()
+                 if name not in ['__dict__', '__weakref__', '_compiled']}
+    namespace['__slots__'] = tuple(slot_names)
+    new_class = type(element_class)(element_class.__name__, element_class.__bases__, namespace)
+    new_class.__qualname__ = element_class.__qualname__
+    _replace_class_cells(namespace, element_class, new_class)
+    return new_class
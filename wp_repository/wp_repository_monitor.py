@@ -0,0 +1,469 @@
+"""
+    Copyright 2021 Walter Pachlinger (walter.pachlinger@gmail.com)
+
+    Licensed under the EUPL, Version 1.2 or - as soon they will be approved by the European
+    Commission - subsequent versions of the EUPL (the LICENSE). You may not use this work except
+    in compliance with the LICENSE. You may obtain a copy of the LICENSE at:
+
+        https://joinup.ec.europa.eu/software/page/eupl
+
+    Unless required by applicable law or agreed to in writing, software distributed under the
+    LICENSE is distributed on an "AS IS" basis, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+    either express or implied. See the LICENSE for the specific language governing permissions
+    and limitations under the LICENSE.
+"""
+import logging
+import re
+import sqlite3
+import threading
+from collections import namedtuple
+from time import perf_counter
+from wp_repository_cache import LRUCache
+
+# Matches string and numeric literals embedded in a statement text
+_LITERAL = re.compile(r"'(?:[^']|'')*'|(?<![\w.])\d+(?:\.\d+)?(?:[eE][-+]?\d+)?(?![\w.])")
+
+# Matches lists of two or more parameter markers, e.g. the padded "IN ( ?,?,?,? )" lists of "select_where"
+_PARAM_LIST = re.compile(r'\?(?:\s*,\s*\?)+')
+
+# Shape of the statements aggregated after the maximum number of statement shapes has been reached
+OTHER_STATEMENTS = '<other statements>'
+
+_StatementEventBase = namedtuple('_StatementEventBase', ['stmt_text', 'shape', 'param_count', 'row_count',
+                                                         'execute_time', 'fetch_time', 'load_time', 'commit_time'])
+
+class StatementEvent(_StatementEventBase):
+    """ Measurements of a single execution of a SQL statement, passed to the hooks of a StatementMonitor.
+        All times are in seconds.
+
+    Attributes:
+        stmt_text : str
+            Text of the executed SQL statement.
+        shape : str
+            Statement text with literals replaced by "?" and lists of parameter markers collapsed to "?, ...".
+        param_count : int
+            Number of parameters of the statement (of the first parameter set for "executemany").
+        row_count : int
+            Number of fetched rows (SELECT) or affected rows (INSERT, UPDATE, DELETE).
+        execute_time : float
+            Time spent in "execute" or "executemany".
+        fetch_time : float
+            Time spent fetching rows from the cursor.
+        load_time : float
+            Time spent converting the rows into elements or columns.
+        commit_time : float
+            Time spent committing the transaction after the statement.
+
+    Properties:
+        total_time : float
+            Sum of all measured times.
+    """
+    __slots__ = ()
+
+    @property
+    def total_time(self) -> float:
+        """ Sum of all measured times.
+
+        Returns:
+            float : execute, fetch, load and commit time in seconds.
+        """
+        return self.execute_time + self.fetch_time + self.load_time + self.commit_time
+
+
+class StatementStats:
+    """ Aggregated measurements of all executions of a statement shape.
+
+    Attributes:
+        count : int
+            Number of executions.
+        row_count : int
+            Total number of fetched or affected rows.
+        execute_time, fetch_time, load_time, commit_time : float
+            Total time spent in the corresponding phase in seconds.
+        max_time : float
+            Longest total time of a single execution in seconds.
+        slow_count : int
+            Number of executions exceeding the slow statement threshold.
+
+    Properties:
+        total_time : float
+            Total time of all executions in seconds.
+        mean_time : float
+            Average total time of an execution in seconds.
+
+    Methods:
+        StatementStats()
+            Constructor.
+        add : None
+            Adds the measurements of a single execution.
+        as_dict : dict
+            Returns the aggregates as a dictionary.
+    """
+    __slots__ = ('count', 'row_count', 'execute_time', 'fetch_time', 'load_time', 'commit_time', 'max_time',
+                 'slow_count')
+
+    def __init__(self):
+        """ Constructor. """
+        self.count = 0
+        self.row_count = 0
+        self.execute_time = 0.0
+        self.fetch_time = 0.0
+        self.load_time = 0.0
+        self.commit_time = 0.0
+        self.max_time = 0.0
+        self.slow_count = 0
+
+    @property
+    def total_time(self) -> float:
+        """ Total time of all executions in seconds. """
+        return self.execute_time + self.fetch_time + self.load_time + self.commit_time
+
+    @property
+    def mean_time(self) -> float:
+        """ Average total time of an execution in seconds (0.0 if there was no execution). """
+        return self.total_time / self.count if self.count > 0 else 0.0
+
+    def add(self, event: StatementEvent, is_slow: bool) -> None:
+        """ Adds the measurements of a single execution.
+
+        Parameters:
+            event : StatementEvent
+                Measurements of the execution.
+            is_slow : bool
+                Indicates whether or not the execution exceeded the slow statement threshold.
+        """
+        self.count += 1
+        self.row_count += event.row_count
+        self.execute_time += event.execute_time
+        self.fetch_time += event.fetch_time
+        self.load_time += event.load_time
+        self.commit_time += event.commit_time
+        self.max_time = max(self.max_time, event.total_time)
+        if is_slow:
+            self.slow_count += 1
+
+    def as_dict(self) -> dict:
+        """ Returns the aggregates as a dictionary.
+
+        Returns:
+            dict : {aggregate name: value}, including "total_time" and "mean_time".
+        """
+        res = {name: getattr(self, name) for name in self.__slots__}
+        res['total_time'] = self.total_time
+        res['mean_time'] = self.mean_time
+        return res
+
+
+class StatementMonitor:
+    """ Collects the measurements of the SQL statements executed by SQLiteRepository instances: aggregates by
+        statement shape, hooks called for every execution, and a log of slow statements. The measurements of
+        an execution are collected per thread; an execution is complete when the repository operation calls
+        "finish" or the thread executes the next statement.
+
+    Attributes:
+        _slow_threshold : float
+            Total time in seconds above which an execution is logged as slow, or None.
+        _logger : logging.Logger
+            Logger receiving the slow statement messages.
+        _hooks : list
+            Functions called with the StatementEvent of every execution.
+        _max_shapes : int
+            Maximum number of statement shapes with aggregates of their own.
+        _stats : dict
+            StatementStats by statement shape; further shapes are aggregated as OTHER_STATEMENTS.
+        _shapes : LRUCache
+            Statement shapes by statement text (most recently used texts only).
+        _current : threading.local
+            Measurements of the current execution of every thread.
+        _lock : threading.Lock
+            Lock serializing the updates of the aggregates.
+
+    Properties:
+        slow_threshold : float
+            Getter and setter for the "_slow_threshold" instance attribute.
+
+    Methods:
+        StatementMonitor()
+            Constructor.
+        add_hook : None
+            Registers a function called with the StatementEvent of every execution.
+        remove_hook : None
+            Unregisters a function registered by "add_hook".
+        statistics : dict
+            Returns the aggregates by statement shape.
+        reset : None
+            Discards all aggregates.
+        shape : str
+            Returns the shape of a statement text.
+        executed : None
+            Starts the measurements of a new execution.
+        fetched : None
+            Adds fetch time and fetched rows to the current execution.
+        loaded : None
+            Adds load time to the current execution.
+        committed : None
+            Adds commit time to the current execution.
+        finish : None
+            Completes the current execution.
+        record : None
+            Adds the measurements of a complete execution.
+    """
+    def __init__(self, slow_threshold: float = None, logger: logging.Logger = None, max_shapes: int = 1000):
+        """ Constructor.
+
+        Parameters:
+            slow_threshold : float, optional
+                Total time in seconds above which an execution is logged as slow. Default value is None
+                (no slow statement log).
+            logger : logging.Logger, optional
+                Logger receiving the slow statement messages (level WARNING). Default is the logger
+                "wp_repository".
+            max_shapes : int, optional
+                Maximum number of statement shapes with aggregates of their own; the executions of further
+                shapes are aggregated as OTHER_STATEMENTS. Also the number of statement texts whose shape is
+                cached. Default value is 1000.
+        """
+        self._slow_threshold = slow_threshold
+        self._logger = logger if logger is not None else logging.getLogger('wp_repository')
+        self._hooks = []
+        self._max_shapes = max_shapes
+        self._stats = {}
+        self._shapes = LRUCache(max_shapes)
+        self._current = threading.local()
+        self._lock = threading.Lock()
+
+    @property
+    def slow_threshold(self) -> float:
+        """ Getter for the "_slow_threshold" instance attribute.
+
+        Returns:
+            float : total time in seconds above which an execution is logged as slow, or None.
+        """
+        return self._slow_threshold
+
+    @slow_threshold.setter
+    def slow_threshold(self, value: float) -> None:
+        """ Setter for the "_slow_threshold" instance attribute. """
+        self._slow_threshold = value
+
+    def add_hook(self, hook) -> None:
+        """ Registers a function called with the StatementEvent of every execution. Hooks are called on the
+            thread executing the statement.
+
+        Parameters:
+            hook : function
+                Function accepting a StatementEvent.
+        """
+        self._hooks = self._hooks + [hook]
+
+    def remove_hook(self, hook) -> None:
+        """ Unregisters a function registered by "add_hook".
+
+        Parameters:
+            hook : function
+                The registered function.
+        """
+        self._hooks = [registered for registered in self._hooks if registered is not hook]
+
+    def statistics(self) -> dict:
+        """ Returns the aggregates by statement shape.
+
+        Returns:
+            dict : {statement shape: StatementStats.as_dict()}.
+        """
+        with self._lock:
+            return {shape: stats.as_dict() for shape, stats in self._stats.items()}
+
+    def reset(self) -> None:
+        """ Discards all aggregates. """
+        with self._lock:
+            self._stats = {}
+
+    def shape(self, stmt_text: str) -> str:
+        """ Returns the shape of a statement text: literals are replaced by parameter markers and lists of
+            parameter markers are collapsed to "?, ...", so that statements differing only in their literals
+            or in the length of IN lists are aggregated together.
+
+        Parameters:
+            stmt_text : str
+                Text of a SQL statement.
+
+        Returns:
+            str : statement shape.
+        """
+        shape = self._shapes.get(stmt_text)
+        if shape is None:
+            shape = _PARAM_LIST.sub('?, ...', _LITERAL.sub('?', stmt_text))
+            self._shapes.put(stmt_text, shape)
+        return shape
+
+    def executed(self, stmt_text: str, param_count: int, execute_time: float, row_count: int) -> None:
+        """ Starts the measurements of a new execution on the calling thread, completing the previous one.
+
+        Parameters:
+            stmt_text : str
+                Text of the executed SQL statement.
+            param_count : int
+                Number of parameters of the statement.
+            execute_time : float
+                Time spent executing the statement in seconds.
+            row_count : int
+                Number of affected rows (0 for SELECT statements).
+        """
+        self.finish()
+        self._current.event = [stmt_text, param_count, row_count, execute_time, 0.0, 0.0, 0.0]
+
+    def fetched(self, fetch_time: float, row_count: int) -> None:
+        """ Adds fetch time and fetched rows to the current execution of the calling thread.
+
+        Parameters:
+            fetch_time : float
+                Time spent fetching in seconds.
+            row_count : int
+                Number of fetched rows.
+        """
+        event = getattr(self._current, 'event', None)
+        if event is not None:
+            event[2] += row_count
+            event[4] += fetch_time
+
+    def loaded(self, load_time: float) -> None:
+        """ Adds load time to the current execution of the calling thread.
+
+        Parameters:
+            load_time : float
+                Time spent converting rows in seconds.
+        """
+        event = getattr(self._current, 'event', None)
+        if event is not None:
+            event[5] += load_time
+
+    def committed(self, commit_time: float) -> None:
+        """ Adds commit time to the current execution of the calling thread.
+
+        Parameters:
+            commit_time : float
+                Time spent committing in seconds.
+        """
+        event = getattr(self._current, 'event', None)
+        if event is not None:
+            event[6] += commit_time
+
+    def finish(self) -> None:
+        """ Completes the current execution of the calling thread, if any, and records its measurements. """
+        event = getattr(self._current, 'event', None)
+        if event is not None:
+            self._current.event = None
+            stmt_text, param_count, row_count, execute_time, fetch_time, load_time, commit_time = event
+            self.record(stmt_text, param_count, row_count, execute_time, fetch_time, load_time, commit_time)
+
+    def record(self, stmt_text: str, param_count: int, row_count: int, execute_time: float,
+               fetch_time: float = 0.0, load_time: float = 0.0, commit_time: float = 0.0) -> None:
+        """ Adds the measurements of a complete execution to the aggregates, calls the hooks and logs the
+            execution if it exceeds the slow statement threshold.
+
+        Parameters:
+            stmt_text : str
+                Text of the executed SQL statement.
+            param_count : int
+                Number of parameters of the statement.
+            row_count : int
+                Number of fetched or affected rows.
+            execute_time, fetch_time, load_time, commit_time : float
+                Time spent in the corresponding phase in seconds.
+        """
+        # pylint: disable=too-many-arguments
+        event = StatementEvent(stmt_text, self.shape(stmt_text), param_count, row_count, execute_time, fetch_time,
+                               load_time, commit_time)
+        is_slow = self._slow_threshold is not None and event.total_time >= self._slow_threshold
+        with self._lock:
+            stats = self._stats.get(event.shape)
+            if stats is None:
+                shape = event.shape if len(self._stats) < self._max_shapes else OTHER_STATEMENTS
+                stats = self._stats.get(shape)
+                if stats is None:
+                    stats = StatementStats()
+                    self._stats[shape] = stats
+            stats.add(event, is_slow)
+        if is_slow:
+            self._logger.warning('Slow statement (%.6f s: execute %.6f, fetch %.6f, load %.6f, commit %.6f; '
+                                 '%d parameters, %d rows): %s', event.total_time, execute_time, fetch_time,
+                                 load_time, commit_time, param_count, row_count, stmt_text)
+        for hook in self._hooks:
+            hook(event)
+
+
+class MonitoredCursor:
+    """ Wrapper of a sqlite3.Cursor reporting the execute and fetch times of all statements to a
+        StatementMonitor. Used by SQLiteRepository while a monitor is enabled.
+
+    Attributes:
+        _cursor : sqlite3.Cursor
+            The wrapped cursor.
+        _monitor : StatementMonitor
+            Monitor receiving the measurements.
+
+    Methods:
+        MonitoredCursor()
+            Constructor.
+        execute, executemany : MonitoredCursor
+            See sqlite3.Cursor.
+        fetchone, fetchmany, fetchall : Any
+            See sqlite3.Cursor.
+        __getattr__ : Any
+            Delegates all other attributes (e.g. "rowcount", "lastrowid", "close") to the wrapped cursor.
+    """
+    __slots__ = ('_cursor', '_monitor')
+
+    def __init__(self, cursor: sqlite3.Cursor, monitor: StatementMonitor):
+        """ Constructor.
+
+        Parameters:
+            cursor : sqlite3.Cursor
+                The cursor to be wrapped.
+            monitor : StatementMonitor
+                Monitor receiving the measurements.
+        """
+        self._cursor = cursor
+        self._monitor = monitor
+
+    def __getattr__(self, name: str):
+        """ Delegates all other attributes to the wrapped cursor. """
+        return getattr(self._cursor, name)
+
+    def execute(self, stmt_text: str, stmt_params = ()):
+        """ See sqlite3.Cursor.execute. """
+        start = perf_counter()
+        self._cursor.execute(stmt_text, stmt_params)
+        self._monitor.executed(stmt_text, len(stmt_params), perf_counter() - start, max(self._cursor.rowcount, 0))
+        return self
+
+    def executemany(self, stmt_text: str, param_sets):
+        """ See sqlite3.Cursor.executemany. """
+        param_sets = list(param_sets)
+        start = perf_counter()
+        self._cursor.executemany(stmt_text, param_sets)
+        self._monitor.executed(stmt_text, len(param_sets[0]) if len(param_sets) > 0 else 0,
+                               perf_counter() - start, max(self._cursor.rowcount, 0))
+        return self
+
+    def fetchone(self):
+        """ See sqlite3.Cursor.fetchone. """
+        start = perf_counter()
+        row = self._cursor.fetchone()
+        self._monitor.fetched(perf_counter() - start, 0 if row is None else 1)
+        return row
+
+    def fetchmany(self, size: int):
+        """ See sqlite3.Cursor.fetchmany. """
+        start = perf_counter()
+        rows = self._cursor.fetchmany(size)
+        self._monitor.fetched(perf_counter() - start, len(rows))
+        return rows
+
+    def fetchall(self):
+        """ See sqlite3.Cursor.fetchall. """
+        start = perf_counter()
+        rows = self._cursor.fetchall()
+        self._monitor.fetched(perf_counter() - start, len(rows))
+        return rows
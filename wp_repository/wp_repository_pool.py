@@ -0,0 +1,346 @@
+"""
+    Copyright 2021 Walter Pachlinger (walter.pachlinger@gmail.com)
+
+    Licensed under the EUPL, Version 1.2 or - as soon they will be approved by the European
+    Commission - subsequent versions of the EUPL (the LICENSE). You may not use this work except
+    in compliance with the LICENSE. You may obtain a copy of the LICENSE at:
+
+        https://joinup.ec.europa.eu/software/page/eupl
+
+    Unless required by applicable law or agreed to in writing, software distributed under the
+    LICENSE is distributed on an "AS IS" basis, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+    either express or implied. See the LICENSE for the specific language governing permissions
+    and limitations under the LICENSE.
+"""
+import os
+import sqlite3
+import threading
+from urllib.request import pathname2url
+from datetime import datetime
+from wp_repository_elem import parse_datetime, epoch_us_to_datetime
+
+def _adapt_datetime(cls_attr_value: datetime) -> str:
+    """ Adapter storing datetime values as ISO 8601 text ("YYYY-MM-DD HH:MM:SS[.ffffff]"). """
+    return cls_attr_value.isoformat(' ')
+
+def _convert_datetime(db_attr_value: bytes) -> datetime:
+    """ Converter for columns declared as DATETIME or TIMESTAMP. Accepts ISO 8601 text as well as
+        integer microseconds since the epoch (negative for timestamps before 1970).
+    """
+    try:
+        epoch_us = int(db_attr_value)
+    except ValueError:
+        return parse_datetime(db_attr_value.decode())
+    return epoch_us_to_datetime(epoch_us)
+
+def register_datetime_types() -> None:
+    """ Registers the adapter for datetime values and the converters for columns declared as DATETIME or
+        TIMESTAMP with the sqlite3 module. Called by "open_connection" in "native_datetime" mode.
+        The sqlite3 module keeps adapters and converters process-wide: after the first call, datetime
+        parameters of every sqlite3 connection in the process are stored by "_adapt_datetime", and the
+        DATETIME and TIMESTAMP columns of every connection opened with "detect_types" are converted by
+        "_convert_datetime", including connections not used by a repository.
+    """
+    sqlite3.register_adapter(datetime, _adapt_datetime)
+    sqlite3.register_converter('DATETIME', _convert_datetime)
+    sqlite3.register_converter('TIMESTAMP', _convert_datetime)
+
+PRAGMA_PROFILES = {
+    'durable': {
+        'journal_mode': 'WAL',
+        'synchronous': 'FULL',
+        'busy_timeout': 5000
+    },
+    'fast-ingest': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'cache_size': -65536,
+        'temp_store': 'MEMORY',
+        'wal_autocheckpoint': 10000,
+        'busy_timeout': 5000
+    },
+    'read-mostly': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'cache_size': -32768,
+        'mmap_size': 268435456,
+        'temp_store': 'MEMORY',
+        'busy_timeout': 5000
+    }
+}
+
+_PRAGMA_NAMES = ['journal_mode', 'synchronous', 'cache_size', 'mmap_size', 'temp_store', 'busy_timeout',
+                 'wal_autocheckpoint', 'locking_mode', 'cache_spill', 'foreign_keys']
+
+def resolve_pragmas(pragmas) -> dict:
+    """ Converts a PRAGMA profile name or a dictionary of PRAGMA settings into a validated dictionary.
+
+    Parameters:
+        pragmas : str or dict
+            Name of a profile in PRAGMA_PROFILES ("durable", "fast-ingest", "read-mostly"), a dictionary
+            {pragma_name: value}, or None.
+
+    Returns:
+        dict : PRAGMA settings to be applied (empty if "pragmas" is None).
+    """
+    if pragmas is None:
+        return {}
+    if isinstance(pragmas, str):
+        if pragmas not in PRAGMA_PROFILES:
+            raise ValueError('Invalid PRAGMA profile: "{}"'.format(pragmas))
+        return dict(PRAGMA_PROFILES[pragmas])
+    res = {}
+    for pragma_name, pragma_value in pragmas.items():
+        if pragma_name not in _PRAGMA_NAMES:
+            raise ValueError('Invalid PRAGMA: "{}"'.format(pragma_name))
+        if not isinstance(pragma_value, int) and not str(pragma_value).replace('-', '').isalnum():
+            raise ValueError('Invalid value for PRAGMA {}: "{}"'.format(pragma_name, pragma_value))
+        res[pragma_name] = pragma_value
+    return res
+
+def apply_pragmas(sql_connection: sqlite3.Connection, pragmas: dict) -> dict:
+    """ Applies PRAGMA settings to a connection and reads back their effective values.
+
+    Parameters:
+        sql_connection : sqlite3.Connection
+            Open connection to a SQLite database.
+        pragmas : dict
+            PRAGMA settings {pragma_name: value}, as returned by "resolve_pragmas".
+
+    Returns:
+        dict : effective value of every PRAGMA as reported by SQLite.
+    """
+    res = {}
+    cursor = sql_connection.cursor()
+    for pragma_name, pragma_value in pragmas.items():
+        cursor.execute('PRAGMA {} = {}'.format(pragma_name, pragma_value))
+        cursor.fetchall()
+    for pragma_name in pragmas:
+        cursor.execute('PRAGMA {}'.format(pragma_name))
+        row = cursor.fetchone()
+        res[pragma_name] = None if row is None else row[0]
+    cursor.close()
+    return res
+
+def open_connection(sqlite_file_path: str, native_datetime: bool = False,
+                    check_same_thread: bool = True, timeout: float = 5.0,
+                    read_only: bool = False) -> sqlite3.Connection:
+    """ Opens a connection to a SQLite database and applies the settings common to all connections
+        used by a SQLiteRepository (PRAGMA foreign_keys=ON).
+
+    Parameters:
+        sqlite_file_path : str
+            Full path name of the SQLite database file to open.
+        native_datetime : bool, optional
+            If True, datetime adapters and converters are registered (process-wide, see
+            "register_datetime_types") and the connection is opened with "detect_types". Default value
+            is "False".
+        check_same_thread : bool, optional
+            Passed to "sqlite3.connect". Default value is "True".
+        timeout : float, optional
+            Number of seconds to wait for a locked database. Default value is 5.0.
+        read_only : bool, optional
+            If True, the database file is opened in read-only mode. Default value is "False".
+
+    Returns:
+        sqlite3.Connection : the open connection.
+    """
+    # pylint: disable=too-many-arguments
+    if sqlite_file_path is None:
+        raise ValueError("No path to SQLite database found.")
+    connect_args = {'timeout': timeout, 'check_same_thread': check_same_thread}
+    if read_only:
+        sqlite_file_path = 'file:{}?mode=ro'.format(pathname2url(os.path.abspath(sqlite_file_path)))
+        connect_args['uri'] = True
+    if native_datetime:
+        register_datetime_types()
+        connect_args['detect_types'] = sqlite3.PARSE_DECLTYPES
+    sql_connection = sqlite3.connect(sqlite_file_path, **connect_args)
+    cursor = sql_connection.cursor()
+    cursor.execute('PRAGMA foreign_keys=ON')
+    cursor.close()
+    return sql_connection
+
+
+class SQLiteConnectionPool:
+    """ Pool of connections to a single SQLite database file, to be shared by SQLiteRepository instances
+        used from several threads. Every thread gets its own connection, opened with the same settings.
+        Write operations of the repositories bound to the pool are serialized by a single writer lock,
+        while reads run concurrently; in WAL mode readers are not blocked by the writer.
+
+    Attributes:
+        _sql_file_path : str
+            Full path name of the SQLite database file.
+        _native_datetime : bool
+            Passed to "open_connection" for every new connection.
+        _timeout : float
+            Number of seconds a connection waits for a locked database.
+        _wal_mode : bool
+            Indicates whether or not the database is switched to WAL journal mode.
+        _pragmas : dict
+            PRAGMA settings applied to every new connection.
+        _pragma_settings : dict
+            Effective PRAGMA values reported by the first connection.
+        _local : threading.local
+            Holds the connection of the current thread.
+        _connections : list
+            All connections opened by the pool.
+        _pool_lock : threading.Lock
+            Lock protecting the list of connections.
+        _write_lock : threading.RLock
+            Lock serializing the write operations of all threads.
+
+    Properties:
+        sqlite_file_path : str
+            Getter for the "_sql_file_path" instance attribute.
+        write_lock : threading.RLock
+            Getter for the "_write_lock" instance attribute.
+        num_connections : int
+            Number of connections currently open.
+        pragma_settings : dict
+            Getter for the "_pragma_settings" instance attribute.
+
+    Methods:
+        SQLiteConnectionPool()
+            Constructor.
+        __enter__ : SQLiteConnectionPool
+            Enter method allowing SQLiteConnectionPool instances to be used in "with" statements.
+        __exit__ : None
+            Exit method closing all connections of the pool.
+        connection : sqlite3.Connection
+            Returns the connection of the calling thread, opening it on first use.
+        release : None
+            Closes the connection of the calling thread.
+        close : None
+            Closes all connections of the pool.
+        _open : sqlite3.Connection
+            Opens a new connection with the settings of the pool.
+    """
+    def __init__(self, sqlite_file_path: str, native_datetime: bool = False, timeout: float = 5.0,
+                 wal_mode: bool = True, pragmas = None):
+        """ Constructor.
+
+        Parameters:
+            sqlite_file_path : str
+                Full path name of the SQLite database file.
+            native_datetime : bool, optional
+                Passed to "open_connection" for every new connection. Default value is "False".
+            timeout : float, optional
+                Number of seconds a connection waits for a locked database. Default value is 5.0.
+            wal_mode : bool, optional
+                If True, the database is switched to WAL journal mode when the first connection is
+                opened. Default value is "True".
+            pragmas : str or dict, optional
+                PRAGMA profile name or dictionary of PRAGMA settings applied to every new connection
+                (see "resolve_pragmas").
+        """
+        if sqlite_file_path is None:
+            raise ValueError("No path to SQLite database found.")
+        self._sql_file_path = sqlite_file_path
+        self._native_datetime = native_datetime
+        self._timeout = timeout
+        self._wal_mode = wal_mode
+        self._pragmas = resolve_pragmas(pragmas)
+        self._pragma_settings = {}
+        self._local = threading.local()
+        self._connections = []
+        self._pool_lock = threading.Lock()
+        self._write_lock = threading.RLock()
+
+    def __enter__(self):
+        """ Enter method allowing SQLiteConnectionPool instances to be used in "with" statements.
+
+        Returns:
+            SQLiteConnectionPool : reference to the pool.
+        """
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback) -> None:
+        """ Exit method closing all connections of the pool. """
+        self.close()
+
+    @property
+    def sqlite_file_path(self) -> str:
+        """ Getter for the "_sql_file_path" instance attribute.
+
+        Returns:
+            str : full path name of the SQLite database file.
+        """
+        return self._sql_file_path
+
+    @property
+    def write_lock(self) -> threading.RLock:
+        """ Getter for the "_write_lock" instance attribute.
+
+        Returns:
+            threading.RLock : lock serializing the write operations of all threads.
+        """
+        return self._write_lock
+
+    @property
+    def num_connections(self) -> int:
+        """ Number of connections currently open.
+
+        Returns:
+            int : number of open connections.
+        """
+        return len(self._connections)
+
+    @property
+    def pragma_settings(self) -> dict:
+        """ Getter for the "_pragma_settings" instance attribute.
+
+        Returns:
+            dict : effective PRAGMA values reported by the first connection of the pool.
+        """
+        return self._pragma_settings
+
+    def connection(self) -> sqlite3.Connection:
+        """ Returns the connection of the calling thread, opening it on first use.
+
+        Returns:
+            sqlite3.Connection : connection reserved for the calling thread.
+        """
+        sql_connection = getattr(self._local, 'sql_connection', None)
+        if sql_connection is None:
+            sql_connection = self._open()
+            self._local.sql_connection = sql_connection
+        return sql_connection
+
+    def release(self) -> None:
+        """ Closes the connection of the calling thread (e.g. before the thread terminates). """
+        sql_connection = getattr(self._local, 'sql_connection', None)
+        if sql_connection is not None:
+            self._local.sql_connection = None
+            with self._pool_lock:
+                self._connections.remove(sql_connection)
+            sql_connection.close()
+
+    def close(self) -> None:
+        """ Closes all connections of the pool. Must not be called while other threads use the pool. """
+        with self._pool_lock:
+            connections = self._connections
+            self._connections = []
+        for sql_connection in connections:
+            sql_connection.close()
+        self._local = threading.local()
+
+    def _open(self) -> sqlite3.Connection:
+        """ Opens a new connection with the settings of the pool.
+
+        Returns:
+            sqlite3.Connection : the new connection.
+        """
+        sql_connection = open_connection(self._sql_file_path, self._native_datetime,
+                                         check_same_thread=False, timeout=self._timeout)
+        with self._pool_lock:
+            is_first = len(self._connections) == 0
+            self._connections.append(sql_connection)
+        pragmas = self._pragmas
+        if is_first and self._wal_mode and 'journal_mode' not in pragmas:
+            pragmas = dict(pragmas, journal_mode='WAL')
+        with self._write_lock:
+            pragma_settings = apply_pragmas(sql_connection, pragmas)
+        if is_first:
+            self._pragma_settings = pragma_settings
+        return sql_connection
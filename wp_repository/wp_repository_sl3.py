@@ -12,10 +12,132 @@
     either express or implied. See the LICENSE for the specific language governing permissions
     and limitations under the LICENSE.
 """
+import os
+import re
 import sqlite3
-from wp_repository_elem import RepositoryElement
+import warnings
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager, nullcontext
+from functools import reduce
+from itertools import islice
+from numbers import Number
+from time import perf_counter
+try:
+    import numpy
+except ImportError:
+    numpy = None
+from wp_repository_elem import RepositoryElement, _value_converter
+from wp_repository_cache import LRUCache
+from wp_repository_snapshot import SQLiteSnapshot
+from wp_repository_monitor import StatementMonitor, MonitoredCursor
+from wp_repository_pool import SQLiteConnectionPool, open_connection, resolve_pragmas, apply_pragmas
 from wp_sql_statement import SQLStatement
 
+# Active "SQLiteRepository.transaction" scopes by connection: one list per nesting level, holding the states of
+# the elements stored within that level (see "SQLiteRepository._element_state"). An entry exists only while a
+# transaction is active, so that all repositories sharing a connection respect the scope. The entry keys the
+# connection object itself (sqlite3 connections do not support weak references), so that its id cannot be
+# reused by another connection while the scope is active.
+_ACTIVE_TRANSACTIONS = {}
+
+# Default of optional arguments for which None is a legal value (e.g. "initial" of "SQLiteRepository.parallel_scan")
+_MISSING = object()
+
+# Type codes of the "array.array" columns created by "SQLiteRepository.select_columnar" by class attribute type
+_ARRAY_TYPECODES = {int: 'q', float: 'd', bool: 'b'}
+
+def _extend_column(column, values: tuple, converter):
+    """ Appends the values of one column of a chunk of cursor rows to a result column of "select_columnar".
+        Values an "array.array" column cannot hold (e.g. NULL) turn it into a list.
+
+    Parameters:
+        column : array.array or list
+            Result column.
+        values : tuple
+            Column values of the chunk as read from the cursor.
+        converter : function
+            Callable converting a database value to the type of the class attribute.
+
+    Returns:
+        array.array or list : the extended column (a new list if the array had to be converted).
+    """
+    if isinstance(column, array):
+        col_len = len(column)
+        try:
+            column.extend(values)
+            return column
+        except (TypeError, OverflowError):
+            del column[col_len:]
+        values = [converter(value) for value in values]
+        try:
+            column.extend(values)
+            return column
+        except (TypeError, OverflowError):
+            del column[col_len:]
+            column = column.tolist()
+        column.extend(values)
+        return column
+    column.extend([converter(value) for value in values])
+    return column
+
+def _scan_partition(contents_type: type, sqlite_file_path: str, native_datetime: bool, where_criteria: list,
+                    rowid_range: tuple, map_func, fetch_size: int):
+    """ Worker function of "SQLiteRepository.parallel_scan": opens a read-only connection, streams the entries
+        of one rowid range and applies the map function to them. Executed in a worker process.
+
+    Parameters:
+        contents_type : type
+            Contents class (sub-class of RepositoryElement defined at module level).
+        sqlite_file_path : str
+            Full path name of the SQLite database file.
+        native_datetime : bool
+            See SQLiteRepository.
+        where_criteria : list
+            Criteria for selecting the entries.
+        rowid_range : tuple
+            (first rowid, last rowid) of the partition.
+        map_func : function
+            Function (defined at module level) called with an iterator over the elements of the partition.
+        fetch_size : int
+            Number of rows fetched from the cursor at once.
+
+    Returns:
+        Any : result of the map function.
+    """
+    # pylint: disable=too-many-arguments
+    sql_connection = open_connection(sqlite_file_path, native_datetime, read_only=True)
+    try:
+        repo = SQLiteRepository(contents_type, sql_connection=sql_connection)
+        select_stmt = contents_type().select_rowid_range_statement(where_criteria, rowid_range[0], rowid_range[1])
+        return map_func(repo.iter_query(select_stmt, fetch_size))
+    finally:
+        sql_connection.close()
+
+def _rowid_partitions(first_rowid: int, last_rowid: int, num_partitions: int) -> list:
+    """ Splits a range of rowids into contiguous partitions of equal size.
+
+    Parameters:
+        first_rowid : int
+            Lowest rowid.
+        last_rowid : int
+            Highest rowid.
+        num_partitions : int
+            Maximum number of partitions.
+
+    Returns:
+        list : (first rowid, last rowid) of every partition.
+    """
+    part_size = -(-(last_rowid - first_rowid + 1) // num_partitions)
+    return [(part_start, min(part_start + part_size - 1, last_rowid))
+            for part_start in range(first_rowid, last_rowid + 1, part_size)]
+
+class QueryPlanWarning(UserWarning):
+    """ Warning issued by the query plan check of SQLiteRepository if a statement scans the whole table. """
+
+class QueryPlanError(RuntimeError):
+    """ Error raised by the query plan check of SQLiteRepository if a statement scans the whole table. """
+
 class SQLiteRepository:
     """ The repository class following the "Repository" design pattern. Maps Python objects onto a
         relational table and allows for DML operations (insert, update, delete, select) on the
@@ -30,6 +152,30 @@ class SQLiteRepository:
             Type of the contents class
         _can_close : bool
             Indicates whether or not the DB session can be closed by the object instance itself.
+        _native_datetime : bool
+            Indicates whether or not the sqlite3 module shall convert DATETIME and TIMESTAMP columns.
+        _key_cache : LRUCache
+            Cache of elements retrieved by "select_by_key", or None if caching is disabled.
+        _connection_pool : SQLiteConnectionPool
+            Pool providing the connection of the calling thread, or None.
+        _pragmas : dict
+            PRAGMA settings applied when the connection is opened.
+        _pragma_settings : dict
+            Effective PRAGMA values reported by SQLite after opening the connection.
+        _plan_check : str
+            Action taken if a "select_where" statement scans the whole table ("warn", "raise"), or None.
+        _checked_plans : LRUCache
+            Texts of the statements whose query plan has already been checked (most recently used texts only),
+            or None if the query plan check has never been enabled.
+        _snapshot : SQLiteSnapshot
+            In-memory copy of the database serving the reads of the repository, or None.
+        _result_cache : LRUCache
+            Cache of the rows retrieved by SELECT statements, or None if result caching is disabled.
+        _result_versions : dict
+            Database version (total changes, data version) the cached results are based on, by id of the
+            connection.
+        _monitor : StatementMonitor
+            Monitor collecting the measurements of the executed statements, or None.
 
     Methods:
         SQLiteRepository()
@@ -39,7 +185,7 @@ class SQLiteRepository:
         __exit__ : None
             Exit method allowing SQLiteRepository instances to be used in "with" statements.
         open : None
-            Opens the session to a SQLite database.
+            Opens the session to a SQLite database and applies the requested PRAGMA settings.
         close : None
             Closes the session to the SQLite database.
         insert : int
@@ -49,32 +195,175 @@ class SQLiteRepository:
             Updates the underlying database record with data from the given contents class object.
         delete : int
             Deletes the row identified by the given element from the underlying table.
+        upsert : int
+            Inserts an object of the contents class or updates the existing row with the same primary key.
+        upsert_many : int
+            Inserts or updates a collection of contents class objects in a single transaction.
+        update_where : int
+            Sets attributes of all entries matching the given criteria with a single UPDATE statement.
+        delete_where : int
+            Deletes all entries matching the given criteria with a single DELETE statement.
+        transaction : context manager
+            Unit of work: defers all commits to the end of the block and rolls back on exceptions.
+        insert_many : int
+            Inserts a collection of contents class objects into the underlying table in a single transaction.
+        update_many : int
+            Updates the underlying database records with data from a collection of contents class objects
+            in a single transaction.
+        delete_many : int
+            Deletes the rows identified by a collection of contents class objects in a single transaction.
         select_by_key : RepositoryObject
             Selects the single element identified by the primary key values of the given parameter element
             from the underlying table.
+        enable_key_cache : LRUCache
+            Enables the cache of elements retrieved by "select_by_key".
+        disable_key_cache : None
+            Disables the cache of elements retrieved by "select_by_key".
+        enable_snapshot : SQLiteSnapshot
+            Serves the reads of the repository from an in-memory copy of the database.
+        disable_snapshot : None
+            Serves the reads of the repository from the database file again.
+        enable_result_cache : LRUCache
+            Enables the cache of the rows retrieved by SELECT statements.
+        disable_result_cache : None
+            Disables the cache of the rows retrieved by SELECT statements.
+        enable_monitor : StatementMonitor
+            Enables the measurement of the executed statements.
+        disable_monitor : None
+            Disables the measurement of the executed statements.
+        create_indexes : int
+            Creates the secondary indexes declared in the Attribute Map of the contents class.
+        verify_indexes : list
+            Returns the names of the declared indexes missing in the database or differing from their declaration.
+        explain : list
+            Returns the query plan of a SQL SELECT statement.
+        enable_plan_check : None
+            Enables the query plan check of the statements created by "select_where" and "iter_where".
+        disable_plan_check : None
+            Disables the query plan check.
         select_all : list
             Retrieves all entries from the repository, sorted by their key attributes.
         select_where : list
             Retrieves all entries from the repository matching the given criteria, sorted by their key
             attributes.
+        select_page : tuple
+            Retrieves one page of the entries matching the given criteria, using keyset pagination.
+        select_columns : list
+            Retrieves a subset of the attributes of the entries matching the given criteria as tuples.
+        select_columnar : dict
+            Retrieves a subset of the attributes of the entries matching the given criteria as columns.
+        aggregate : Any
+            Computes an aggregate function over the entries matching the given criteria inside SQLite.
+        parallel_scan : Any
+            Scans the entries matching the given criteria in rowid partitions on a pool of worker processes.
+        count, sum, min, max, avg : Any
+            Shortcuts for "aggregate" with the corresponding aggregate function.
         query : list
             Executes any SQL SELECT statement passed as parameters and returns the selected list of records.
+        iter_all : generator
+            Generator retrieving all entries from the repository, sorted by their key attributes.
+        iter_where : generator
+            Generator retrieving all entries from the repository matching the given criteria.
+        iter_query : generator
+            Generator executing any SQL SELECT statement and yielding the selected records one by one.
+        iter_columns : generator
+            Generator yielding a subset of the attributes of the entries matching the given criteria as tuples.
+        _select_list : list
+            Executes a SQL SELECT statement and converts all retrieved rows into contents class objects.
+        _iter_statement : generator
+            Validates the fetch size and returns a generator executing a SQL SELECT statement and yielding the
+            retrieved rows one by one.
+        _iter_rows : generator
+            Generator executing a SQL SELECT statement and yielding the retrieved rows one by one.
+        _iter_monitored : generator
+            Variant of "_iter_rows" measuring the statement for the statement monitor.
+        _columns_statement : tuple
+            Creates the projection statement and chooses the row converter for "select_columns" and
+            "iter_columns".
+        _connection : sqlite3.Connection
+            Returns the connection to be used by the calling thread.
+        _read_connection : sqlite3.Connection
+            Returns the connection to be used by the calling thread for reading.
+        _cursor : sqlite3.Cursor
+            Opens a cursor on a connection, measured by the statement monitor if it is enabled.
+        _writer : context manager
+            Returns a context manager serializing write operations on a pooled connection.
+        _in_transaction : bool, static
+            Checks whether or not a "transaction" scope is active on a connection.
+        _commit : None
+            Commits the current transaction unless a "transaction" scope is active.
+        _element_key : tuple, static
+            Returns the primary key values of an element, used as key of the element cache.
+        _invalidate_cached : None
+            Removes the given elements from the element cache, clears the result cache and marks the snapshot
+            as stale.
+        _result_key : tuple
+            Returns the result cache key of a SELECT statement, or None if the result must not be cached.
+        _fetch_all : list
+            Executes a SQL SELECT statement and returns all rows, using the result cache.
+        _execute_where : int
+            Executes a set-based SQL statement created by "update_where" or "delete_where".
+        _execute_bulk : int
+            Executes the statements created by a statement method of a collection of elements in chunks.
+        _save_element_states : None
+            Records the state of elements about to be stored in the innermost active "transaction" scope.
+        _element_state : tuple, static
+            Returns the auto-increment key and the change tracking state of an element before storing it.
+        _restore_element_states : None, static
+            Restores the state of elements after their changes have been rolled back.
+        _execute_many : int, static
+            Executes a list of SQL statements, passing groups of statements with identical text to
+            "executemany".
+        _execute_groups : int, static
+            Executes groups of statements sharing the same text, using "executemany".
+        _check_plan : None
+            Checks the query plan of a SQL SELECT statement for full table scans.
     """
-    def __init__(self, contents_type: type, sqlite_file_path: str = None, sql_connection: sqlite3.Connection = None):
+    def __init__(self, contents_type: type, sqlite_file_path: str = None, sql_connection: sqlite3.Connection = None,
+                 native_datetime: bool = False, connection_pool: SQLiteConnectionPool = None, pragmas = None):
         """ Constructor.
 
         Parameters:
             contents_type: type
                Class name of the contents type, to be used for converting the SQLite cursor row into an
                object.
+            sqlite_file_path : str, optional
+                Full path name of the SQLite database file to open.
             sql_connection: sqlite3.Connection, optional
                 Handle to an open connection to a SQLite database. If specified, this connection will be
                 used for the SQL operations of the SQLiteRepository instance.
+            native_datetime : bool, optional
+                If True, "open" registers adapters and converters for datetime values with the sqlite3
+                module and opens the connection with "detect_types", so that columns declared as DATETIME
+                or TIMESTAMP are returned as datetime objects. The registration is process-wide and also
+                changes how other sqlite3 connections of the process store datetime parameters (see
+                "register_datetime_types"). Default value is "False".
+            connection_pool : SQLiteConnectionPool, optional
+                Pool providing the connection of the calling thread. If specified, the repository can be
+                used from several threads; its write operations are serialized by the writer lock of the pool.
+            pragmas : str or dict, optional
+                PRAGMA settings applied by "open", or at once to the connection passed as "sql_connection": the
+                name of a profile ("durable", "fast-ingest", "read-mostly") or a dictionary {pragma_name: value}.
+                Default value is None. Must not be combined with "connection_pool" (the PRAGMA settings of
+                pooled connections are set by the pool).
         """
         self._sql_file_path = sqlite_file_path
         self._sql_connection = sql_connection
         self._contents_type = contents_type
-        self._can_close = sql_connection is None
+        self._can_close = sql_connection is None and connection_pool is None
+        self._native_datetime = native_datetime
+        self._connection_pool = connection_pool
+        if pragmas is not None and connection_pool is not None:
+            raise ValueError("PRAGMA settings of a pooled repository are set by the connection pool.")
+        self._pragmas = resolve_pragmas(pragmas)
+        self._pragma_settings = {} if sql_connection is None else apply_pragmas(sql_connection, self._pragmas)
+        self._key_cache = None
+        self._plan_check = None
+        self._checked_plans = None
+        self._snapshot = None
+        self._result_cache = None
+        self._result_versions = {}
+        self._monitor = None
 
     def __del__(self):
         """ Destructor. """
@@ -86,7 +375,7 @@ class SQLiteRepository:
         Returns:
             SQLiteRepository : reference to a class instance with open SQLite connection.
         """
-        if self._sql_connection is None:
+        if self._sql_connection is None and self._connection_pool is None:
             self.open(self._sql_file_path)
         return self
 
@@ -96,18 +385,16 @@ class SQLiteRepository:
 
 
     def open(self, sqlite_file_path: str) -> None:
-        """ Opens the session to a SQLite database.
+        """ Opens the session to a SQLite database and applies the requested PRAGMA settings.
 
         Parameters:
             sqlite_file_path : str
                 Full path name of the SQLite database file to open.
         """
-        if sqlite_file_path is None:
-            raise ValueError("No path to SQLite database found.")
-        self._sql_connection = sqlite3.connect(sqlite_file_path)
-        cursor = self._sql_connection.cursor()
-        cursor.execute('PRAGMA foreign_keys=ON')
-        cursor.close()
+        if self._connection_pool is not None:
+            raise ValueError("Repository is bound to a connection pool.")
+        self._sql_connection = open_connection(sqlite_file_path, self._native_datetime)
+        self._pragma_settings = apply_pragmas(self._sql_connection, self._pragmas)
         self._can_close = True
 
     def close(self) -> None:
@@ -116,6 +403,444 @@ class SQLiteRepository:
             self._sql_connection.close()
             self._sql_connection = None
 
+    def _connection(self) -> sqlite3.Connection:
+        """ Returns the connection to be used by the calling thread.
+
+        Returns:
+            sqlite3.Connection : connection of the calling thread if the repository is bound to a pool,
+                                 the connection of the repository otherwise.
+        """
+        if self._connection_pool is not None:
+            return self._connection_pool.connection()
+        return self._sql_connection
+
+    def _read_connection(self) -> sqlite3.Connection:
+        """ Returns the connection to be used by the calling thread for reading. Reads within a transaction
+            always use the database connection, so that they see the uncommitted changes.
+
+        Returns:
+            sqlite3.Connection : connection to the in-memory snapshot if it is enabled and no transaction is
+                                 active on the connection of the calling thread; that connection otherwise.
+        """
+        sql_connection = self._connection()
+        if self._snapshot is None or sql_connection.in_transaction or self._in_transaction(sql_connection):
+            return sql_connection
+        return self._snapshot.connection(sql_connection)
+
+    def _cursor(self, sql_connection: sqlite3.Connection):
+        """ Opens a cursor on a connection.
+
+        Parameters:
+            sql_connection : sqlite3.Connection
+                Connection to open the cursor on.
+
+        Returns:
+            sqlite3.Cursor : a new cursor, wrapped by a MonitoredCursor if the statement monitor is enabled.
+        """
+        if self._monitor is None:
+            return sql_connection.cursor()
+        return MonitoredCursor(sql_connection.cursor(), self._monitor)
+
+    def _writer(self):
+        """ Returns a context manager serializing write operations on a pooled connection.
+
+        Returns:
+            context manager : the writer lock of the connection pool, or a no-op context manager.
+        """
+        if self._connection_pool is not None:
+            return self._connection_pool.write_lock
+        return nullcontext()
+
+    @property
+    def pragma_settings(self) -> dict:
+        """ Getter for the effective values of the PRAGMA settings requested for the repository.
+
+        Returns:
+            dict : {pragma_name: value} as reported by SQLite after opening the connection.
+        """
+        if self._connection_pool is not None:
+            return self._connection_pool.pragma_settings
+        return self._pragma_settings
+
+    @property
+    def key_cache(self) -> LRUCache:
+        """ Getter for the cache of elements retrieved by "select_by_key".
+
+        Returns:
+            LRUCache : the element cache (exposing its hit/miss statistics), or None if caching is disabled.
+        """
+        return self._key_cache
+
+    def enable_key_cache(self, max_size: int = 1000, ttl: float = None) -> LRUCache:
+        """ Enables the cache of elements retrieved by "select_by_key". Elements are cached by their
+            primary key values; repeated lookups return the same (shared) object. Inserting, updating or
+            deleting an element through this repository removes it from the cache.
+
+        Parameters:
+            max_size : int, optional
+                Maximum number of cached elements; the least recently used element is evicted first.
+                Default value is 1000.
+            ttl : float, optional
+                Time to live of a cached element in seconds. Default value is None (no expiry).
+
+        Returns:
+            LRUCache : the new element cache.
+        """
+        self._key_cache = LRUCache(max_size, ttl)
+        return self._key_cache
+
+    def disable_key_cache(self) -> None:
+        """ Disables the cache of elements retrieved by "select_by_key". """
+        self._key_cache = None
+
+    @property
+    def snapshot(self) -> SQLiteSnapshot:
+        """ Getter for the in-memory snapshot serving the reads of the repository.
+
+        Returns:
+            SQLiteSnapshot : the snapshot, or None if reads are served from the database file.
+        """
+        return self._snapshot
+
+    def enable_snapshot(self, refresh_interval: float = None, check_data_version: bool = True,
+                        snapshot: SQLiteSnapshot = None) -> SQLiteSnapshot:
+        """ Serves the reads of the repository from an in-memory copy of its table (including the indexes).
+            Writes go to the database file and mark the copy as stale; it is refreshed by the next read outside
+            a transaction. Any change of the database file (by this or other repositories or connections)
+            triggers a complete copy of the table, so this is meant for small, read-mostly tables. Statements
+            passed to "query" and "iter_query" must only reference the tables of the snapshot.
+
+        Parameters:
+            refresh_interval : float, optional
+                Maximum age of the copy in seconds. Default value is None (no periodic refresh).
+            check_data_version : bool, optional
+                If True (default), commits of other repositories or connections are detected by the version
+                of the database (see SQLiteSnapshot) and trigger a refresh.
+            snapshot : SQLiteSnapshot, optional
+                Existing snapshot of the same database, to be shared with other repositories (it must contain
+                the tables of all of them). If specified, "refresh_interval" and "check_data_version" are
+                ignored.
+
+        Returns:
+            SQLiteSnapshot : the snapshot used by the repository.
+        """
+        if snapshot is None:
+            snapshot = SQLiteSnapshot(self._native_datetime, refresh_interval, check_data_version,
+                                      tables=[self._contents_type._attribute_map.table_name])
+        self._snapshot = snapshot
+        return self._snapshot
+
+    def disable_snapshot(self) -> None:
+        """ Serves the reads of the repository from the database file again. """
+        self._snapshot = None
+
+    @property
+    def result_cache(self) -> LRUCache:
+        """ Getter for the cache of the rows retrieved by SELECT statements.
+
+        Returns:
+            LRUCache : the result cache (exposing its hit/miss statistics), or None if result caching is disabled.
+        """
+        return self._result_cache
+
+    def enable_result_cache(self, max_size: int = 100, ttl: float = None) -> LRUCache:
+        """ Enables the cache of the rows retrieved by "query", "select_all", "select_where", "select_columns"
+            and "aggregate". Results are cached by statement text and parameters; every hit creates new
+            elements from the cached rows. The cache is cleared by every write through this repository and
+            whenever the database has been changed by another repository or connection (detected by the
+            number of changes of the connection and "PRAGMA data_version"). Statements executed while a
+            transaction is active are neither cached nor answered from the cache.
+
+        Parameters:
+            max_size : int, optional
+                Maximum number of cached results; the least recently used result is evicted first.
+                Default value is 100.
+            ttl : float, optional
+                Time to live of a cached result in seconds. Default value is None (no expiry).
+
+        Returns:
+            LRUCache : the new result cache.
+        """
+        self._result_cache = LRUCache(max_size, ttl)
+        self._result_versions = {}
+        return self._result_cache
+
+    def disable_result_cache(self) -> None:
+        """ Disables the cache of the rows retrieved by SELECT statements. """
+        self._result_cache = None
+
+    @property
+    def monitor(self) -> StatementMonitor:
+        """ Getter for the monitor collecting the measurements of the executed statements.
+
+        Returns:
+            StatementMonitor : the statement monitor, or None if statements are not measured.
+        """
+        return self._monitor
+
+    def enable_monitor(self, slow_threshold: float = None, logger = None,
+                       monitor: StatementMonitor = None) -> StatementMonitor:
+        """ Enables the measurement of the statements executed by the DML and SELECT operations of the
+            repository. For every execution the monitor receives the statement text, the number of parameters,
+            the number of fetched or affected rows and the time spent in execute, fetch, row conversion and
+            commit; it keeps aggregates by statement shape and logs slow executions. While no monitor is
+            enabled, the repository only checks the "_monitor" attribute.
+
+        Parameters:
+            slow_threshold : float, optional
+                Total time in seconds above which an execution is logged as slow. Default value is None.
+            logger : logging.Logger, optional
+                Logger receiving the slow statement messages. Default is the logger "wp_repository".
+            monitor : StatementMonitor, optional
+                Existing monitor, to be shared with other repositories. If specified, "slow_threshold" and
+                "logger" are ignored.
+
+        Returns:
+            StatementMonitor : the monitor used by the repository.
+        """
+        if monitor is None:
+            monitor = StatementMonitor(slow_threshold, logger)
+        self._monitor = monitor
+        return self._monitor
+
+    def disable_monitor(self) -> None:
+        """ Disables the measurement of the executed statements. """
+        self._monitor = None
+
+    @staticmethod
+    def _element_key(element: RepositoryElement) -> tuple:
+        """ Returns the primary key values of an element, used as key of the element cache.
+
+        Parameters:
+            element : RepositoryElement
+                Element to compute the key for.
+
+        Returns:
+            tuple : primary key values of the element.
+        """
+        return tuple(element._compiled_map().key_params(element))
+
+    def _invalidate_cached(self, elements = None) -> None:
+        """ Removes the given elements from the element cache, clears the result cache and marks the snapshot
+            as stale.
+
+        Parameters:
+            elements : iterable, optional
+                Elements to be removed from the cache. Default value is None (clear the whole element cache).
+        """
+        if self._snapshot is not None:
+            self._snapshot.invalidate()
+        if self._result_cache is not None:
+            self._result_cache.clear()
+        if self._key_cache is not None:
+            if elements is None:
+                self._key_cache.clear()
+            else:
+                for element in elements:
+                    self._key_cache.invalidate(self._element_key(element))
+
+    def create_indexes(self, do_commit: bool = True) -> int:
+        """ Creates the secondary indexes declared in the Attribute Map of the contents class. Existing
+            indexes are not changed.
+
+        Parameters:
+            do_commit : bool, optional
+                Indicates whether or not the transaction shall be committed.
+                Default value is "True".
+
+        Returns:
+            int : number of declared indexes.
+        """
+        attribute_map = self._contents_type._attribute_map
+        with self._writer():
+            sql_connection = self._connection()
+            cursor = sql_connection.cursor()
+            for index in attribute_map.indexes:
+                create_stmt = index.create_statement(attribute_map)
+                cursor.execute(create_stmt.stmt_text, create_stmt.stmt_params)
+            cursor.close()
+            self._commit(sql_connection, do_commit)
+        return len(attribute_map.indexes)
+
+    def verify_indexes(self) -> list:
+        """ Compares the secondary indexes declared in the Attribute Map of the contents class to the
+            indexes present in the database.
+
+        Returns:
+            list : names of the declared indexes that are missing, defined on another table, or differ from
+                   their declaration in uniqueness or columns. Empty if all indexes are in place.
+        """
+        attribute_map = self._contents_type._attribute_map
+        cursor = self._connection().cursor()
+        cursor.execute('PRAGMA index_list({})'.format(attribute_map.table_name))
+        unique_flags = {row[1]: bool(row[2]) for row in cursor.fetchall()}
+        res = []
+        for index in attribute_map.indexes:
+            if index.index_name not in unique_flags or unique_flags[index.index_name] != index.is_unique:
+                res.append(index.index_name)
+                continue
+            cursor.execute('PRAGMA index_info({})'.format(index.index_name))
+            db_columns = [row[2] for row in sorted(cursor.fetchall())]
+            if [col.lower() for col in db_columns] != [col.lower() for col in index.db_columns(attribute_map)]:
+                res.append(index.index_name)
+        cursor.close()
+        return res
+
+    def explain(self, select_stmt: SQLStatement) -> list:
+        """ Returns the query plan of a SQL SELECT statement, as reported by EXPLAIN QUERY PLAN.
+
+        Parameters:
+            select_stmt : SQLStatement
+                SQL SELECT statement to be explained.
+
+        Returns:
+            list : "detail" column of every step of the query plan, e.g. "SCAN test_table".
+        """
+        cursor = self._connection().cursor()
+        cursor.execute('EXPLAIN QUERY PLAN ' + select_stmt.stmt_text, select_stmt.stmt_params)
+        res = [row[-1] for row in cursor.fetchall()]
+        cursor.close()
+        return res
+
+    def enable_plan_check(self, mode: str = 'warn', max_statements: int = 1000) -> None:
+        """ Enables the query plan check of the statements created by "select_where" and "iter_where".
+            The plan of every distinct statement text is checked once; if SQLite scans the whole table
+            instead of searching an index, a QueryPlanWarning is issued or a QueryPlanError is raised.
+            Scans of a covering index are not reported.
+
+        Parameters:
+            mode : str, optional
+                "warn" (default) or "raise".
+            max_statements : int, optional
+                Maximum number of checked statement texts remembered; the plan of a statement text evicted
+                from this list is checked again when it is used the next time. Default value is 1000.
+        """
+        if mode not in ['warn', 'raise']:
+            raise ValueError('Invalid plan check mode: "{}"'.format(mode))
+        self._checked_plans = LRUCache(max_statements)
+        self._plan_check = mode
+
+    def disable_plan_check(self) -> None:
+        """ Disables the query plan check. """
+        self._plan_check = None
+
+    def _check_plan(self, select_stmt: SQLStatement) -> None:
+        """ Checks the query plan of a SQL SELECT statement for full table scans, unless the statement text
+            has been checked before.
+
+        Parameters:
+            select_stmt : SQLStatement
+                SQL SELECT statement to be checked.
+        """
+        checked_plans = self._checked_plans
+        if checked_plans.get(select_stmt.stmt_text) is not None:
+            return
+        table_name = self._contents_type._attribute_map.table_name
+        scan_pattern = re.compile(r'SCAN (TABLE )?{}\b(?! USING (COVERING )?INDEX)'.format(re.escape(table_name)),
+                                  re.IGNORECASE)
+        full_scans = [detail for detail in self.explain(select_stmt) if scan_pattern.match(detail)]
+        checked_plans.put(select_stmt.stmt_text, True)
+        if len(full_scans) > 0:
+            msg = 'Full table scan ({}) in: {}'.format('; '.join(full_scans), select_stmt.stmt_text)
+            if self._plan_check == 'raise':
+                raise QueryPlanError(msg)
+            warnings.warn(msg, QueryPlanWarning, stacklevel=3)
+
+    @contextmanager
+    def transaction(self, immediate: bool = False):
+        """ Unit of work: all operations of repositories sharing the connection within the "with" block are
+            committed at the end of the block and rolled back if the block raises an exception; "do_commit"
+            arguments are ignored inside the block. Nested scopes are implemented as SAVEPOINTs, so that an
+            inner block can be rolled back without affecting the outer one. On a pooled repository the
+            writer lock is held for the whole block. If a scope is rolled back, the elements stored within it
+            get back the auto-increment key values and the recorded values of change tracking they had before.
+            If the final commit fails, the transaction is rolled back before the error is raised.
+
+        Parameters:
+            immediate : bool, optional
+                If True, the outermost scope starts with "BEGIN IMMEDIATE", acquiring the write lock of the
+                database at once. Default value is "False".
+
+        Yields:
+            SQLiteRepository : the repository itself.
+        """
+        with self._writer():
+            sql_connection = self._connection()
+            scopes = _ACTIVE_TRANSACTIONS.get(sql_connection)
+            depth = 0 if scopes is None else len(scopes)
+            savepoint = 'wp_tx_{}'.format(depth)
+            if depth > 0:
+                sql_connection.execute('SAVEPOINT {}'.format(savepoint))
+            else:
+                if not sql_connection.in_transaction:
+                    sql_connection.execute('BEGIN IMMEDIATE' if immediate else 'BEGIN')
+                scopes = []
+                _ACTIVE_TRANSACTIONS[sql_connection] = scopes
+            scopes.append([])
+            try:
+                yield self
+            except BaseException:
+                saved_states = scopes.pop()
+                if depth > 0:
+                    sql_connection.execute('ROLLBACK TO {}'.format(savepoint))
+                    sql_connection.execute('RELEASE {}'.format(savepoint))
+                else:
+                    del _ACTIVE_TRANSACTIONS[sql_connection]
+                    sql_connection.rollback()
+                self._restore_element_states(saved_states)
+                self._invalidate_cached()
+                raise
+            saved_states = scopes.pop()
+            if depth > 0:
+                scopes[-1].extend(saved_states)
+                sql_connection.execute('RELEASE {}'.format(savepoint))
+                return
+            del _ACTIVE_TRANSACTIONS[sql_connection]
+            start = perf_counter()
+            try:
+                sql_connection.commit()
+            except BaseException:
+                sql_connection.rollback()
+                self._restore_element_states(saved_states)
+                self._invalidate_cached()
+                raise
+            if self._monitor is not None:
+                self._monitor.record('COMMIT', 0, 0, 0.0, commit_time=perf_counter() - start)
+
+    @staticmethod
+    def _in_transaction(sql_connection: sqlite3.Connection) -> bool:
+        """ Checks whether or not a "transaction" scope is active on a connection.
+
+        Parameters:
+            sql_connection : sqlite3.Connection
+                Connection to be checked.
+
+        Returns:
+            bool : True if the connection is used within a "transaction" scope; False otherwise.
+        """
+        return sql_connection in _ACTIVE_TRANSACTIONS
+
+    def _commit(self, sql_connection: sqlite3.Connection, do_commit: bool) -> None:
+        """ Commits the current transaction unless a "transaction" scope is active. If the statement monitor
+            is enabled, the commit time is added to the last executed statement, whose measurement is then
+            complete.
+
+        Parameters:
+            sql_connection : sqlite3.Connection
+                Connection to be committed.
+            do_commit : bool
+                Indicates whether or not the caller requested the commit.
+        """
+        if self._monitor is None:
+            if do_commit and sql_connection not in _ACTIVE_TRANSACTIONS:
+                sql_connection.commit()
+            return
+        if do_commit and sql_connection not in _ACTIVE_TRANSACTIONS:
+            start = perf_counter()
+            sql_connection.commit()
+            self._monitor.committed(perf_counter() - start)
+        self._monitor.finish()
+
     def insert(self, element: RepositoryElement, do_commit: bool = True) -> int:
         """ Maps an object of the contents class to a database record and inserts it into the
             underlying table.
@@ -132,11 +857,14 @@ class SQLiteRepository:
                   row will be returned. Otherwise, the return value will be the number of inserted
                   records (0 or 1).
         """
-        cursor = self._sql_connection.cursor()
-        res = element.insert(cursor)
-        cursor.close()
-        if do_commit:
-            self._sql_connection.commit()
+        with self._writer():
+            sql_connection = self._connection()
+            self._save_element_states(sql_connection, [element])
+            cursor = self._cursor(sql_connection)
+            res = element.insert(cursor)
+            cursor.close()
+            self._invalidate_cached([element])
+            self._commit(sql_connection, do_commit)
         return res
 
     def update(self, element: RepositoryElement, do_commit: bool = True) -> int:
@@ -150,13 +878,19 @@ class SQLiteRepository:
                 Default value is "True".
 
         Returns:
-            int : the number of successfully updated records (0 or 1).
+            int : the number of successfully updated records (0 or 1; 0 if the contents class tracks changes
+                  and no attribute has changed).
         """
-        cursor = self._sql_connection.cursor()
-        res = element.update(cursor)
-        cursor.close()
-        if do_commit:
-            self._sql_connection.commit()
+        if not element.has_changes():
+            return 0
+        with self._writer():
+            sql_connection = self._connection()
+            self._save_element_states(sql_connection, [element])
+            cursor = self._cursor(sql_connection)
+            res = element.update(cursor)
+            cursor.close()
+            self._invalidate_cached([element])
+            self._commit(sql_connection, do_commit)
         return res
 
     def delete(self, element: RepositoryElement, do_commit: bool = True) -> int:
@@ -172,14 +906,361 @@ class SQLiteRepository:
         Returns:
             int : the number of successfully deleted records (0 or 1).
         """
-        cursor = self._sql_connection.cursor()
-        res = element.delete(cursor)
-        cursor.close()
-        if do_commit:
-            self._sql_connection.commit()
+        with self._writer():
+            sql_connection = self._connection()
+            cursor = self._cursor(sql_connection)
+            res = element.delete(cursor)
+            cursor.close()
+            self._invalidate_cached([element])
+            self._commit(sql_connection, do_commit)
         return res
 
-    def select_by_key(self, source_element: RepositoryElement, do_commit: bool = True) -> RepositoryElement:
+    def upsert(self, element: RepositoryElement, do_commit: bool = True) -> int:
+        """ Inserts an object of the contents class into the underlying table or, if a row with the same
+            primary key exists, updates that row (INSERT ... ON CONFLICT DO UPDATE).
+
+        Parameters:
+            element : RepositoryElement
+                Python object to be inserted or updated.
+            do_commit : bool, optional
+                Indicates whether or not the transaction shall be committed.
+                Default value is "True".
+
+        Returns:
+            int : If the underlying table has an auto-increment key, the key value of the row; otherwise
+                  the number of inserted or updated records (0 or 1).
+        """
+        with self._writer():
+            sql_connection = self._connection()
+            self._save_element_states(sql_connection, [element])
+            cursor = self._cursor(sql_connection)
+            res = element.upsert(cursor)
+            cursor.close()
+            self._invalidate_cached([element])
+            self._commit(sql_connection, do_commit)
+        return res
+
+    def upsert_many(self, elements, chunk_size: int = 1000, do_commit: bool = True) -> int:
+        """ Inserts or updates a collection of contents class objects in a single transaction. If the
+            underlying table has an auto-increment key, the rows are processed one by one (within the same
+            transaction) and the key value is assigned to every element.
+
+        Parameters:
+            elements : iterable
+                Collection of RepositoryElement objects to be inserted or updated.
+            chunk_size : int, optional
+                Maximum number of elements passed to a single "executemany" call. Default value is 1000.
+            do_commit : bool, optional
+                Indicates whether or not the transaction shall be committed.
+                Default value is "True".
+
+        Returns:
+            int : the number of inserted or updated records.
+        """
+        if self._contents_type._attribute_map.has_auto_increment_key:
+            return self._execute_bulk(elements, None, chunk_size, do_commit, 'upsert')
+        return self._execute_bulk(elements, 'upsert_statement', chunk_size, do_commit)
+
+    def update_where(self, where_criteria: list, values: dict, do_commit: bool = True) -> int:
+        """ Sets attributes of all entries matching the given criteria with a single UPDATE statement,
+            without loading the entries. The element cache is cleared; elements held by the caller are not
+            refreshed.
+
+        Parameters:
+            where_criteria : list or WhereExpression
+                Criteria for selecting repository elements (see "select_where").
+            values : dict
+                {class_attribute_name: new value} of the attributes to be set.
+            do_commit : bool, optional
+                Indicates whether or not the update transaction shall be committed.
+                Default value is "True".
+
+        Returns:
+            int : the number of updated records.
+        """
+        return self._execute_where(self._contents_type().update_where_statement(where_criteria, values),
+                                   do_commit)
+
+    def delete_where(self, where_criteria: list, do_commit: bool = True) -> int:
+        """ Deletes all entries matching the given criteria with a single DELETE statement, without loading
+            the entries. The element cache is cleared.
+
+        Parameters:
+            where_criteria : list or WhereExpression
+                Criteria for selecting repository elements (see "select_where"). An empty list deletes all
+                entries.
+            do_commit : bool, optional
+                Indicates whether or not the delete transaction shall be committed.
+                Default value is "True".
+
+        Returns:
+            int : the number of deleted records.
+        """
+        return self._execute_where(self._contents_type().delete_where_statement(where_criteria), do_commit)
+
+    def _execute_where(self, sql_stmt: SQLStatement, do_commit: bool) -> int:
+        """ Executes a set-based SQL statement created by "update_where" or "delete_where".
+
+        Parameters:
+            sql_stmt : SQLStatement
+                SQL statement to be executed.
+            do_commit : bool
+                Indicates whether or not the transaction shall be committed.
+
+        Returns:
+            int : the number of affected records.
+        """
+        with self._writer():
+            sql_connection = self._connection()
+            cursor = self._cursor(sql_connection)
+            try:
+                cursor.execute(sql_stmt.stmt_text, sql_stmt.stmt_params)
+                res = cursor.rowcount
+            finally:
+                cursor.close()
+            self._invalidate_cached()
+            self._commit(sql_connection, do_commit)
+        return res
+
+    def insert_many(self, elements, chunk_size: int = 1000, do_commit: bool = True) -> int:
+        """ Inserts a collection of contents class objects into the underlying table in a single transaction.
+            If the underlying table has an auto-increment key, the rows are inserted one by one (within the
+            same transaction) and the new key value is assigned to every element.
+
+        Parameters:
+            elements : iterable
+                Collection of RepositoryElement objects to be mapped and inserted.
+            chunk_size : int, optional
+                Maximum number of elements passed to a single "executemany" call. Default value is 1000.
+            do_commit : bool, optional
+                Indicates whether or not the insert transaction shall be committed.
+                Default value is "True".
+
+        Returns:
+            int : the number of inserted records.
+        """
+        if self._contents_type._attribute_map.has_auto_increment_key:
+            return self._execute_bulk(elements, None, chunk_size, do_commit, 'insert')
+        return self._execute_bulk(elements, 'insert_statement', chunk_size, do_commit)
+
+    def update_many(self, elements, chunk_size: int = 1000, do_commit: bool = True) -> int:
+        """ Updates the underlying database records with data from a collection of contents class objects
+            in a single transaction. If the contents class tracks changes, unchanged elements are skipped and
+            the remaining ones are grouped by their set of changed attributes.
+
+        Parameters:
+            elements : iterable
+                Collection of RepositoryElement objects to be used to update rows in the underlying table.
+            chunk_size : int, optional
+                Maximum number of elements passed to a single "executemany" call. Default value is 1000.
+            do_commit : bool, optional
+                Indicates whether or not the update transaction shall be committed.
+                Default value is "True".
+
+        Returns:
+            int : the number of successfully updated records.
+        """
+        return self._execute_bulk(elements, 'update_statement', chunk_size, do_commit)
+
+    def delete_many(self, elements, chunk_size: int = 1000, do_commit: bool = True) -> int:
+        """ Deletes the rows identified by a collection of contents class objects in a single transaction.
+
+        Parameters:
+            elements : iterable
+                Collection of RepositoryElement objects identifying the rows to be deleted.
+            chunk_size : int, optional
+                Maximum number of elements passed to a single "executemany" call. Default value is 1000.
+            do_commit : bool, optional
+                Indicates whether or not the delete transaction shall be committed.
+                Default value is "True".
+
+        Returns:
+            int : the number of successfully deleted records.
+        """
+        return self._execute_bulk(elements, 'delete_statement', chunk_size, do_commit)
+
+    def _execute_bulk(self, elements, stmt_method: str, chunk_size: int, do_commit: bool,
+                      row_method: str = None) -> int:
+        """ Executes the statements created by a statement method of a collection of elements in chunks.
+            If the execution fails and "do_commit" is set, the transaction is rolled back (unless a
+            "transaction" scope is active, which then rolls back itself) and the auto-increment key values and
+            the recorded values of change tracking of the elements are restored. Within a "transaction" scope
+            the states are recorded in the scope, which restores them when it is rolled back. Without a scope
+            and with "do_commit" not set, a later rollback by the caller does not restore them.
+
+        Parameters:
+            elements : iterable
+                Collection of RepositoryElement objects.
+            stmt_method : str
+                Name of the RepositoryElement method creating the SQL statement for an element.
+            chunk_size : int
+                Maximum number of elements processed in a single step.
+            do_commit : bool
+                Indicates whether or not the transaction shall be committed.
+            row_method : str, optional
+                Name of a RepositoryElement method executing the statement of a single element on a cursor
+                (e.g. "insert"). If specified, the elements are processed one by one using this method
+                instead of "executemany".
+
+        Returns:
+            int : total number of affected rows.
+        """
+        if chunk_size < 1:
+            raise ValueError('Invalid chunk size: {}'.format(chunk_size))
+        num_rows = 0
+        elem_iter = iter(elements)
+        attribute_map = self._contents_type._attribute_map
+        auto_attr_name = attribute_map.autoincrement_attribute.class_attr_name \
+            if attribute_map.has_auto_increment_key else None
+        saved_states = [] if auto_attr_name is not None or self._contents_type._track_changes else None
+        with self._writer():
+            sql_connection = self._connection()
+            in_scope = self._in_transaction(sql_connection)
+            cursor = self._cursor(sql_connection)
+            try:
+                chunk = list(islice(elem_iter, chunk_size))
+                while len(chunk) > 0:
+                    if in_scope:
+                        self._save_element_states(sql_connection, chunk)
+                    elif saved_states is not None:
+                        saved_states.extend([self._element_state(element, auto_attr_name) for element in chunk])
+                    if row_method is not None:
+                        for element in chunk:
+                            getattr(element, row_method)(cursor)
+                            num_rows += cursor.rowcount
+                    else:
+                        stored = chunk if stmt_method != 'update_statement' \
+                            else [element for element in chunk if element.has_changes()]
+                        num_rows += self._execute_many(
+                            cursor, [getattr(element, stmt_method)() for element in stored],
+                            [self._element_key(element) for element in stored])
+                        if self._contents_type._track_changes and stmt_method != 'delete_statement':
+                            for element in stored:
+                                element.mark_clean()
+                    self._invalidate_cached(chunk)
+                    chunk = list(islice(elem_iter, chunk_size))
+            except Exception:
+                if do_commit and not in_scope:
+                    sql_connection.rollback()
+                    if saved_states is not None:
+                        self._restore_element_states(saved_states)
+                raise
+            finally:
+                cursor.close()
+            self._commit(sql_connection, do_commit)
+        return num_rows
+
+    def _save_element_states(self, sql_connection: sqlite3.Connection, elements) -> None:
+        """ Records the state of elements about to be stored in the innermost active "transaction" scope of a
+            connection, so that a rollback of the scope restores it. Nothing is recorded outside a scope or if
+            the contents class has neither an auto-increment key nor change tracking.
+
+        Parameters:
+            sql_connection : sqlite3.Connection
+                Connection the elements are stored through.
+            elements : list
+                Elements to be stored.
+        """
+        scopes = _ACTIVE_TRANSACTIONS.get(sql_connection)
+        if scopes is None:
+            return
+        attribute_map = self._contents_type._attribute_map
+        if not attribute_map.has_auto_increment_key and not self._contents_type._track_changes:
+            return
+        auto_attr_name = attribute_map.autoincrement_attribute.class_attr_name \
+            if attribute_map.has_auto_increment_key else None
+        scopes[-1].extend([self._element_state(element, auto_attr_name) for element in elements])
+
+    @staticmethod
+    def _element_state(element: RepositoryElement, auto_attr_name: str) -> tuple:
+        """ Returns the state of an element changed by storing it: the auto-increment key value and the
+            recorded attribute values of change tracking.
+
+        Parameters:
+            element : RepositoryElement
+                Element to be stored.
+            auto_attr_name : str
+                Name of the auto-increment key attribute, or None.
+
+        Returns:
+            tuple : (element, auto-increment key attribute name, auto-increment key value, recorded attribute
+                    values).
+        """
+        return (element, auto_attr_name, None if auto_attr_name is None else getattr(element, auto_attr_name, None),
+                getattr(element, '_db_snapshot', None))
+
+    @staticmethod
+    def _restore_element_states(saved_states: list) -> None:
+        """ Restores the states returned by "_element_state" after the changes of the elements have been rolled
+            back, so that they do not refer to rows that were never stored and are written again by the next
+            update. The states are restored in reverse order, so that an element stored several times gets
+            back its oldest state.
+
+        Parameters:
+            saved_states : list
+                States of the elements (see "_element_state").
+        """
+        for element, auto_attr_name, auto_key, db_snapshot in reversed(saved_states):
+            if auto_attr_name is not None:
+                setattr(element, auto_attr_name, auto_key)
+            if element._track_changes:
+                element._db_snapshot = db_snapshot
+
+    @staticmethod
+    def _execute_many(cursor: sqlite3.Cursor, sql_statements: list, stmt_keys: list = None) -> int:
+        """ Executes a list of SQL statements, grouping the statements by their text and passing every group
+            to "executemany" (e.g. the UPDATE statements of elements with the same set of changed attributes).
+            The groups collected so far are executed as soon as a key occurs a second time, so that statements
+            for the same row are executed in their original order.
+
+        Parameters:
+            cursor : sqlite3.Cursor
+                An open cursor within an active SQLite database connection.
+            sql_statements : list
+                List of SQLStatement objects.
+            stmt_keys : list, optional
+                Primary key values of the row affected by every statement.
+
+        Returns:
+            int : total number of affected rows.
+        """
+        num_rows = 0
+        groups = {}
+        pending_keys = set()
+        for stmt_no, sql_stmt in enumerate(sql_statements):
+            if stmt_keys is not None:
+                if stmt_keys[stmt_no] in pending_keys:
+                    num_rows += SQLiteRepository._execute_groups(cursor, groups)
+                    groups = {}
+                    pending_keys = set()
+                pending_keys.add(stmt_keys[stmt_no])
+            group_params = groups.get(sql_stmt.stmt_text)
+            if group_params is None:
+                group_params = []
+                groups[sql_stmt.stmt_text] = group_params
+            group_params.append(sql_stmt.stmt_params)
+        return num_rows + SQLiteRepository._execute_groups(cursor, groups)
+
+    @staticmethod
+    def _execute_groups(cursor: sqlite3.Cursor, groups: dict) -> int:
+        """ Executes groups of statements sharing the same text, using "executemany".
+
+        Parameters:
+            cursor : sqlite3.Cursor
+                An open cursor within an active SQLite database connection.
+            groups : dict
+                {statement text: list of parameter lists}, in execution order.
+
+        Returns:
+            int : total number of affected rows.
+        """
+        num_rows = 0
+        for stmt_text, group_params in groups.items():
+            cursor.executemany(stmt_text, group_params)
+            num_rows += cursor.rowcount
+        return num_rows
+
+    def select_by_key(self, source_element: RepositoryElement, do_commit: bool = False) -> RepositoryElement:
         """ Selects the single element identified by the primary key values of the given parameter element
             from the underlying table.
 
@@ -188,90 +1269,376 @@ class SQLiteRepository:
                 Python object identifying the row to be retrieved from the underlying table.
             do_commit : bool, optional
                 Indicates whether or not the select transaction shall be committed.
-                Default value is "True".
+                Default value is "False".
 
         Returns:
             RepositoryElement: retrieved row converted to the contents class, or None if the given source_element
-                               does not identify a row in the database.
+                               does not identify a row in the database. If the element cache is enabled, the
+                               cached (shared) element is returned.
         """
-        res = None
+        if self._key_cache is not None:
+            cache_key = self._element_key(source_element)
+            res = self._key_cache.get(cache_key)
+            if res is not None:
+                return res
         select_stmt = source_element.select_by_key_statement()
-        cursor = self._sql_connection.cursor()
+        sql_connection = self._read_connection()
+        cursor = self._cursor(sql_connection)
         cursor.execute(select_stmt.stmt_text, select_stmt.stmt_params)
         qry_result = cursor.fetchone()
         cursor.close()
-        if do_commit:
-            self._sql_connection.commit()
         if qry_result is None:
+            self._commit(sql_connection, do_commit)
             return None
-        res = self._contents_type()
-        res.load_row(qry_result)
+        if self._monitor is None:
+            res = self._contents_type.from_row(qry_result)
+        else:
+            start = perf_counter()
+            res = self._contents_type.from_row(qry_result)
+            self._monitor.loaded(perf_counter() - start)
+        self._commit(sql_connection, do_commit)
+        if self._key_cache is not None:
+            self._key_cache.put(cache_key, res)
         return res
 
-    def select_all(self, do_commit: bool = True) -> list:
+    def select_all(self, do_commit: bool = False) -> list:
         """ Retrieves all entries from the repository, sorted by their key attributes.
 
         Parameters:
             do_commit : bool, optional
                 Indicates whether or not the select transaction shall be committed.
-                Default value is "True".
+                Default value is "False".
 
         Returns:
             list : List of all entries from the repository.
         """
-        res = []
-        select_stmt = self._contents_type().select_all_statement()
-        cursor = self._sql_connection.cursor()
-        cursor.execute(select_stmt.stmt_text, select_stmt.stmt_params)
-        qry_result = cursor.fetchall()
-        cursor.close()
-        if do_commit:
-            self._sql_connection.commit()
-        for cursor_row in qry_result:
-            res_entry = self._contents_type()
-            res_entry.load_row(cursor_row)
-            res.append(res_entry)
-        return res
+        return self._select_list(self._contents_type().select_all_statement(), do_commit)
 
-    def select_where(self, where_criteria: list, do_commit: bool = True) -> list:
-        """ Retrieves all entries from the repository matching the given criteria, sorted by their key
-            attributes.
+    def select_where(self, where_criteria: list, do_commit: bool = False, order_by: list = None,
+                     limit: int = None, offset: int = None, distinct: bool = False) -> list:
+        """ Retrieves the entries from the repository matching the given criteria, sorted by their key
+            attributes unless another order is requested. Filtering, ordering and limiting are done by SQLite.
 
         Parameters:
-            where_criteria : list
-                List containing the criteria for selecting repository elements. Every select criterion
-                is a tuple (class_attribute_name, operator, value), where:
+            where_criteria : list or WhereExpression
+                List containing the criteria for selecting repository elements, joined with AND. Every select
+                criterion is a tuple (class_attribute_name, operator, value), where:
                     class_attribute_name : str
                         Name of the attribute of the contents class. Must be contained in the Attribute Map of
                         the contents class.
                     operator : str
                         Comparison operator to be applied to the class attribute. Legal values are:
-                            "=", "!=", ">", "<", ">=", "<=", "LIKE", "BETWEEN".
+                            "=", "!=", ">", "<", ">=", "<=", "LIKE", "BETWEEN", "IN", "NOT IN", "IS NULL",
+                            "IS NOT NULL".
                     value : str
                         Value to compare the class attribute to. In case of operator is "BETWEEN", value must
                         be a list containing exactly 2 elements.
+                Criteria can be combined with WhereAnd, WhereOr and WhereNot expressions.
             do_commit : bool, optional
                 Indicates whether or not the select transaction shall be committed.
-                Default value is "True".
+                Default value is "False".
+            order_by : list, optional
+                Names of the class attributes to sort by; a leading "-" sorts in descending order.
+            limit : int, optional
+                Maximum number of entries to retrieve.
+            offset : int, optional
+                Number of matching entries to skip.
+            distinct : bool, optional
+                If True, duplicate rows are removed. Default value is "False".
 
         Returns:
             list: List of entries from the repository that match the given criteria.
         """
-        res = []
-        select_stmt = self._contents_type().select_where_statement(where_criteria)
-        cursor = self._sql_connection.cursor()
-        cursor.execute(select_stmt.stmt_text, select_stmt.stmt_params)
-        qry_result = cursor.fetchall()
+        # pylint: disable=too-many-arguments
+        select_stmt = self._contents_type().select_where_statement(where_criteria, order_by, limit, offset, distinct)
+        if self._plan_check is not None and len(where_criteria) > 0:
+            self._check_plan(select_stmt)
+        return self._select_list(select_stmt, do_commit)
+
+    def select_page(self, where_criteria: list = None, after_key: tuple = None, limit: int = 100) -> tuple:
+        """ Retrieves one page of the entries matching the given criteria, sorted by their key attributes.
+            Pages are addressed by keyset (seek) pagination on the primary key, so that the cost of a page
+            does not depend on its position.
+
+        Parameters:
+            where_criteria : list, optional
+                List containing the criteria for selecting repository elements (see "select_where").
+            after_key : tuple, optional
+                Continuation token returned with the previous page, or None for the first page.
+            limit : int, optional
+                Maximum number of entries of the page. Default value is 100.
+
+        Returns:
+            tuple : (list of entries, continuation token). The token is None if there are no further pages.
+        """
+        if limit < 1:
+            raise ValueError('Invalid page size: {}'.format(limit))
+        contents = self._contents_type()
+        page = self._select_list(contents.select_page_statement(where_criteria or [], after_key, limit), False)
+        if len(page) < limit:
+            return page, None
+        return page, self._element_key(page[-1])
+
+    def select_columns(self, cls_attr_names: list, where_criteria: list = None, named: bool = True,
+                       order_by: list = None, limit: int = None, offset: int = None, distinct: bool = False) -> list:
+        """ Retrieves a subset of the attributes of the entries matching the given criteria (projection).
+            Only the requested columns are read, and no contents class objects are created; the values are
+            converted to the types of the class attributes.
+
+        Parameters:
+            cls_attr_names : list
+                Names of the class attributes to be selected.
+            where_criteria : list or WhereExpression, optional
+                Criteria for selecting repository elements (see "select_where"). Default: all entries.
+            named : bool, optional
+                If True (default), the rows are returned as named tuples with the class attribute names as
+                fields; otherwise as plain tuples.
+            order_by, limit, offset, distinct : optional
+                See "select_where".
+
+        Returns:
+            list : one tuple of attribute values per selected entry.
+        """
+        # pylint: disable=too-many-arguments
+        select_stmt, row_converter = self._columns_statement(cls_attr_names, where_criteria, named,
+                                                             order_by, limit, offset, distinct)
+        return self._select_list(select_stmt, False, row_converter)
+
+    def iter_columns(self, cls_attr_names: list, where_criteria: list = None, fetch_size: int = 500,
+                     named: bool = True, order_by: list = None, limit: int = None, offset: int = None,
+                     distinct: bool = False):
+        """ Generator yielding a subset of the attributes of the entries matching the given criteria as tuples
+            (see "select_columns"). The rows are fetched in batches of "fetch_size" rows.
+
+        Parameters:
+            cls_attr_names : list
+                Names of the class attributes to be selected.
+            where_criteria : list or WhereExpression, optional
+                Criteria for selecting repository elements (see "select_where"). Default: all entries.
+            fetch_size : int, optional
+                Number of rows fetched from the cursor at once. Default value is 500.
+            named, order_by, limit, offset, distinct : optional
+                See "select_columns".
+
+        Yields:
+            tuple : attribute values of the next selected entry.
+        """
+        # pylint: disable=too-many-arguments
+        select_stmt, row_converter = self._columns_statement(cls_attr_names, where_criteria, named,
+                                                             order_by, limit, offset, distinct)
+        return self._iter_statement(select_stmt, fetch_size, row_converter)
+
+    def select_columnar(self, cls_attr_names: list, where_criteria: list = None, fetch_size: int = 10000,
+                        use_numpy: bool = None, order_by: list = None, limit: int = None,
+                        offset: int = None) -> dict:
+        """ Retrieves a subset of the attributes of the entries matching the given criteria as columns,
+            fetching "fetch_size" rows at a time and without creating contents class objects. Columns of
+            int, float and bool attributes are returned as "array.array" (or as NumPy arrays), all other
+            columns as lists of values converted to the types of the class attributes. A numeric column
+            containing NULL values is returned as list.
+
+        Parameters:
+            cls_attr_names : list
+                Names of the class attributes to be selected.
+            where_criteria : list or WhereExpression, optional
+                Criteria for selecting repository elements (see "select_where"). Default: all entries.
+            fetch_size : int, optional
+                Number of rows fetched from the cursor at once. Default value is 10000.
+            use_numpy : bool, optional
+                If True, numeric columns are returned as NumPy arrays. Default value is None (NumPy arrays
+                are used if NumPy is installed).
+            order_by, limit, offset : optional
+                See "select_where".
+
+        Returns:
+            dict : {class_attribute_name: column}.
+        """
+        # pylint: disable=too-many-arguments,too-many-locals
+        if fetch_size < 1:
+            raise ValueError('Invalid fetch size: {}'.format(fetch_size))
+        if use_numpy is None:
+            use_numpy = numpy is not None
+        elif use_numpy and numpy is None:
+            raise ValueError('NumPy is not installed')
+        select_stmt, _ = self._columns_statement(cls_attr_names, where_criteria, False, order_by, limit, offset,
+                                                 False)
+        attribute_map = self._contents_type._attribute_map
+        mappings = [attribute_map[cls_attr_name] for cls_attr_name in cls_attr_names]
+        converters = [_value_converter(mapping) for mapping in mappings]
+        columns = []
+        for mapping in mappings:
+            typecode = _ARRAY_TYPECODES.get(mapping.class_attr_type) if mapping.db_storage is None else None
+            columns.append([] if typecode is None else array(typecode))
+        monitor = self._monitor
+        cursor = self._cursor(self._read_connection())
+        try:
+            cursor.execute(select_stmt.stmt_text, select_stmt.stmt_params)
+            qry_result = cursor.fetchmany(fetch_size)
+            while len(qry_result) > 0:
+                start = perf_counter() if monitor is not None else None
+                for col_no, values in enumerate(zip(*qry_result)):
+                    columns[col_no] = _extend_column(columns[col_no], values, converters[col_no])
+                if monitor is not None:
+                    monitor.loaded(perf_counter() - start)
+                qry_result = cursor.fetchmany(fetch_size)
+        finally:
+            cursor.close()
+            if monitor is not None:
+                monitor.finish()
+        if use_numpy:
+            for col_no, column in enumerate(columns):
+                if isinstance(column, array):
+                    columns[col_no] = numpy.array(column, dtype=bool if column.typecode == 'b' else None)
+        return dict(zip(cls_attr_names, columns))
+
+    def _columns_statement(self, cls_attr_names: list, where_criteria: list, named: bool, order_by: list,
+                           limit: int, offset: int, distinct: bool) -> tuple:
+        """ Creates the projection statement and chooses the row converter for "select_columns" and
+            "iter_columns".
+
+        Returns:
+            tuple : (SQLStatement, row converter).
+        """
+        # pylint: disable=too-many-arguments
+        where_criteria = where_criteria or []
+        contents = self._contents_type()
+        select_stmt = contents.select_columns_statement(cls_attr_names, where_criteria, order_by, limit,
+                                                        offset, distinct)
+        if self._plan_check is not None and len(where_criteria) > 0:
+            self._check_plan(select_stmt)
+        _, named_converter, plain_converter = contents._compiled_map().projection(cls_attr_names)
+        return select_stmt, named_converter if named else plain_converter
+
+    def aggregate(self, function: str, cls_attr_name: str = None, where_criteria: list = None,
+                  group_by: list = None):
+        """ Computes an aggregate function over the entries matching the given criteria inside SQLite,
+            without loading the entries. Results of MIN and MAX, as well as the grouping values, are converted
+            to the types of the class attributes. Results of SUM, TOTAL and AVG are converted to the type of
+            the class attribute if it is a numeric type other than int (e.g. Decimal or float); they are
+            computed by SQLite in floating point, so Decimal results are subject to rounding. SUM of an int
+            attribute returns int, AVG returns float.
+
+        Parameters:
+            function : str
+                Aggregate function ("COUNT", "SUM", "TOTAL", "MIN", "MAX", "AVG").
+            cls_attr_name : str, optional
+                Name of the class attribute to aggregate; None for counting the entries.
+            where_criteria : list or WhereExpression, optional
+                Criteria for selecting repository elements (see "select_where"). Default: all entries.
+            group_by : list, optional
+                Names of the class attributes to group by.
+
+        Returns:
+            Any : the aggregate value if "group_by" is not specified; otherwise a list of tuples
+                  (grouping values..., aggregate value), one per group, sorted by the grouping values.
+        """
+        where_criteria = where_criteria or []
+        contents = self._contents_type()
+        select_stmt = contents.aggregate_statement(function, cls_attr_name, where_criteria, group_by)
+        if self._plan_check is not None and len(where_criteria) > 0:
+            self._check_plan(select_stmt)
+        qry_result = self._fetch_all(self._read_connection(), select_stmt)
+        if self._monitor is not None:
+            self._monitor.finish()
+        compiled = contents._compiled_map()
+        converts_result = function.upper() in ['MIN', 'MAX']
+        if function.upper() in ['SUM', 'TOTAL', 'AVG']:
+            cls_attr_type = contents._attribute_map[cls_attr_name].class_attr_type
+            converts_result = issubclass(cls_attr_type, Number) and not issubclass(cls_attr_type, int)
+        if converts_result:
+            row_converter = compiled.projection(list(group_by or []) + [cls_attr_name])[2]
+        elif group_by:
+            group_converter = compiled.projection(group_by)[2]
+            row_converter = lambda cursor_row: group_converter(cursor_row) + (cursor_row[-1],)
+        else:
+            row_converter = tuple
+        if not group_by:
+            return row_converter(qry_result[0])[0]
+        return [row_converter(cursor_row) for cursor_row in qry_result]
+
+    def count(self, where_criteria: list = None, group_by: list = None):
+        """ Counts the entries matching the given criteria (see "aggregate"). """
+        return self.aggregate('COUNT', None, where_criteria, group_by)
+
+    def sum(self, cls_attr_name: str, where_criteria: list = None, group_by: list = None):
+        """ Sums up a class attribute over the entries matching the given criteria (see "aggregate"). """
+        return self.aggregate('SUM', cls_attr_name, where_criteria, group_by)
+
+    def min(self, cls_attr_name: str, where_criteria: list = None, group_by: list = None):
+        """ Minimum of a class attribute over the entries matching the given criteria (see "aggregate"). """
+        return self.aggregate('MIN', cls_attr_name, where_criteria, group_by)
+
+    def max(self, cls_attr_name: str, where_criteria: list = None, group_by: list = None):
+        """ Maximum of a class attribute over the entries matching the given criteria (see "aggregate"). """
+        return self.aggregate('MAX', cls_attr_name, where_criteria, group_by)
+
+    def avg(self, cls_attr_name: str, where_criteria: list = None, group_by: list = None):
+        """ Average of a class attribute over the entries matching the given criteria (see "aggregate"). """
+        return self.aggregate('AVG', cls_attr_name, where_criteria, group_by)
+
+    def parallel_scan(self, map_func, reduce_func = None, where_criteria: list = None, num_partitions: int = None,
+                      executor = None, fetch_size: int = 500, initial = _MISSING):
+        """ Scans the entries matching the given criteria in parallel: the rowid range of the table is split
+            into partitions of equal size, and every partition is read by a worker process over its own
+            read-only connection. The partitions cover equal rowid ranges, not equal numbers of rows, so gaps
+            in the rowids (e.g. after deletions) or criteria matching the rows of some ranges only leave the
+            workers unbalanced.
+            The map function is called in the worker with an iterator over the elements of a partition; the
+            partial results are combined by the reduce function. Only committed data is visible to the workers.
+            The contents class, the map function and the reduce function must be defined at module level so
+            that they can be pickled; the table must have a rowid (no WITHOUT ROWID table).
+
+        Parameters:
+            map_func : function
+                Function (iterator of elements) -> partial result.
+            reduce_func : function, optional
+                Function (accumulated result, partial result) -> accumulated result. If None, the list of
+                partial results (in partition order) is returned.
+            where_criteria : list or WhereExpression, optional
+                Criteria for selecting repository elements (see "select_where"). Default: all entries.
+            num_partitions : int, optional
+                Number of partitions. Default is the number of CPUs.
+            executor : concurrent.futures.Executor, optional
+                Executor running the partitions. Default is a new ProcessPoolExecutor, shut down at the end.
+            fetch_size : int, optional
+                Number of rows fetched from the cursor at once by a worker. Default value is 500.
+            initial : Any, optional
+                Initial value of the accumulated result (may be None). Default is the first partial result.
+
+        Returns:
+            Any : the reduced result, or the list of partial results.
+        """
+        # pylint: disable=too-many-arguments
+        where_criteria = where_criteria or []
+        num_partitions = num_partitions or os.cpu_count() or 1
+        cursor = self._connection().cursor()
+        cursor.execute('PRAGMA database_list')
+        sqlite_file_path = [row[2] for row in cursor.fetchall() if row[1] == 'main'][0]
+        if not sqlite_file_path:
+            cursor.close()
+            raise ValueError("Parallel scans require a database file.")
+        cursor.execute('SELECT MIN(rowid), MAX(rowid) FROM {}'.format(self._contents_type._attribute_map.table_name))
+        first_rowid, last_rowid = cursor.fetchone()
         cursor.close()
-        if do_commit:
-            self._sql_connection.commit()
-        for cursor_row in qry_result:
-            res_entry = self._contents_type()
-            res_entry.load_row(cursor_row)
-            res.append(res_entry)
-        return res
+        partitions = [] if first_rowid is None else _rowid_partitions(first_rowid, last_rowid, num_partitions)
+        own_executor = executor is None and len(partitions) > 0
+        if own_executor:
+            executor = ProcessPoolExecutor(max_workers=min(len(partitions), os.cpu_count() or 1))
+        try:
+            futures = [executor.submit(_scan_partition, self._contents_type, sqlite_file_path, self._native_datetime,
+                                       where_criteria, rowid_range, map_func, fetch_size)
+                       for rowid_range in partitions]
+            results = [future.result() for future in futures]
+        finally:
+            if own_executor:
+                executor.shutdown()
+        if reduce_func is None:
+            return results
+        if initial is not _MISSING:
+            return reduce(reduce_func, results, initial)
+        return reduce(reduce_func, results)
 
-    def query(self, query: SQLStatement, do_commit: bool = True) -> list:
+    def query(self, query: SQLStatement, do_commit: bool = False) -> list:
         """ Executes any SQL SELECT statement passed as parameters and returns the selected list of records.
 
         Parameters:
@@ -279,20 +1646,236 @@ class SQLiteRepository:
                 SQL SELECT statement to be executed.
             do_commit : bool, optional
                 Indicates whether or not the select transaction shall be committed.
-                Default value is "True".
+                Default value is "False".
 
         Returns:
             list: List of retrieved entries (instances of contents type).
         """
-        res = []
-        cursor = self._sql_connection.cursor()
-        cursor.execute(query.stmt_text, query.stmt_params)
-        qry_result = cursor.fetchall()
-        cursor.close()
-        if do_commit:
-            self._sql_connection.commit()
-        for cursor_row in qry_result:
-            res_entry = self._contents_type()
-            res_entry.load_row(cursor_row)
-            res.append(res_entry)
+        return self._select_list(query, do_commit)
+
+    def iter_all(self, fetch_size: int = 500):
+        """ Generator retrieving all entries from the repository, sorted by their key attributes. The rows
+            are fetched in batches of "fetch_size" rows; the cursor is closed as soon as the generator is
+            exhausted or closed.
+
+        Parameters:
+            fetch_size : int, optional
+                Number of rows fetched from the cursor at once. Default value is 500.
+
+        Yields:
+            RepositoryElement : next entry of the repository.
+        """
+        return self._iter_statement(self._contents_type().select_all_statement(), fetch_size)
+
+    def iter_where(self, where_criteria: list, fetch_size: int = 500, order_by: list = None,
+                   limit: int = None, offset: int = None, distinct: bool = False):
+        """ Generator retrieving the entries from the repository matching the given criteria, sorted by their
+            key attributes unless another order is requested. The rows are fetched in batches of "fetch_size"
+            rows; the cursor is closed as soon as the generator is exhausted or closed.
+
+        Parameters:
+            where_criteria : list or WhereExpression
+                Criteria for selecting repository elements (see "select_where").
+            fetch_size : int, optional
+                Number of rows fetched from the cursor at once. Default value is 500.
+            order_by, limit, offset, distinct : optional
+                See "select_where".
+
+        Yields:
+            RepositoryElement : next entry matching the criteria.
+        """
+        # pylint: disable=too-many-arguments
+        select_stmt = self._contents_type().select_where_statement(where_criteria, order_by, limit, offset, distinct)
+        if self._plan_check is not None and len(where_criteria) > 0:
+            self._check_plan(select_stmt)
+        return self._iter_statement(select_stmt, fetch_size)
+
+    def iter_query(self, query: SQLStatement, fetch_size: int = 500):
+        """ Generator executing any SQL SELECT statement passed as parameter and yielding the selected
+            records one by one. The rows are fetched in batches of "fetch_size" rows; the cursor is closed as
+            soon as the generator is exhausted or closed.
+
+        Parameters:
+            query : SQLStatement
+                SQL SELECT statement to be executed.
+            fetch_size : int, optional
+                Number of rows fetched from the cursor at once. Default value is 500.
+
+        Yields:
+            RepositoryElement : next retrieved entry (instance of contents type).
+        """
+        return self._iter_statement(query, fetch_size)
+
+    def _select_list(self, select_stmt: SQLStatement, do_commit: bool, row_factory = None) -> list:
+        """ Executes a SQL SELECT statement and converts all retrieved rows into contents class objects.
+
+        Parameters:
+            select_stmt : SQLStatement
+                SQL SELECT statement to be executed.
+            do_commit : bool
+                Indicates whether or not the select transaction shall be committed.
+            row_factory : function, optional
+                Callable converting a cursor row. Default is the element factory of the contents class.
+
+        Returns:
+            list : List of retrieved entries (instances of contents type).
+        """
+        sql_connection = self._read_connection()
+        qry_result = self._fetch_all(sql_connection, select_stmt)
+        if row_factory is None:
+            row_factory = self._contents_type._compiled_map().element_factory
+        if self._monitor is None:
+            res = [row_factory(cursor_row) for cursor_row in qry_result]
+        else:
+            start = perf_counter()
+            res = [row_factory(cursor_row) for cursor_row in qry_result]
+            self._monitor.loaded(perf_counter() - start)
+        self._commit(sql_connection, do_commit)
         return res
+
+    def _fetch_all(self, sql_connection: sqlite3.Connection, select_stmt: SQLStatement) -> list:
+        """ Executes a SQL SELECT statement and returns all rows. If the result cache is enabled, the rows are
+            taken from or added to the cache.
+
+        Parameters:
+            sql_connection : sqlite3.Connection
+                Connection used for executing the statement.
+            select_stmt : SQLStatement
+                SQL SELECT statement to be executed.
+
+        Returns:
+            list : retrieved rows.
+        """
+        cache_key = None if self._result_cache is None else self._result_key(select_stmt)
+        if cache_key is not None:
+            qry_result = self._result_cache.get(cache_key)
+            if qry_result is not None:
+                return qry_result
+        cursor = self._cursor(sql_connection)
+        try:
+            cursor.execute(select_stmt.stmt_text, select_stmt.stmt_params)
+            qry_result = cursor.fetchall()
+        finally:
+            cursor.close()
+        if cache_key is not None:
+            self._result_cache.put(cache_key, qry_result)
+        return qry_result
+
+    def _result_key(self, select_stmt: SQLStatement) -> tuple:
+        """ Returns the result cache key of a SQL SELECT statement. Clears the result cache if the database has
+            been changed since the cached results were retrieved.
+
+        Parameters:
+            select_stmt : SQLStatement
+                SQL SELECT statement to be executed.
+
+        Returns:
+            tuple : (statement text, statement parameters), or None if a transaction is active or the
+                    parameters are not hashable.
+        """
+        sql_connection = self._connection()
+        if sql_connection.in_transaction or self._in_transaction(sql_connection):
+            return None
+        db_version = (sql_connection.total_changes, sql_connection.execute('PRAGMA data_version').fetchone()[0])
+        if self._result_versions.get(id(sql_connection), db_version) != db_version:
+            self._result_cache.clear()
+        self._result_versions[id(sql_connection)] = db_version
+        cache_key = (select_stmt.stmt_text, tuple(select_stmt.stmt_params))
+        try:
+            hash(cache_key)
+        except TypeError:
+            return None
+        return cache_key
+
+    def _iter_statement(self, select_stmt: SQLStatement, fetch_size: int, row_factory = None):
+        """ Validates the fetch size and returns a generator executing a SQL SELECT statement and yielding the
+            retrieved rows as contents class objects, fetching "fetch_size" rows at a time. An invalid fetch
+            size is reported when the generator is requested, not when it is first advanced.
+
+        Parameters:
+            select_stmt : SQLStatement
+                SQL SELECT statement to be executed.
+            fetch_size : int
+                Number of rows fetched from the cursor at once.
+            row_factory : function, optional
+                Callable converting a cursor row. Default is the element factory of the contents class.
+
+        Returns:
+            generator : generator yielding the retrieved entries (instances of contents type).
+        """
+        if fetch_size < 1:
+            raise ValueError('Invalid fetch size: {}'.format(fetch_size))
+        if row_factory is None:
+            row_factory = self._contents_type._compiled_map().element_factory
+        if self._monitor is not None:
+            return self._iter_monitored(select_stmt, fetch_size, row_factory, self._monitor)
+        return self._iter_rows(select_stmt, fetch_size, row_factory)
+
+    def _iter_rows(self, select_stmt: SQLStatement, fetch_size: int, row_factory):
+        """ Generator executing a SQL SELECT statement and yielding the retrieved rows as contents class
+            objects, fetching "fetch_size" rows at a time.
+
+        Parameters:
+            select_stmt : SQLStatement
+                SQL SELECT statement to be executed.
+            fetch_size : int
+                Number of rows fetched from the cursor at once.
+            row_factory : function
+                Callable converting a cursor row.
+
+        Yields:
+            RepositoryElement : next retrieved entry (instance of contents type).
+        """
+        cursor = self._read_connection().cursor()
+        try:
+            cursor.execute(select_stmt.stmt_text, select_stmt.stmt_params)
+            qry_result = cursor.fetchmany(fetch_size)
+            while len(qry_result) > 0:
+                for cursor_row in qry_result:
+                    yield row_factory(cursor_row)
+                qry_result = cursor.fetchmany(fetch_size)
+        finally:
+            cursor.close()
+
+    def _iter_monitored(self, select_stmt: SQLStatement, fetch_size: int, row_factory,
+                        monitor: StatementMonitor):
+        """ Variant of "_iter_rows" measuring the statement. The measurements are collected locally and
+            recorded when the generator is exhausted or closed, since the consumer may execute other
+            statements between two rows.
+
+        Parameters:
+            select_stmt : SQLStatement
+                SQL SELECT statement to be executed.
+            fetch_size : int
+                Number of rows fetched from the cursor at once.
+            row_factory : function
+                Callable converting a cursor row.
+            monitor : StatementMonitor
+                Monitor receiving the measurements.
+
+        Yields:
+            RepositoryElement : next retrieved entry (instance of contents type).
+        """
+        # pylint: disable=too-many-locals
+        execute_time = fetch_time = load_time = 0.0
+        row_count = 0
+        cursor = self._read_connection().cursor()
+        try:
+            start = perf_counter()
+            cursor.execute(select_stmt.stmt_text, select_stmt.stmt_params)
+            execute_time = perf_counter() - start
+            while True:
+                start = perf_counter()
+                qry_result = cursor.fetchmany(fetch_size)
+                fetch_time += perf_counter() - start
+                if len(qry_result) == 0:
+                    break
+                row_count += len(qry_result)
+                start = perf_counter()
+                elements = [row_factory(cursor_row) for cursor_row in qry_result]
+                load_time += perf_counter() - start
+                yield from elements
+        finally:
+            cursor.close()
+            monitor.record(select_stmt.stmt_text, len(select_stmt.stmt_params), row_count, execute_time,
+                           fetch_time, load_time)
@@ -0,0 +1,291 @@
+"""
+    Copyright 2021 Walter Pachlinger (walter.pachlinger@gmail.com)
+
+    Licensed under the EUPL, Version 1.2 or - as soon they will be approved by the European
+    Commission - subsequent versions of the EUPL (the LICENSE). You may not use this work except
+    in compliance with the LICENSE. You may obtain a copy of the LICENSE at:
+
+        https://joinup.ec.europa.eu/software/page/eupl
+
+    Unless required by applicable law or agreed to in writing, software distributed under the
+    LICENSE is distributed on an "AS IS" basis, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+    either express or implied. See the LICENSE for the specific language governing permissions
+    and limitations under the LICENSE.
+"""
+import sqlite3
+import threading
+import time
+from itertools import count
+
+class SQLiteSnapshot:
+    """ In-memory copy of selected tables of a SQLite database, used by SQLiteRepository to serve reads of
+        read-mostly data. The tables are copied with their indexes from the attached database file; without
+        table names, or for an in-memory source database, the whole database is copied with the SQLite backup
+        API. The copy is refreshed lazily when it is requested after it became stale: after a write through
+        a repository using the snapshot ("invalidate"), or after the refresh interval has elapsed, or after
+        any committed change of the database. Changes are detected by a single version of the database: the
+        "PRAGMA data_version" of a connection the snapshot opens to the database file, which changes with
+        every commit of any other connection, or the number of changes of the source connection for an
+        in-memory database. The source connections of a pool share this version. A refresh always
+        copies the selected tables completely, even if the change concerned another table. It creates a new
+        in-memory database and swaps it in atomically; readers still using the previous copy are not affected.
+
+    Attributes:
+        _tables : list
+            Names of the tables to be copied, or None for the whole database.
+        _native_datetime : bool
+            Indicates whether or not the in-memory connection converts DATETIME and TIMESTAMP columns.
+        _refresh_interval : float
+            Maximum age of the copy in seconds, or None.
+        _check_data_version : bool
+            Indicates whether or not changes of the database are detected by the database version.
+        _clock : function
+            Function returning the current time in seconds (default: time.monotonic).
+        _mem_connection : sqlite3.Connection
+            Connection to the current in-memory copy, or None before the first refresh.
+        _invalidation_counter : itertools.count
+            Counter numbering the calls to "invalidate".
+        _invalidations : int
+            Number of the last call to "invalidate" (0 before the first call).
+        _copied_invalidations : int
+            Value of "_invalidations" when the current copy was started; the copy is stale if they differ.
+        _refreshed_at : float
+            Time of the last refresh.
+        _db_version : tuple
+            Version of the database the current copy is based on, or None.
+        _observer : sqlite3.Connection
+            Connection to the database file observing the commits of all other connections, or None.
+        _refresh_lock : threading.Lock
+            Lock serializing the staleness checks and refreshes.
+        _refresh_count : int
+            Number of refreshes.
+
+    Properties:
+        refresh_count : int
+            Getter for the "_refresh_count" instance attribute.
+
+    Methods:
+        SQLiteSnapshot()
+            Constructor.
+        connection : sqlite3.Connection
+            Returns the connection to the current in-memory copy, refreshing it first if it is stale.
+        invalidate : None
+            Marks the copy as stale.
+        refresh : sqlite3.Connection
+            Copies the source database into a new in-memory database and swaps it in.
+        _refresh : sqlite3.Connection
+            Implementation of "refresh", called with the refresh lock held.
+        close : None
+            Releases the in-memory copy.
+        _is_stale : bool
+            Checks whether or not the copy has to be refreshed.
+        _current_version : tuple
+            Returns the current version of the database.
+        _file_path : str, static
+            Returns the path name of the database file of a connection.
+        _copy_tables : None
+            Copies the selected tables and their indexes into an in-memory database.
+    """
+    def __init__(self, native_datetime: bool = False, refresh_interval: float = None,
+                 check_data_version: bool = True, clock = time.monotonic, tables: list = None):
+        """ Constructor.
+
+        Parameters:
+            native_datetime : bool, optional
+                If True, the in-memory connection is opened with "detect_types" (see SQLiteRepository).
+                Default value is "False".
+            refresh_interval : float, optional
+                Maximum age of the copy in seconds. Default value is None (no periodic refresh).
+            check_data_version : bool, optional
+                If True (default), every read checks the version of the database, so that commits of other
+                repositories and connections trigger a refresh.
+            clock : function, optional
+                Function returning the current time in seconds. Default is "time.monotonic".
+            tables : list, optional
+                Names of the tables to be copied. Default value is None (whole database).
+        """
+        self._tables = None if tables is None else list(tables)
+        self._native_datetime = native_datetime
+        self._refresh_interval = refresh_interval
+        self._check_data_version = check_data_version
+        self._clock = clock
+        self._mem_connection = None
+        self._invalidation_counter = count(1)
+        self._invalidations = 0
+        self._copied_invalidations = None
+        self._refreshed_at = None
+        self._db_version = None
+        self._observer = None
+        self._refresh_lock = threading.Lock()
+        self._refresh_count = 0
+
+    @property
+    def refresh_count(self) -> int:
+        """ Getter for the "_refresh_count" instance attribute.
+
+        Returns:
+            int : number of refreshes of the in-memory copy.
+        """
+        return self._refresh_count
+
+    def connection(self, source_connection: sqlite3.Connection) -> sqlite3.Connection:
+        """ Returns the connection to the current in-memory copy, refreshing it first if it is stale.
+
+        Parameters:
+            source_connection : sqlite3.Connection
+                Connection to the database file, used for checking and refreshing the copy.
+
+        Returns:
+            sqlite3.Connection : connection to the in-memory copy (to be used for reading only).
+        """
+        with self._refresh_lock:
+            if self._mem_connection is None or self._is_stale(source_connection):
+                return self._refresh(source_connection)
+            return self._mem_connection
+
+    def invalidate(self) -> None:
+        """ Marks the copy as stale, so that it is refreshed when it is requested the next time. """
+        self._invalidations = next(self._invalidation_counter)
+
+    def refresh(self, source_connection: sqlite3.Connection) -> sqlite3.Connection:
+        """ Copies the selected tables (or the whole source database) into a new in-memory database and
+            swaps it in.
+
+        Parameters:
+            source_connection : sqlite3.Connection
+                Connection to the database file.
+
+        Returns:
+            sqlite3.Connection : connection to the new in-memory copy.
+        """
+        with self._refresh_lock:
+            return self._refresh(source_connection)
+
+    def _refresh(self, source_connection: sqlite3.Connection) -> sqlite3.Connection:
+        """ Implementation of "refresh", called with the refresh lock held. The state of the snapshot is only
+            updated after the copy has succeeded; if it fails, the new in-memory database is closed and the
+            previous copy remains stale.
+
+        Parameters:
+            source_connection : sqlite3.Connection
+                Connection to the database file.
+
+        Returns:
+            sqlite3.Connection : connection to the new in-memory copy.
+        """
+        invalidations = self._invalidations
+        db_version = self._current_version(source_connection) if self._check_data_version else None
+        if self._native_datetime:
+            mem_connection = sqlite3.connect(':memory:', check_same_thread=False,
+                                             detect_types=sqlite3.PARSE_DECLTYPES)
+        else:
+            mem_connection = sqlite3.connect(':memory:', check_same_thread=False)
+        try:
+            sqlite_file_path = self._file_path(source_connection)
+            if self._tables is None or not sqlite_file_path:
+                source_connection.backup(mem_connection)
+            else:
+                self._copy_tables(sqlite_file_path, mem_connection)
+        except BaseException:
+            mem_connection.close()
+            raise
+        self._mem_connection = mem_connection
+        self._copied_invalidations = invalidations
+        self._db_version = db_version
+        self._refreshed_at = self._clock()
+        self._refresh_count += 1
+        return mem_connection
+
+    def close(self) -> None:
+        """ Releases the in-memory copy and closes the observing connection. Connections handed out before
+            remain usable until they are garbage collected.
+        """
+        with self._refresh_lock:
+            self._mem_connection = None
+            self._db_version = None
+            if self._observer is not None:
+                self._observer.close()
+                self._observer = None
+
+    def _is_stale(self, source_connection: sqlite3.Connection) -> bool:
+        """ Checks whether or not the copy has to be refreshed.
+
+        Parameters:
+            source_connection : sqlite3.Connection
+                Connection to the database file.
+
+        Returns:
+            bool : True if the copy has been invalidated or has expired, or if the database has been changed
+                   since the last refresh; False otherwise.
+        """
+        if self._copied_invalidations != self._invalidations:
+            return True
+        if self._refresh_interval is not None and self._clock() - self._refreshed_at >= self._refresh_interval:
+            return True
+        if self._check_data_version:
+            return self._db_version != self._current_version(source_connection)
+        return False
+
+    def _current_version(self, source_connection: sqlite3.Connection) -> tuple:
+        """ Returns the current version of the database. For a database file, the version is read from a
+            connection of the snapshot, which is opened by the first call; as it never writes, its
+            "PRAGMA data_version" changes with every commit to the database file, whichever connection
+            made it. An in-memory database can only be changed through the source connection.
+
+        Parameters:
+            source_connection : sqlite3.Connection
+                Connection to the database.
+
+        Returns:
+            tuple : ("PRAGMA data_version" of the observing connection, ) for a database file;
+                    (source connection, number of rows changed through it) for an in-memory database.
+        """
+        if self._observer is None:
+            sqlite_file_path = self._file_path(source_connection)
+            if not sqlite_file_path:
+                return (source_connection, source_connection.total_changes)
+            self._observer = sqlite3.connect(sqlite_file_path, check_same_thread=False)
+        return (self._observer.execute('PRAGMA data_version').fetchone()[0], )
+
+    @staticmethod
+    def _file_path(sql_connection: sqlite3.Connection) -> str:
+        """ Returns the path name of the database file of a connection.
+
+        Parameters:
+            sql_connection : sqlite3.Connection
+                Connection to the database.
+
+        Returns:
+            str : full path name of the main database file; empty for an in-memory database.
+        """
+        return [row[2] for row in sql_connection.execute('PRAGMA database_list') if row[1] == 'main'][0]
+
+    def _copy_tables(self, sqlite_file_path: str, mem_connection: sqlite3.Connection) -> None:
+        """ Copies the selected tables and their indexes from the database file into an in-memory database.
+            The file is attached to the in-memory connection, so that the rows are copied inside SQLite.
+
+        Parameters:
+            sqlite_file_path : str
+                Full path name of the database file.
+            mem_connection : sqlite3.Connection
+                Connection to the new in-memory database.
+        """
+        mem_connection.execute('ATTACH DATABASE ? AS wp_source', (sqlite_file_path,))
+        try:
+            for table_name in self._tables:
+                schema = mem_connection.execute(
+                    "SELECT type, sql FROM wp_source.sqlite_master WHERE tbl_name = ? AND type IN ('table', 'index') "
+                    "AND sql IS NOT NULL ORDER BY type = 'index'", (table_name,)).fetchall()
+                if len(schema) == 0:
+                    raise ValueError('Unknown table: "{}"'.format(table_name))
+                for schema_type, schema_sql in schema:
+                    if schema_type == 'index':
+                        continue
+                    mem_connection.execute(schema_sql)
+                mem_connection.execute('INSERT INTO main.{0} SELECT * FROM wp_source.{0}'.format(table_name))
+                for schema_type, schema_sql in schema:
+                    if schema_type == 'index':
+                        mem_connection.execute(schema_sql)
+            mem_connection.commit()
+        finally:
+            mem_connection.execute('DETACH DATABASE wp_source')
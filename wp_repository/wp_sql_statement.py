@@ -32,14 +32,20 @@ class SQLStatement:
             Appends a value (or list of values) to the parameter list of the SQL statement
             and returns the result.
     """
-    def __init__(self):
+    def __init__(self, stmt_text: str = None, stmt_params: list = None):
         """ Constructor
 
+        Parameters:
+            stmt_text : str, optional
+                Initial text of the SQL DML statement.
+            stmt_params : list, optional
+                Initial list of parameter values.
+
         Returns : SQLStatement
-            A new SQL DML statements with empty statement text and empty parameter list.
+            A new SQL DML statement with the given (default: empty) statement text and parameter list.
         """
-        self.stmt_text = None
-        self.stmt_params = []
+        self.stmt_text = stmt_text
+        self.stmt_params = [] if stmt_params is None else stmt_params
 
     def append_text(self, stmt_text: str) -> str:
         """ Appends a piece of text to the SQL statement text and returns the result.